@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:48
+
+from urllib.parse import urlparse
+
+from django.db import migrations, models
+
+
+def website_domain(website):
+    """Bare host of a website URL, as BufferedLeadWriter stores it"""
+    website = (website or "").strip().lower()
+    if not website:
+        return ""
+    if "://" not in website:
+        website = f"http://{website}"
+    try:
+        domain = urlparse(website).netloc
+    except Exception:
+        return ""
+    domain = domain.split("@")[-1].split(":")[0]
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def fill_website_domains(apps, schema_editor):
+    Lead = apps.get_model("mockmap", "Lead")
+    leads = []
+    for lead in Lead.objects.exclude(website__isnull=True).exclude(website="").only("id", "website").iterator():
+        lead.website_domain = website_domain(lead.website) or None
+        leads.append(lead)
+    Lead.objects.bulk_update(leads, ["website_domain"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mockmap", "0022_alter_lead_address_alter_lead_linkedin_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="website_domain",
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(fill_website_domains, migrations.RunPython.noop),
+    ]
@@ -30,6 +30,8 @@ class Lead(models.Model):
     title = models.CharField(max_length=255,null=True,blank=True)
 
     website = models.CharField(max_length=255, null=True, blank=True)
+    # Bare host of website (no scheme, www. or path), for exact duplicate lookups
+    website_domain = models.CharField(max_length=255, null=True, blank=True, db_index=True)
     address = models.CharField(max_length=1000,null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     keywords = models.TextField(null=True, blank=True)
@@ -0,0 +1,107 @@
+import time
+from collections import defaultdict
+
+# Upper bound (ms) for each wait step. Steps normally return as soon as their
+# readiness signal fires; these only cap how long a missing signal can stall.
+WAIT_TIMEOUTS = {
+    "search_loaded": 15000,
+    "cookie_consent": 5000,
+    "scroll_restore": 4000,
+    "feed_growth": 3000,
+    "show_more": 6000,
+    "lazy_load": 1500,
+    "detail_loaded": 10000,
+    "click_retry": 2000,
+}
+
+FEED_GROWTH_JS = """
+([feedSelector, cardSelector, prevHeight, prevCount]) => {
+    const feed = document.querySelector(feedSelector);
+    if (!feed) return false;
+    if (feed.querySelector('span.HlvSq')) return true;
+    return feed.scrollHeight > prevHeight || feed.querySelectorAll(cardSelector).length > prevCount;
+}
+"""
+
+
+class AdaptiveWaiter:
+    """Wait on concrete page readiness signals and record how long each step took"""
+
+    def __init__(self, timeouts=None):
+        self.timeouts = dict(WAIT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.durations = defaultdict(list)
+        self.timeouts_hit = defaultdict(int)
+
+    def record(self, step, started, satisfied):
+        self.durations[step].append((time.perf_counter() - started) * 1000)
+        if not satisfied:
+            self.timeouts_hit[step] += 1
+
+    async def for_selector(self, page, selectors, step, timeout=None):
+        """Wait until any of the selectors is attached to the page"""
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        started = time.perf_counter()
+        satisfied = True
+        try:
+            await page.wait_for_selector(", ".join(selectors), state="attached",
+                                         timeout=timeout or self.timeouts[step])
+        except Exception:
+            satisfied = False
+        self.record(step, started, satisfied)
+        return satisfied
+
+    async def for_load_state(self, page, step, state="networkidle", timeout=None):
+        """Wait for a Playwright load state such as networkidle"""
+        started = time.perf_counter()
+        satisfied = True
+        try:
+            await page.wait_for_load_state(state, timeout=timeout or self.timeouts[step])
+        except Exception:
+            satisfied = False
+        self.record(step, started, satisfied)
+        return satisfied
+
+    async def for_feed_growth(self, page, prev_height, prev_count, step="feed_growth", timeout=None,
+                              feed_selector='div[role="feed"]', card_selector='a[href*="/maps/place/"]'):
+        """Wait until the results feed gets taller, gains cards or shows its end marker"""
+        started = time.perf_counter()
+        satisfied = True
+        try:
+            await page.wait_for_function(
+                FEED_GROWTH_JS,
+                arg=[feed_selector, card_selector, prev_height or 0, prev_count or 0],
+                timeout=timeout or self.timeouts[step],
+                polling=100,
+            )
+        except Exception:
+            satisfied = False
+        self.record(step, started, satisfied)
+        return satisfied
+
+    def summary(self):
+        """Per-step wait statistics in milliseconds"""
+        stats = {}
+        for step, values in self.durations.items():
+            ordered = sorted(values)
+            stats[step] = {
+                "count": len(ordered),
+                "timeouts": self.timeouts_hit.get(step, 0),
+                "mean_ms": round(sum(ordered) / len(ordered), 1),
+                "p50_ms": round(ordered[len(ordered) // 2], 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+                "max_ms": round(ordered[-1], 1),
+                "budget_ms": self.timeouts.get(step),
+            }
+        return stats
+
+    def print_summary(self):
+        stats = self.summary()
+        if not stats:
+            return
+        print("⏱️ Observed wait durations:")
+        for step, row in sorted(stats.items()):
+            print(f"   • {step}: n={row['count']} mean={row['mean_ms']}ms p95={row['p95_ms']}ms "
+                  f"max={row['max_ms']}ms timeouts={row['timeouts']} (budget {row['budget_ms']}ms)")
@@ -0,0 +1,340 @@
+import asyncio
+import fcntl
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+DEFAULT_PROFILE_DIR = "csv-json/browser_profile"
+DEFAULT_SERVICE_PORT = 9333
+SERVICE_FILE = "service.json"
+# Held by the one client currently leasing the profile's default context
+DEFAULT_CONTEXT_LOCK = "default_context.lock"
+
+
+def service_endpoint(port=DEFAULT_SERVICE_PORT):
+    """CDP endpoint of a browser service listening on port, or None if nothing answers"""
+    endpoint = f"http://127.0.0.1:{port}"
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=1) as response:
+            if response.status == 200:
+                return endpoint
+    except Exception:
+        pass
+    return None
+
+
+def read_service_file(profile_dir=DEFAULT_PROFILE_DIR):
+    try:
+        with open(os.path.join(profile_dir, SERVICE_FILE), "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def chromium_executable():
+    """Path of the Chromium build that ships with the installed Playwright"""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def start_browser_service(port=DEFAULT_SERVICE_PORT, profile_dir=DEFAULT_PROFILE_DIR, headless=True,
+                          user_agent=None, startup_timeout=20):
+    """Start a detached Chromium with a persistent profile and a CDP port; returns its endpoint
+
+    The profile directory keeps the HTTP disk cache and cookies (including the
+    Maps consent cookie) between runs. Does nothing if the port already answers.
+    """
+    endpoint = service_endpoint(port)
+    if endpoint:
+        print(f"🌐 Browser service already running at {endpoint}")
+        return endpoint
+
+    profile_dir = os.path.abspath(profile_dir)
+    os.makedirs(profile_dir, exist_ok=True)
+    args = [
+        chromium_executable(),
+        f"--remote-debugging-port={port}",
+        "--remote-debugging-address=127.0.0.1",
+        f"--user-data-dir={profile_dir}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-dev-shm-usage",
+    ]
+    if headless:
+        args.append("--headless=new")
+    if user_agent:
+        args.append(f"--user-agent={user_agent}")
+    args.append("about:blank")
+
+    print(f"🌐 Starting browser service on port {port} (profile: {profile_dir})...")
+    process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        endpoint = service_endpoint(port)
+        if endpoint:
+            with open(os.path.join(profile_dir, SERVICE_FILE), "w") as f:
+                json.dump({"pid": process.pid, "port": port, "started_at": time.time()}, f)
+            print(f"✅ Browser service ready at {endpoint} (pid {process.pid})")
+            return endpoint
+        if process.poll() is not None:
+            break
+        time.sleep(0.25)
+
+    process.kill()
+    raise RuntimeError(f"Browser service did not come up on port {port}")
+
+
+def stop_browser_service(profile_dir=DEFAULT_PROFILE_DIR):
+    """Terminate the browser service started for this profile"""
+    info = read_service_file(profile_dir)
+    pid = info.get("pid")
+    if not pid:
+        print("⚠️ No browser service recorded for this profile")
+        return False
+    try:
+        os.killpg(pid, signal.SIGTERM)
+        print(f"🔒 Stopped browser service (pid {pid})")
+    except ProcessLookupError:
+        print(f"⚠️ Browser service (pid {pid}) was not running")
+    try:
+        os.remove(os.path.join(profile_dir, SERVICE_FILE))
+    except OSError:
+        pass
+    return True
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and all its children in MB (Linux /proc; 0 elsewhere)"""
+    if not pid or not os.path.isdir("/proc"):
+        return 0.0
+    children = {}
+    rss_kb = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status", "r") as f:
+                status = f.read()
+        except OSError:
+            continue
+        ppid = rss = 0
+        for line in status.splitlines():
+            if line.startswith("PPid:"):
+                ppid = int(line.split()[1])
+            elif line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+        rss_kb[int(entry)] = rss
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_kb.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total / 1024
+
+
+class BrowserService:
+    """Client for the long-lived browser service with a pool of reusable contexts
+
+    connect() attaches over CDP (starting the service if needed). Contexts are
+    leased with acquire_context() and handed back with release_context(); a
+    released context is reused unless it has opened max_pages_per_context
+    pages or the browser has grown past max_memory_mb, in which case it is
+    closed. Releasing a context closes only the pages opened during that lease.
+
+    The profile's default context (which owns the disk cache) is never closed.
+    It is leased to one client at a time, across processes, by holding a lock
+    file in the profile; everyone else gets a fresh context. When it is due
+    for recycling it is cleaned up in place instead: every page is closed
+    (leaving one blank tab so the browser keeps a window) and Chromium is
+    asked over CDP to release memory. Cookies and the disk cache survive.
+    """
+
+    def __init__(self, port=DEFAULT_SERVICE_PORT, profile_dir=DEFAULT_PROFILE_DIR, headless=True, autostart=True,
+                 user_agent=None, max_pages_per_context=100, max_memory_mb=3072):
+        self.port = port
+        self.profile_dir = profile_dir
+        self.headless = headless
+        self.autostart = autostart
+        self.user_agent = user_agent
+        self.max_pages_per_context = max_pages_per_context
+        self.max_memory_mb = max_memory_mb
+        self.browser = None
+        self.default_context = None
+        self.default_lock = None
+        self.idle = []
+        self.page_counts = {}
+        self.lease_pages = {}
+        self.lock = asyncio.Lock()
+        self.contexts_created = 0
+        self.contexts_recycled = 0
+        self.default_context_cleanups = 0
+        self.leases = 0
+
+    async def connect(self, playwright):
+        endpoint = service_endpoint(self.port)
+        if not endpoint:
+            if not self.autostart:
+                raise RuntimeError(f"No browser service on port {self.port}")
+            endpoint = await asyncio.to_thread(start_browser_service, self.port, self.profile_dir,
+                                               self.headless, self.user_agent)
+        self.browser = await playwright.chromium.connect_over_cdp(endpoint)
+        if self.browser.contexts:
+            self.default_context = self.browser.contexts[0]
+            self.track(self.default_context)
+        print(f"🔌 Connected to browser service at {endpoint}")
+        return self
+
+    def is_connected(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    def track(self, context):
+        self.page_counts[context] = 0
+
+        def count_page(page):
+            self.page_counts[context] = self.page_counts.get(context, 0) + 1
+            if context in self.lease_pages:
+                self.lease_pages[context].append(page)
+
+        context.on("page", count_page)
+
+    def memory_mb(self):
+        return process_tree_rss_mb(read_service_file(self.profile_dir).get("pid"))
+
+    def should_recycle(self, context):
+        if self.page_counts.get(context, 0) >= self.max_pages_per_context:
+            return True
+        return bool(self.max_memory_mb) and self.memory_mb() >= self.max_memory_mb
+
+    def lock_default_context(self):
+        """Take the profile-wide lease on the default context; False if another client holds it"""
+        if self.default_context is None or self.default_lock is not None:
+            return False
+        handle = None
+        try:
+            handle = open(os.path.join(self.profile_dir, DEFAULT_CONTEXT_LOCK), "w")
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            if handle:
+                handle.close()
+            return False
+        self.default_lock = handle
+        return True
+
+    def unlock_default_context(self):
+        if self.default_lock is not None:
+            try:
+                fcntl.flock(self.default_lock, fcntl.LOCK_UN)
+            finally:
+                self.default_lock.close()
+                self.default_lock = None
+
+    async def clean_default_context(self):
+        """Close every page of the default context and ask Chromium to free memory"""
+        context = self.default_context
+        blank = await context.new_page()
+        for page in list(context.pages):
+            if page is blank:
+                continue
+            try:
+                await page.close()
+            except Exception:
+                pass
+        try:
+            # Browser-wide: Chromium drops in-memory caches across its processes
+            session = await self.browser.new_browser_cdp_session()
+            await session.send("Memory.simulatePressureNotification", {"level": "critical"})
+            await session.detach()
+        except Exception as e:
+            print(f"⚠️ Could not release browser memory over CDP: {e}")
+        self.page_counts[context] = 0
+        self.default_context_cleanups += 1
+
+    async def acquire_context(self, user_agent=None):
+        """Lease the default context if it is free, else a pooled one, creating one if none are idle"""
+        async with self.lock:
+            self.leases += 1
+            if self.lock_default_context():
+                context = self.default_context
+            elif self.idle:
+                context = self.idle.pop()
+            else:
+                context = await self.browser.new_context(user_agent=user_agent or self.user_agent)
+                self.track(context)
+                self.contexts_created += 1
+            self.lease_pages[context] = []
+            return context
+
+    async def release_context(self, context):
+        """Return a leased context: close the pages this lease opened, then keep it or recycle it"""
+        for page in self.lease_pages.pop(context, []):
+            try:
+                await page.close()
+            except Exception:
+                pass
+        try:
+            await context.unroute_all(behavior="ignoreErrors")
+        except Exception:
+            pass
+
+        async with self.lock:
+            if context is self.default_context:
+                if self.should_recycle(context):
+                    try:
+                        await self.clean_default_context()
+                    except Exception as e:
+                        print(f"⚠️ Could not clean up default context: {e}")
+                self.unlock_default_context()
+                return
+            if self.should_recycle(context):
+                self.contexts_recycled += 1
+                self.page_counts.pop(context, None)
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+                return
+            self.idle.append(context)
+
+    async def close(self):
+        """Close pooled contexts and disconnect; the service itself keeps running"""
+        for context in self.idle:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self.idle = []
+        self.unlock_default_context()
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        print(f"🔌 Browser service: {self.leases} leases, {self.contexts_created} contexts created, "
+              f"{self.contexts_recycled} recycled, {self.default_context_cleanups} default context cleanups, "
+              f"{self.memory_mb():.0f}MB resident")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "start":
+        start_browser_service(headless="--headed" not in sys.argv)
+    elif command == "stop":
+        stop_browser_service()
+    else:
+        endpoint = service_endpoint()
+        info = read_service_file()
+        if endpoint:
+            print(f"✅ Browser service running at {endpoint} (pid {info.get('pid')}, "
+                  f"{process_tree_rss_mb(info.get('pid')):.0f}MB resident)")
+        else:
+            print("❌ Browser service not running")
@@ -0,0 +1,135 @@
+import csv
+import os
+import time
+from collections import Counter
+
+from mockmap.system.lead_gen.google_map.lead_writer import normalize_domain
+from mockmap.system.lead_gen.google_map.state_store import ScraperStateStore
+
+DEFAULT_INDEX_DIRS = ("csv-json/visited",)
+
+
+class BusinessIndex:
+    """Process-wide dedup index over website domains and place keys
+
+    Loaded once from every scraped CSV and the state store's visited places, then
+    shared by all scraper instances, so overlapping queries ("print shops in
+    atlanta" / "printing in atlanta") skip places another query already handled.
+    Names are not matched across queries: chains share them between cities
+    ("The UPS Store"), so only the place key and website domain identify a
+    business here; name dedup stays per query (MapsBusinessScraper.seen_names).
+    Place misses fall through to the state store, which also sees visits made
+    by other scraper processes since the index was loaded.
+    """
+
+    def __init__(self):
+        self.domains = set()
+        self.place_keys = set()
+        self.lookups = Counter()
+        self.hits = Counter()
+        self.loaded = False
+        self.state_store = None
+
+    def load(self, csv_dirs=DEFAULT_INDEX_DIRS, state_store=None):
+        """Fill the index from scraped CSVs and visited places (only the first call does work)"""
+        if self.loaded:
+            return self
+        self.loaded = True
+        started = time.perf_counter()
+
+        files = 0
+        for csv_dir in csv_dirs:
+            for root, _, filenames in os.walk(csv_dir):
+                for filename in filenames:
+                    if not filename.endswith(".csv"):
+                        continue
+                    try:
+                        with open(os.path.join(root, filename), mode="r", newline="", encoding="utf-8") as f:
+                            for row in csv.DictReader(f):
+                                self.add_website(row.get("website"))
+                        files += 1
+                    except Exception as e:
+                        print(f"⚠️ Could not index {filename}: {e}")
+
+        if state_store is not None:
+            try:
+                # Own connection: scrapers close theirs when their query finishes
+                self.state_store = ScraperStateStore(state_store.path)
+                self.place_keys.update(self.state_store.all_visited_keys())
+            except Exception as e:
+                print(f"⚠️ Could not index visited places: {e}")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"🗂️ Business index: {len(self.domains)} domains, "
+              f"{len(self.place_keys)} places from {files} CSV files in {elapsed_ms:.0f}ms")
+        return self
+
+    def add_place(self, place_key):
+        if place_key:
+            self.place_keys.add(place_key)
+
+    def add_website(self, website):
+        domain = normalize_domain(website)
+        if domain:
+            self.domains.add(domain)
+
+    def forget(self, place_key="", website=""):
+        """Undo add_place/add_website for a lead that could not be written"""
+        self.place_keys.discard(place_key)
+        self.domains.discard(normalize_domain(website))
+
+    def check_place(self, place_key):
+        """True if any query already visited this place (each hit is a navigation saved)"""
+        self.lookups["place"] += 1
+        if not place_key:
+            return False
+        if place_key in self.place_keys:
+            self.hits["place"] += 1
+            return True
+        if self.state_store is not None:
+            try:
+                if self.state_store.is_visited(place_key):
+                    self.place_keys.add(place_key)
+                    self.hits["place"] += 1
+                    return True
+            except Exception as e:
+                print(f"⚠️ Could not check visited place: {e}")
+        return False
+
+    def check_website(self, website):
+        """True if another query already saved a business with this website's domain"""
+        self.lookups["website"] += 1
+        domain = normalize_domain(website)
+        if domain and domain in self.domains:
+            self.hits["domain"] += 1
+            return True
+        return False
+
+    def summary(self):
+        place_lookups = self.lookups["place"]
+        website_lookups = self.lookups["website"]
+        return {
+            "place_lookups": place_lookups,
+            "place_hits": self.hits["place"],
+            "place_hit_rate": round(self.hits["place"] / place_lookups, 3) if place_lookups else 0.0,
+            "website_lookups": website_lookups,
+            "domain_hits": self.hits["domain"],
+            "domain_hit_rate": round(self.hits["domain"] / website_lookups, 3) if website_lookups else 0.0,
+        }
+
+    def print_summary(self):
+        stats = self.summary()
+        print(f"🗂️ Cross-query index: {stats['place_hits']}/{stats['place_lookups']} places already handled "
+              f"({stats['place_hit_rate']:.0%}, navigations saved), "
+              f"{stats['domain_hits']}/{stats['website_lookups']} extracted businesses already saved by domain")
+
+
+_shared_index = None
+
+
+def shared_business_index():
+    """The per-process index shared by every MapsBusinessScraper"""
+    global _shared_index
+    if _shared_index is None:
+        _shared_index = BusinessIndex()
+    return _shared_index
@@ -0,0 +1,130 @@
+import csv
+import os
+import time
+
+CSV_FIELDS = ["name", "website", "phone", "address", "rating", "review_count"]
+
+
+class StreamingCsvSink:
+    """Append-only CSV writer with an in-memory name index
+
+    The file is read once when the sink opens, new rows are buffered and
+    appended on flush(), and the file is only rewritten (compacted) on close()
+    if duplicate names were found on disk.
+    """
+
+    def __init__(self, path, fieldnames=CSV_FIELDS, flush_every=3, metrics=None):
+        self.path = path
+        self.metrics = metrics
+        self.fieldnames = fieldnames
+        self.flush_every = flush_every
+        self.names = set()
+        self.buffer = []
+        self.rows_written = 0
+        self.duplicates_skipped = 0
+        self.needs_compaction = False
+        self.file = None
+        self.writer = None
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        existing_rows = 0
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            try:
+                with open(self.path, mode="r", newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        name = (row.get("name") or "").strip().lower()
+                        if name in self.names:
+                            self.needs_compaction = True
+                        self.names.add(name)
+                        existing_rows += 1
+            except Exception as e:
+                print(f"⚠️ Could not read existing file: {e}")
+
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, mode="a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+        if new_file:
+            self.writer.writeheader()
+            self.file.flush()
+
+        print(f"📂 Opened {self.path} for streaming ({existing_rows} existing businesses)")
+        return self
+
+    def __contains__(self, name):
+        return (name or "").strip().lower() in self.names
+
+    def write(self, business):
+        """Buffer a business row; returns False if its name is already in the file"""
+        name = (business.get("name") or "").strip().lower()
+        if not name or name in self.names:
+            self.duplicates_skipped += 1
+            return False
+
+        self.names.add(name)
+        self.buffer.append(business)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Append buffered rows to the file"""
+        if not self.buffer or self.writer is None:
+            return 0
+
+        started = time.perf_counter()
+        count = len(self.buffer)
+        self.writer.writerows(self.buffer)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.metrics:
+            self.metrics.observe("csv_flush", (time.perf_counter() - started) * 1000)
+        self.buffer = []
+        self.rows_written += count
+        print(f"💾 Appended {count} businesses to {self.path} ({self.rows_written} this run)")
+        return count
+
+    def compact(self):
+        """Rewrite the file without duplicate names (atomic replace)"""
+        seen = set()
+        rows = []
+        with open(self.path, mode="r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name = (row.get("name") or "").strip().lower()
+                if name in seen:
+                    continue
+                seen.add(name)
+                rows.append(row)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.path)
+        print(f"🧹 Compacted {self.path} to {len(rows)} unique businesses")
+
+    def close(self):
+        if self.file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+        if self.needs_compaction:
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"⚠️ Could not compact {self.path}: {e}")
+            self.needs_compaction = False
+
+        print(f"💾 Results saved to {self.path}")
+        print(f"   📊 {self.rows_written} new businesses added")
+        if self.duplicates_skipped:
+            print(f"   🔄 {self.duplicates_skipped} duplicates avoided")
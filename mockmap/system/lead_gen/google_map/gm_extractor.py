@@ -20,6 +20,11 @@ django.setup()
 
 from mockmap.models import Lead   # <-- correct import for your app
 from django.db import IntegrityError
+from mockmap.system.lead_gen.google_map.request_blocking import RequestBlocker, WEBSITE_BLOCKING_PROFILE
+from mockmap.system.lead_gen.google_map.browser_service import BrowserService
+from mockmap.system.lead_gen.google_map.loop_monitor import run_monitored
+
+EXTRACTOR_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 
 # Enhanced email regex patterns
 EMAIL_PATTERNS = [
@@ -47,6 +52,11 @@ CONTACT_PAGES = [
 
 
 async def extract_emails_from_content(content):
+    """Extract emails off the event loop; the regexes can take seconds on multi-MB pages"""
+    return await asyncio.to_thread(find_emails_in_content, content)
+
+
+def find_emails_in_content(content):
     """Extract emails using multiple regex patterns"""
     print("    🔍 Starting email extraction from content...")
     emails = set()
@@ -267,20 +277,38 @@ def update_lead_with_email(lead_id, email, description):
     return lead
 
 
-async def process_database_and_scrape():
-    """Main function to process database leads and scrape websites"""
+async def process_database_and_scrape(block_resources=True, use_browser_service=False):
+    """Main function to process database leads and scrape websites
+
+    With use_browser_service the pages come from a pooled context of the
+    long-lived browser service (shared disk cache, no per-run Chromium startup),
+    and the context is swapped for a fresh one whenever it is due for recycling.
+    """
     print(f"🚀 Starting database processing and scraping...")
 
     async with async_playwright() as p:
-        print("🌐 Launching browser...")
-        browser = await p.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-dev-shm-usage']
-        )
-
-        context = await browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        )
+        service = None
+        if use_browser_service:
+            service = await BrowserService(user_agent=EXTRACTOR_USER_AGENT).connect(p)
+            browser = service
+            context = await service.acquire_context(user_agent=EXTRACTOR_USER_AGENT)
+        else:
+            print("🌐 Launching browser...")
+            browser = await p.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-dev-shm-usage']
+            )
+
+            context = await browser.new_context(
+                user_agent=EXTRACTOR_USER_AGENT
+            )
+
+        # Emails live in the HTML, so images, fonts, styles and trackers are skipped
+        request_blocker = None
+        if block_resources:
+            request_blocker = RequestBlocker(WEBSITE_BLOCKING_PROFILE)
+            # Routing would disable the service profile's HTTP cache
+            await request_blocker.install(context, keep_cache=bool(service))
 
         processed_count = 0
         successful_extractions = 0
@@ -314,6 +342,8 @@ async def process_database_and_scrape():
                 try:
                     print(f"🚀 Creating new page...")
                     page = await context.new_page()
+                    if request_blocker:
+                        await request_blocker.ready(page)
 
                     print(f"🌐 Navigating to: {url}")
                     await page.goto(url, timeout=30000, wait_until='domcontentloaded')
@@ -341,6 +371,15 @@ async def process_database_and_scrape():
                     print(f"🗑️ Closing page...")
                     await page.close()
 
+                    if service and service.should_recycle(context):
+                        print("♻️ Recycling browser context...")
+                        if request_blocker:
+                            request_blocker.uninstall(context)
+                        await service.release_context(context)
+                        context = await service.acquire_context(user_agent=EXTRACTOR_USER_AGENT)
+                        if request_blocker:
+                            await request_blocker.install(context, keep_cache=True)
+
                     # Add delay between requests to be respectful
                     print(f"⏱️ Waiting 2 seconds before next request...")
                     await asyncio.sleep(2)
@@ -354,10 +393,16 @@ async def process_database_and_scrape():
             print(f"❌ Error processing database: {e}")
         finally:
             print(f"🚫 Closing browser...")
+            if service:
+                if request_blocker:
+                    request_blocker.uninstall(context)
+                await service.release_context(context)
             await browser.close()
             print(f"\n📊 FINAL SUMMARY:")
             print(f"📊 Processed: {processed_count} websites")
             print(f"📊 Successful extractions: {successful_extractions}")
+            if request_blocker:
+                request_blocker.print_summary()
             print(
                 f"📊 Success rate: {(successful_extractions / processed_count) * 100:.1f}%" if processed_count > 0 else "0%")
             subject = "Genesis Google Map Extraction Completed "
@@ -393,7 +438,7 @@ def run_email_extractor(verbose=True):
         print("=" * 80)
         print("\n🚀 Starting scraping process...")
 
-    return asyncio.run(process_database_and_scrape())
+    return run_monitored(process_database_and_scrape())
 
 
 import argparse
@@ -1,17 +1,12 @@
-import csv
-import json
 import time
 import os
 import asyncio
+from collections import Counter, deque
 from urllib.parse import urlparse, parse_qs, unquote
 
 from urllib.parse import quote, urlparse, unquote
 from playwright.sync_api import sync_playwright
-import re
 import sys
-from django.db import IntegrityError
-from asgiref.sync import sync_to_async
-from django.db import IntegrityError
 sys.stdout.reconfigure(encoding='utf-8')
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 APP_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../../.."))
@@ -22,25 +17,354 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 import django
 django.setup()
 
-from mockmap.models import Lead   # <-- correct import for your app
-from django.db import IntegrityError
+from mockmap.system.lead_gen.google_map.maps_network import MapsResponseCollector
+from mockmap.system.lead_gen.google_map.request_blocking import RequestBlocker, MAPS_BLOCKING_PROFILE
+from mockmap.system.lead_gen.google_map.adaptive_waits import AdaptiveWaiter
+from mockmap.system.lead_gen.google_map.place_ids import canonical_place_key
+from mockmap.system.lead_gen.google_map.state_store import ScraperStateStore, DEFAULT_STATE_DB
+from mockmap.system.lead_gen.google_map.csv_sink import StreamingCsvSink
+from mockmap.system.lead_gen.google_map.lead_writer import BufferedLeadWriter
+from mockmap.system.lead_gen.google_map.business_index import shared_business_index
+from mockmap.system.lead_gen.google_map.browser_service import BrowserService
+from mockmap.system.lead_gen.google_map.sharded_launcher import run_sharded
+from mockmap.system.lead_gen.google_map.grid_tiling import GridPlanner, DEFAULT_CELL_KM, geocode_bounds, cell_search_url
+from mockmap.system.lead_gen.google_map.selector_stats import SelectorStats
+from mockmap.system.lead_gen.google_map.replay import PageRecorder, DEFAULT_FIXTURES_DIR
+from mockmap.system.lead_gen.google_map.run_metrics import RunMetrics, DEFAULT_METRICS_DIR, shared_metrics_exporter
+from mockmap.system.lead_gen.google_map.loop_monitor import run_monitored
+from mockmap.system.lead_gen.google_map.rate_limiter import NavigationRateLimiter
+from mockmap.system.lead_gen.google_map.recrawl import (
+    RecrawlScheduler, DEFAULT_MAX_AGE_DAYS, DEFAULT_MIN_AGE_DAYS, snapshot_row,
+)
+from mockmap.system.lead_gen.google_map.text_extraction import (
+    WEBSITE_SOURCE_PATTERNS, clean_phone, extract_address, extract_phone, extract_rating, extract_review_count,
+    is_valid_phone, is_valid_website,
+)
+
+
+# Any of these on the page means a place detail view has rendered
+DETAIL_INDICATORS = [
+    'h1.DUwDvf',
+    '[data-attrid="title"]',
+    '.qrShPb',
+    '.SPZz6b h1',
+    'button[jsaction*="directions"]',
+    'button[aria-label*="Call"]',
+]
+
+FEED_SELECTOR = 'div[role="feed"]'
+CONSENT_SELECTORS = ['button:has-text("Accept all")', 'button:has-text("I agree")', 'button:has-text("Accept")']
+
+# Only the most recent results are kept in memory; the CSV sink holds the rest
+RESULTS_WINDOW = 200
+
+# Fields a feed card must provide before its detail page can be skipped
+REQUIRED_FEED_FIELDS = ("name", "website", "phone")
+
+# Search URLs are built on this; the load benchmark points it at a local synthetic server
+MAPS_BASE_URL = "https://www.google.com"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Single round-trip feed collector. The first call installs a seen-set and a
+# MutationObserver on the feed; every call then drains only the hrefs added
+# since the previous call and reports whether Maps shows its end-of-list marker.
+# With harvest enabled it also reads name, rating, reviews, website and phone
+# from each new result card so detail pages can be skipped.
+DISCOVERY_JS = """
+(feed, harvest) => {
+    const SELECTOR = 'a[href*="/maps/place/"]';
+    let state = window.__mockmapDiscovery;
+    if (!state || state.feed !== feed) {
+        if (state && state.observer) state.observer.disconnect();
+        state = {feed: feed, seen: new Set(), anchors: new Map(), pending: [], observer: null};
+        const take = (a) => {
+            const href = a.getAttribute('href');
+            if (href && !state.seen.has(href)) {
+                state.seen.add(href);
+                state.anchors.set(href, a);
+                state.pending.push(href);
+            }
+        };
+        const scan = (node) => {
+            if (node.nodeType !== 1) return;
+            if (node.matches(SELECTOR)) take(node);
+            node.querySelectorAll(SELECTOR).forEach(take);
+        };
+        state.observer = new MutationObserver((mutations) => {
+            for (const m of mutations) {
+                if (m.type === 'attributes') scan(m.target);
+                m.addedNodes.forEach(scan);
+            }
+        });
+        state.observer.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['href']});
+        document.querySelectorAll(SELECTOR).forEach(take);
+        window.__mockmapDiscovery = state;
+    }
+    const fresh = state.pending;
+    state.pending = [];
+    const textOf = (root, selector) => {
+        const el = root.querySelector(selector);
+        return el ? (el.textContent || '').trim() : '';
+    };
+    const cards = !harvest ? [] : fresh.map((href) => {
+        const a = state.anchors.get(href);
+        const card = (a && (a.closest('div.Nv2PK') || a.closest('[role="article"]') || a.parentElement)) || null;
+        if (!card) return {href: href};
+        const site = card.querySelector('a[data-value="Website"], a.lcr4fd, a[aria-label*="Website"]');
+        return {
+            href: href,
+            name: (a.getAttribute('aria-label') || textOf(card, '.qBF1Pd') || '').trim(),
+            rating: textOf(card, '.MW4etd'),
+            reviews: textOf(card, '.UY7F9'),
+            website: site ? site.getAttribute('href') : '',
+            phone: textOf(card, '.UsdlK'),
+            text: (card.innerText || card.textContent || '').slice(0, 1000),
+        };
+    });
+    let reachedEnd = !!feed.querySelector('span.HlvSq');
+    if (!reachedEnd) {
+        const tail = Array.from(feed.children).slice(-3);
+        reachedEnd = tail.some((el) => /reached the end of the list/i.test(el.textContent || ''));
+    }
+    return {
+        hrefs: fresh,
+        cards: cards,
+        total: state.seen.size,
+        end: reachedEnd,
+        count: feed.querySelectorAll(SELECTOR).length,
+        scrollTop: feed.scrollTop,
+        scrollHeight: feed.scrollHeight,
+        clientHeight: feed.clientHeight,
+    };
+}
+"""
+
+
+# Selector strategies for extract_business_info, tried in order. Playwright's
+# ':has-text("...")' suffix is supported by EXTRACTION_JS as a text filter.
+EXTRACTION_SELECTORS = {
+    "name": [
+        'h1.DUwDvf',
+        'h1[data-attrid="title"]',
+        'h1.x3AX1-LfntMc-header-title-title',
+        'h1',
+        '[data-attrid="title"]',
+        '.x3AX1-LfntMc-header-title-title',
+        '.DUwDvf',
+        '.qrShPb',
+        '.SPZz6b h1'
+    ],
+    "website": [
+        'a[data-item-id="authority"]',
+        'a[data-item-id*="website"]',
+        'a[jsaction*="website"]',
+        'a[aria-label*="Website"]',
+        'a[data-value="Website"]',
+        'a[href*="http"]:has-text("Website")',
+        '.AeaXub a[href*="http"]',
+        '.RcCsl a[href*="http"]',
+        '.CsEnBe a[href*="http"]',
+        '.lcr4fd a[href*="http"]'
+    ],
+    "phone": [
+        'button[data-item-id="phone:tel:"]',
+        'button[aria-label*="Call"]',
+        'a[href^="tel:"]',
+        'button[jsaction*="phone"]',
+        '[data-item-id*="phone"]',
+        'button:has-text("Call")',
+        '.rogA2c button',
+        '.AeaXub button[data-item-id*="phone"]',
+        '.RcCsl button[aria-label*="Call"]',
+        '.CsEnBe a[href^="tel:"]',
+        '.lcr4fd button[data-item-id*="phone"]',
+        'span:has-text("+")',
+        'span[jsaction*="phone"]'
+    ],
+    "address": [
+        'button[data-item-id="address"]',
+        'button[data-value="Address"]',
+        'button[aria-label*="Address"]',
+        '[data-item-id="address"]',
+        'button[jsaction*="address"]',
+        '.AeaXub button[data-item-id="address"]',
+        '.RcCsl button[data-value="Address"]',
+        '.CsEnBe [data-item-id="address"]',
+        '.lcr4fd button[data-item-id="address"]',
+        'button:has-text("Directions")',
+        'a[href*="directions"]',
+        'button[aria-label*="Get directions"]',
+        '.Io6YTe',
+        '.LrzXr',
+        '.rogA2c',
+        '.AeaXub .fontBodyMedium',
+        'span[jstcache*="address"]',
+        'div[jsaction*="address"]'
+    ],
+    "rating": [
+        'span[aria-label*="stars"]',
+        '.MW4etd'
+    ],
+    "reviews": [
+        'span:has-text("review")',
+        'span:has-text("reviews")'
+    ],
+    "links": 'a[href*="http"]',
+    "per_selector": 3,
+    "max_links": 50,
+}
+
+# Evaluates every selector strategy in the page and returns raw candidates
+# (href, aria-label, data attributes, text) for the Python-side validators,
+# plus per-selector timings for the adaptive selector ordering.
+EXTRACTION_JS = """
+(config) => {
+    const HAS_TEXT = /^(.*):has-text\\("(.*)"\\)$/;
+    const timings = [];
+    const timedQuery = (field, selector) => {
+        const started = performance.now();
+        const nodes = query(selector);
+        timings.push([field, selector, performance.now() - started, nodes.length]);
+        return nodes;
+    };
+    const query = (selector) => {
+        const m = selector.match(HAS_TEXT);
+        const css = m ? (m[1] || '*') : selector;
+        let nodes;
+        try {
+            nodes = Array.from(document.querySelectorAll(css));
+        } catch (e) {
+            return [];
+        }
+        if (m) {
+            const needle = m[2].toLowerCase();
+            nodes = nodes.filter((el) => (el.textContent || '').toLowerCase().includes(needle));
+        }
+        return nodes;
+    };
+    const text = (el) => ((el.innerText || el.textContent || '') + '').trim();
+    const candidates = (field) => {
+        const out = [];
+        for (const selector of config[field]) {
+            for (const el of timedQuery(field, selector).slice(0, config.per_selector)) {
+                out.push({
+                    selector: selector,
+                    href: el.getAttribute('href'),
+                    aria: el.getAttribute('aria-label'),
+                    itemId: el.getAttribute('data-item-id'),
+                    value: el.getAttribute('data-value'),
+                    text: text(el),
+                });
+            }
+        }
+        return out;
+    };
+    const firstText = (field) => {
+        for (const selector of config[field]) {
+            const el = timedQuery(field, selector)[0];
+            if (el) {
+                const value = text(el);
+                if (value) return [value, selector];
+            }
+        }
+        return ['', null];
+    };
+    const [name, nameSelector] = firstText('name');
+    const [rating, ratingSelector] = firstText('rating');
+    const [reviews, reviewsSelector] = firstText('reviews');
+    return {
+        url: location.href,
+        name: name,
+        nameSelector: nameSelector,
+        website: candidates('website'),
+        phone: candidates('phone'),
+        address: candidates('address'),
+        rating: rating,
+        ratingSelector: ratingSelector,
+        reviews: reviews,
+        reviewsSelector: reviewsSelector,
+        links: Array.from(document.querySelectorAll(config.links))
+            .slice(0, config.max_links)
+            .map((a) => a.getAttribute('href')),
+        timings: timings,
+    };
+}
+"""
 
 
 class MapsBusinessScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, workers=1, isolate_worker_contexts=False, pipeline=False,
+                 feed_harvest=False, required_feed_fields=REQUIRED_FEED_FIELDS, extraction_backend="dom",
+                 block_resources=True, wait_timeouts=None, state_db=DEFAULT_STATE_DB,
+                 db_batch_size=20, business_index=None, record_fixtures=False,
+                 fixtures_dir=DEFAULT_FIXTURES_DIR, maps_base_url=MAPS_BASE_URL, metrics_port=None,
+                 metrics_dir=DEFAULT_METRICS_DIR, rate_limit=True):
         self.headless = headless
-        self.results = []
+        self.maps_base_url = maps_base_url.rstrip("/")
+        # Visited places, scroll positions and pagination live in one SQLite store
+        self.state_store = ScraperStateStore(state_db)
+        # Clean sweep concurrency: number of pages pulling from the shared URL queue
+        self.workers = max(1, workers)
+        self.isolate_worker_contexts = isolate_worker_contexts
+        # Stream discovered URLs to the workers while the feed is still scrolling
+        self.pipeline = pipeline
+        self.queued_places = set()
+        # Read business fields from feed cards; visit detail pages only when one is missing
+        self.feed_harvest = feed_harvest
+        self.required_feed_fields = tuple(required_feed_fields)
+        self.feed_data = {}
+        self.detail_pages_skipped = 0
+        # "network" parses place data from Maps XHR responses and falls back to the DOM
+        self.extraction_backend = extraction_backend
+        self.response_collector = MapsResponseCollector() if extraction_backend == "network" else None
+        self.network_extractions = 0
+        # Abort images, fonts, map tiles and trackers; none of them affect extraction
+        self.request_blocker = RequestBlocker(MAPS_BLOCKING_PROFILE) if block_resources else None
+        # Navigations draw from a token bucket shared (via the state store) by every page and process
+        self.rate_limiter = NavigationRateLimiter(self.state_store) if rate_limit else None
+        # Readiness-signal waits with per-step timeouts and observed durations
+        self.waiter = AdaptiveWaiter(wait_timeouts)
+        # Selector hit rates from earlier runs decide the order selectors are tried in
+        self.selector_stats = SelectorStats(self.state_store)
+        # Save rendered detail and feed pages for the offline replay benchmark
+        self.recorder = PageRecorder(fixtures_dir) if record_fixtures else None
+        # Stage timings, outcome counters and queue depths; saved as JSON at the end of a run
+        self.metrics = RunMetrics()
+        self.metrics_dir = metrics_dir
+        if metrics_port:
+            try:
+                shared_metrics_exporter(metrics_port).register(self.metrics)
+            except Exception as e:
+                print(f"⚠️ Could not serve metrics on port {metrics_port}: {e}")
+        self.save_lock = asyncio.Lock()
+        self.processed_count = 0
+        self.results = deque(maxlen=RESULTS_WINDOW)
+        self.saved_count = 0
+        self.csv_sink = None
+        # Leads are checked against a preloaded domain set and written in batches
+        self.lead_writer = BufferedLeadWriter(batch_size=db_batch_size, metrics=self.metrics)
         self.seen_names = set()
-        self.visited_urls = set()
+        # Names, domains and places already handled by any query in this process
+        self.business_index = business_index if business_index is not None else shared_business_index()
+        # Dedup sets hold canonical place keys (see place_ids), not raw hrefs
+        self.visited_places = set()
+        # Appended to the state store on the next save; places with a buffered lead
+        # wait for its batch to commit (their key travels with the lead)
+        self.unsaved_visits = []
+        # Per-place timestamps and field hashes for incremental recrawls, saved with the visits
+        self.unsaved_snapshots = []
+        self.snapshot_changes = Counter()
+        self.places_changed = 0
         self.skipped_cards = []  # Track skipped cards
         #self.visited_urls_file = "csv-json/google_map_urls.json"
 
         self.current_query = ""
-        self.visited_urls_file = ""  # Will be set per query
+        self.visited_urls_file = ""  # Legacy JSON history, imported into the store once
 
         self.pagination_state_file = "csv-json/pagination_state.json"
         self.pagination_state = {}
-        self.all_discovered_urls = set()  # Track all URLs discovered during scraping
+        self.discovered_places = set()  # Track all places discovered during scraping
         self.load_visited_urls()
         self.load_pagination_state()
 
@@ -55,12 +379,10 @@ class MapsBusinessScraper:
     def load_deep_scroll_state(self):
         """Load deep scroll state to continue from where we left off"""
         try:
-            if os.path.exists(self.deep_scroll_state_file):
-                with open(self.deep_scroll_state_file, 'r') as f:
-                    self.deep_scroll_state = json.load(f)
+            self.state_store.import_legacy_scroll_state(self.deep_scroll_state_file)
+            self.deep_scroll_state = self.state_store.load_scroll_states()
+            if self.deep_scroll_state:
                 print(f"📂 Loaded deep scroll state for {len(self.deep_scroll_state)} queries")
-            else:
-                self.deep_scroll_state = {}
         except Exception as e:
             print(f"⚠️ Error loading deep scroll state: {e}")
             self.deep_scroll_state = {}
@@ -68,30 +390,26 @@ class MapsBusinessScraper:
     def save_deep_scroll_state(self, query):
         """Save deep scroll state to continue later"""
         try:
-            os.makedirs(os.path.dirname(self.deep_scroll_state_file), exist_ok=True)
             self.deep_scroll_state[query] = {
                 'max_scroll_position': self.max_scroll_position,
-                'last_discovered_count': len(self.all_discovered_urls),
+                'last_discovered_count': len(self.discovered_places),
                 'timestamp': time.time()
             }
-            with open(self.deep_scroll_state_file, 'w') as f:
-                json.dump(self.deep_scroll_state, f, indent=2)
+            self.state_store.save_scroll_state(query, self.max_scroll_position, len(self.discovered_places))
             print(f"💾 Saved deep scroll state for '{query}' at position {self.max_scroll_position}")
         except Exception as e:
             print(f"⚠️ Error saving deep scroll state: {e}")
 
 
     def load_existing_businesses(self, csv_file):
-        """Load existing business names from CSV file to avoid re-scraping"""
+        """Open the streaming CSV sink and seed seen_names from the names already in it"""
         try:
-            if os.path.exists(csv_file):
-                with open(csv_file, mode="r", newline="", encoding="utf-8") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        self.seen_names.add(row['name'].strip().lower())
-                print(f"📂 Loaded {len(self.seen_names)} existing business names from {csv_file}")
-            else:
-                print(f"📂 No existing CSV file found ({csv_file}), starting fresh")
+            if self.csv_sink and self.csv_sink.path != csv_file:
+                self.csv_sink.close()
+            if not self.csv_sink or self.csv_sink.file is None:
+                self.csv_sink = StreamingCsvSink(csv_file, metrics=self.metrics).open()
+            self.seen_names.update(self.csv_sink.names)
+            print(f"📂 Loaded {len(self.seen_names)} existing business names from {csv_file}")
         except Exception as e:
             print(f"⚠️ Error loading existing businesses: {e}")
 
@@ -99,34 +417,35 @@ class MapsBusinessScraper:
         """Set file paths specific to this query"""
         safe_query = query.replace(' ', '_').replace('/', '_')
         self.current_query = query
+        self.metrics.run = query
         self.visited_urls_file = f"csv-json/visited/visited_urls_{safe_query}.json"
 
     def load_visited_urls(self):
-        """Load previously visited URLs from file"""
-        if not self.visited_urls_file:
+        """Load previously visited places for the current query from the state store"""
+        if not self.current_query:
             return
 
         try:
-            if os.path.exists(self.visited_urls_file):
-                with open(self.visited_urls_file, 'r') as f:
-                    self.visited_urls = set(json.load(f))
-                print(f"📂 Loaded {len(self.visited_urls)} previously visited URLs")
+            # Older JSON files hold full hrefs; canonical_place_key maps both forms
+            self.state_store.import_legacy_visited(self.current_query, self.visited_urls_file, canonical_place_key)
+            self.visited_places = self.state_store.visited_for_query(self.current_query)
+            self.unsaved_visits = []
+            if self.visited_places:
+                print(f"📂 Loaded {len(self.visited_places)} previously visited places")
             else:
-                self.visited_urls = set()
                 print("📂 No previous URL history found, starting fresh")
         except Exception as e:
             print(f"⚠️ Error loading visited URLs: {e}")
-            self.visited_urls = set()
+            self.visited_places = set()
 
     def load_pagination_state(self):
         """Load pagination state to continue from where we left off"""
         try:
-            if os.path.exists(self.pagination_state_file):
-                with open(self.pagination_state_file, 'r') as f:
-                    self.pagination_state = json.load(f)
+            self.state_store.import_legacy_pagination_state(self.pagination_state_file)
+            self.pagination_state = self.state_store.load_pagination_states()
+            if self.pagination_state:
                 print(f"📂 Loaded pagination state for {len(self.pagination_state)} queries")
             else:
-                self.pagination_state = {}
                 print("📂 No pagination state found, starting fresh")
         except Exception as e:
             print(f"⚠️ Error loading pagination state: {e}")
@@ -135,44 +454,53 @@ class MapsBusinessScraper:
     def save_pagination_state(self):
         """Save pagination state to continue later"""
         try:
-            os.makedirs(os.path.dirname(self.pagination_state_file), exist_ok=True)
-            with open(self.pagination_state_file, 'w') as f:
-                json.dump(self.pagination_state, f, indent=2)
-            print(f"💾 Saved pagination state to {self.pagination_state_file}")
+            for query, state in self.pagination_state.items():
+                self.state_store.save_pagination_state(query, state)
+            print(f"💾 Saved pagination state for {len(self.pagination_state)} queries")
         except Exception as e:
             print(f"⚠️ Error saving pagination state: {e}")
 
-    def save_visited_urls(self):
-        """Save visited URLs to file with duplicate prevention"""
-        try:
-            os.makedirs(os.path.dirname(self.visited_urls_file), exist_ok=True)
-
-            # Load existing URLs from file
-            existing_urls = set()
-            if os.path.exists(self.visited_urls_file):
-                try:
-                    with open(self.visited_urls_file, 'r') as f:
-                        existing_urls = set(json.load(f))
-                except:
-                    existing_urls = set()
-
-            # Merge with current visited URLs (set automatically handles duplicates)
-            merged_urls = existing_urls.union(self.visited_urls)
-
-            # Save the merged set
-            with open(self.visited_urls_file, 'w') as f:
-                json.dump(sorted(list(merged_urls)), f, indent=2)
+    def mark_visited(self, place_key, persist=True):
+        """Record a visited place in memory; with persist it is saved to the store on the next save"""
+        if not place_key:
+            return
+        self.visited_places.add(place_key)
+        if persist:
+            self.unsaved_visits.append(place_key)
 
-            new_urls_count = len(merged_urls) - len(existing_urls)
-            print(f"💾 Saved {len(merged_urls)} visited URLs to {self.visited_urls_file}")
-            print(f"   📊 {new_urls_count} new URLs added, {len(existing_urls)} existing URLs preserved")
+    def save_visited_urls(self):
+        """Append places visited since the last save to the state store"""
+        self.save_place_snapshots()
+        if not self.unsaved_visits:
+            return
 
-            # Update the instance variable with the merged set
-            self.visited_urls = merged_urls
+        try:
+            pending = self.unsaved_visits
+            self.unsaved_visits = []
+            added = self.state_store.add_visited(self.current_query, pending)
+            print(f"💾 Saved {added} new visited places ({len(self.visited_places)} tracked for this query)")
         except Exception as e:
             print(f"⚠️ Error saving visited URLs: {e}")
+            self.unsaved_visits = pending + self.unsaved_visits
 
 
+    def save_place_snapshots(self):
+        """Store scraped places' timestamps and field hashes, counting fields that changed since last time"""
+        if not self.unsaved_snapshots:
+            return
+        pending = self.unsaved_snapshots
+        self.unsaved_snapshots = []
+        try:
+            changes = self.state_store.save_place_snapshots(pending)
+        except Exception as e:
+            print(f"⚠️ Error saving place snapshots: {e}")
+            self.unsaved_snapshots = pending + self.unsaved_snapshots
+            return
+        for changed_fields in changes.values():
+            if changed_fields:
+                self.places_changed += 1
+                self.snapshot_changes.update(changed_fields)
+
     def extract_website_from_redirect(self, redirect_url):
         """Extract the real website URL from a Google redirect"""
         try:
@@ -208,145 +536,23 @@ class MapsBusinessScraper:
 
     def is_valid_website(self, url):
         """Check if URL is a valid business website"""
-        if not url:
-            return False
-
-        # Skip Google, social media, and other non-business sites
-        skip_domains = [
-            'google.com', 'maps.google.com', 'facebook.com', 'instagram.com',
-            'twitter.com', 'linkedin.com', 'youtube.com', 'tiktok.com',
-            'yelp.com', 'tripadvisor.com', 'foursquare.com', 'pinterest.com',
-            'amazon.com', 'ebay.com', 'craigslist.org', 'wikipedia.org',
-            'apple.com', 'microsoft.com', 'android.com', 'ios.com', 'schema.org', 'compass-group.fi', 'wolt.com'
-        ]
-
-        url_lower = url.lower()
-        return not any(domain in url_lower for domain in skip_domains)
-
-
+        return is_valid_website(url)
 
     def extract_phone_from_text(self, text):
         """Extract phone number from text using regex patterns"""
-        if not text:
-            return ""
-
-        # Phone number patterns
-        phone_patterns = [
-            # International format: +1 (555) 123-4567
-            r'\+\d{1,3}\s*\(\d{3}\)\s*\d{3}[-.\s]*\d{4}',
-            # International format: +1 555-123-4567
-            r'\+\d{1,3}\s*\d{3}[-.\s]*\d{3}[-.\s]*\d{4}',
-            # US format: (555) 123-4567
-            r'\(\d{3}\)\s*\d{3}[-.\s]*\d{4}',
-            # US format: 555-123-4567
-            r'\d{3}[-.\s]*\d{3}[-.\s]*\d{4}',
-            # International with country code: +1234567890
-            r'\+\d{10,15}',
-            # Simple 10-digit: 5551234567
-            r'\b\d{10}\b',
-            # With spaces: 555 123 4567
-            r'\d{3}\s+\d{3}\s+\d{4}'
-        ]
-
-        for pattern in phone_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                cleaned = self.clean_phone(match)
-                if self.is_valid_phone(cleaned):
-                    return cleaned
-
-        return ""
-
+        return extract_phone(text)
 
     def is_valid_phone(self, phone):
         """Check if the extracted phone number is valid"""
-        if not phone:
-            return False
-
-        # Remove all non-digit characters for validation
-        digits_only = re.sub(r'\D', '', phone)
-
-        # Check if it has reasonable length (7-15 digits)
-        if len(digits_only) < 7 or len(digits_only) > 15:
-            return False
-
-        # Check if it's not all the same digit (like 1111111111)
-        if len(set(digits_only)) == 1:
-            return False
-
-        # Check if it's not a common fake number
-        fake_patterns = ['1234567890', '0000000000', '9999999999']
-        if digits_only in fake_patterns:
-            return False
-
-        return True
-
+        return is_valid_phone(phone)
 
     def clean_phone(self, phone):
         """Clean and format phone number"""
-        if not phone:
-            return ""
-
-        # Remove extra whitespace
-        phone = phone.strip()
-
-        # Remove common prefixes like "tel:"
-        if phone.startswith('tel:'):
-            phone = phone[4:]
-
-        # Basic formatting - keep the original format but clean it up
-        phone = re.sub(r'\s+', ' ', phone)  # Replace multiple spaces with single space
-
-        return phone
-
+        return clean_phone(phone)
 
     def extract_address_from_text(self, text):
         """Extract address from text using patterns"""
-        if not text or len(text.strip()) < 5:
-            return ""
-
-        text = text.strip()
-
-        # Skip obviously non-address text
-        skip_patterns = [
-            'call', 'website', 'menu', 'photos', 'reviews', 'hours',
-            'directions to', 'get directions', 'save', 'share', 'nearby'
-        ]
-
-        if any(pattern in text.lower() for pattern in skip_patterns):
-            return ""
-
-        # Common address patterns
-        address_patterns = [
-            # Full address with street number, street name, city, state, zip
-            r'\b\d+\s+[A-Za-z0-9\s,.-]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|place|pl|court|ct|circle|cir)\s*,?\s*[A-Za-z\s]+,?\s*[A-Z]{2}\s*\d{5}(?:-\d{4})?\b',
-
-            # Address with street and city/state
-            r'\b\d+\s+[A-Za-z0-9\s,.-]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|place|pl|court|ct|circle|cir)\s*,\s*[A-Za-z\s]+,?\s*[A-Z]{2}\b',
-
-            # Simple street address
-            r'\b\d+\s+[A-Za-z0-9\s,.-]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|place|pl|court|ct|circle|cir)\b',
-
-            # International address patterns
-            r'\b\d+\s+[A-Za-z0-9\s,.-]+,\s*[A-Za-z\s]+\s+\d{4,6}\b',  # International format
-        ]
-
-        for pattern in address_patterns:
-            import re
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                # Return the longest match (likely most complete address)
-                longest_match = max(matches, key=len)
-                return longest_match.strip()
-
-        # If no pattern matches, check if the text looks like an address
-        # (contains numbers and common address words)
-        if (re.search(r'\d+', text) and
-                any(word in text.lower() for word in ['street', 'st', 'avenue', 'ave', 'road', 'rd', 'drive', 'dr']) and
-                len(text) > 10 and len(text) < 200):
-            return text.strip()
-
-        return ""
+        return extract_address(text)
 
     def extract_address_from_structured_data(self, data):
         """Extract address from structured data (JSON-LD)"""
@@ -398,385 +604,211 @@ class MapsBusinessScraper:
 
     def extract_rating_from_text(self, text):
         # Extract float rating from "4.7 stars" or similar
-        match = re.search(r"([0-5]\.\d)", text)
-        return float(match.group(1)) if match else None
+        return extract_rating(text)
 
     def extract_review_count_from_text(self, text):
         # Extract number from "123 reviews"
-        match = re.search(r"([\d,]+)", text)
-        if match:
-            return int(match.group(1).replace(",", ""))
-        return None
-
-    async def extract_business_info(self, page):
-        """Extract business name and website from the current page"""
-        business_info = {"name": "", "website": "", "phone": "", "address": "", "rating": "", "review_count": ""}
+        return extract_review_count(text)
+
+    def pick_website(self, candidates, links, page_content=None, picked=None):
+        """Choose the business website from raw href candidates (picked gets the winning selector)"""
+        # Method 1: Look for website in business info panel
+        for candidate in candidates:
+            href = candidate.get("href")
+            if not href:
+                continue
 
-        try:
-            print("🔍 Extracting business name...")
-
-            name_selectors = [
-                'h1.DUwDvf',
-                'h1[data-attrid="title"]',
-                'h1.x3AX1-LfntMc-header-title-title',
-                'h1',
-                '[data-attrid="title"]',
-                '.x3AX1-LfntMc-header-title-title',
-                '.DUwDvf',
-                '.qrShPb',
-                '.SPZz6b h1'
-            ]
+            # Skip malformed JS placeholders
+            if href.startswith(':///') or href.startswith('///') or href.strip() == '/url':
+                continue
 
-            name = ""
-            for selector in name_selectors:
-                try:
-                    element = page.locator(selector).first
-                    if await element.count() > 0:
-                        name = await element.inner_text()
-                        name = name.strip()
-                        if name:
-                            print(f"✅ Found business name with selector '{selector}': {name}")
-                            break
-                except:
-                    continue
+            # Handle Google redirect URLs
+            if 'google.com/url?' in href or '/aclk?' in href or '/url?' in href:
+                extracted_url = self.extract_website_from_redirect(href)
+                if extracted_url and self.is_valid_website(extracted_url):
+                    website = self.clean_url(extracted_url)
+                    print(f"✅ Extracted website from redirect with selector '{candidate['selector']}': {website}")
+                    if picked is not None:
+                        picked["website"] = candidate["selector"]
+                    return website
 
-            if not name:
-                print("⚠️ Could not find business name, using placeholder")
-                name = "Unknown Business"
+            # Handle direct links
+            elif self.is_valid_website(href):
+                website = self.clean_url(href)
+                print(f"✅ Found direct website with selector '{candidate['selector']}': {website}")
+                if picked is not None:
+                    picked["website"] = candidate["selector"]
+                return website
+
+        # Method 2: Search page source if website not found
+        if page_content:
+            for pattern in WEBSITE_SOURCE_PATTERNS:
+                for match in pattern.findall(page_content):
+                    potential_url = match[0] if isinstance(match, tuple) else match
+                    if potential_url.startswith('http') and self.is_valid_website(potential_url):
+                        website = self.clean_url(potential_url)
+                        print(f"✅ Found website in page source: {website}")
+                        return website
+
+        # Method 3: Look through visible links as last resort
+        for href in links:
+            if not href:
+                continue
+            if any(skip in href.lower() for skip in ['maps.google', 'facebook.com', 'instagram.com']):
+                continue
+            if self.is_valid_website(href):
+                website = self.clean_url(href)
+                print(f"✅ Found website in general links: {website}")
+                return website
 
-            business_info["name"] = name
+        return ""
 
-            # Note: You'll need to convert all the other extraction methods to async as well
-            # This is a significant refactor. I'll show the pattern for website extraction:
-
-            # WEBSITE EXTRACTION (FIXED)
-            print("🔍 Extracting website...")
-            website = ""
-
-            # Method 1: Look for website in business info panel
-            website_selectors = [
-                'a[data-item-id="authority"]',
-                'a[data-item-id*="website"]',
-                'a[jsaction*="website"]',
-                'a[aria-label*="Website"]',
-                'a[data-value="Website"]',
-                'a[href*="http"]:has-text("Website")',
-                '.AeaXub a[href*="http"]',
-                '.RcCsl a[href*="http"]',
-                '.CsEnBe a[href*="http"]',
-                '.lcr4fd a[href*="http"]'
-            ]
+    def pick_phone(self, candidates, page_content=None, picked=None):
+        """Choose the phone number from raw element candidates (picked gets the winning selector)"""
+        for candidate in candidates:
+            phone = ""
+            # Check href attribute
+            href = candidate.get("href")
+            if href and href.startswith('tel:'):
+                phone_candidate = href.replace('tel:', '').strip()
+                if self.is_valid_phone(phone_candidate):
+                    print(f"✅ Found phone from tel: {phone_candidate}")
+                    phone = self.clean_phone(phone_candidate)
+
+            # Check aria-label
+            if not phone and candidate.get("aria"):
+                phone_candidate = self.extract_phone_from_text(candidate["aria"])
+                if phone_candidate:
+                    print(f"✅ Found phone from aria-label: {phone_candidate}")
+                    phone = phone_candidate
+
+            # Check data-item-id
+            data_item_id = candidate.get("itemId")
+            if not phone and data_item_id and ':tel:' in data_item_id:
+                phone_candidate = data_item_id.split(':tel:')[-1]
+                if self.is_valid_phone(phone_candidate):
+                    print(f"✅ Found phone from data-item-id: {phone_candidate}")
+                    phone = self.clean_phone(phone_candidate)
+
+            # Check inner text
+            if not phone and candidate.get("text"):
+                phone_candidate = self.extract_phone_from_text(candidate["text"])
+                if phone_candidate:
+                    print(f"✅ Found phone from text content: {phone_candidate}")
+                    phone = phone_candidate
+
+            if phone:
+                if picked is not None:
+                    picked["phone"] = candidate.get("selector")
+                return phone
+
+        if page_content:
+            phone_candidate = self.extract_phone_from_text(page_content)
+            if phone_candidate:
+                print(f"✅ Found phone in page content: {phone_candidate}")
+                return phone_candidate
 
-            for selector in website_selectors:
-                try:
-                    elements = page.locator(selector)
-                    count = await elements.count()
-                    print(f"🔹 Checking selector '{selector}' - {count} elements found")
-                    for i in range(min(count, 3)):
-                        element = elements.nth(i)
-                        href = await element.get_attribute('href')
-                        print(f"  Element {i} href: {href}")
-
-                        if not href:
-                            print("  ⚠️ No href found, skipping")
-                            continue
-
-                        # Skip malformed JS placeholders
-                        if href.startswith(':///') or href.startswith('///') or href.strip() == '/url':
-                            print(f"  ⚠️ Skipping JS placeholder or malformed href: {href}")
-                            continue
-
-                        # Handle Google redirect URLs
-                        if 'google.com/url?' in href or '/aclk?' in href or '/url?' in href:
-                            print(f"  🔄 Found redirect URL, attempting extraction: {href[:60]}...")
-                            # Method A: Try to extract from URL parameters
-                            extracted_url = self.extract_website_from_redirect(href)
-                            if extracted_url and self.is_valid_website(extracted_url):
-                                website = self.clean_url(extracted_url)
-                                print(f"  ✅ Extracted website from redirect parameters: {website}")
-                                break
-
-                            # Method B: Optional navigation (safe fallback)
-                            try:
-                                extracted_url = self.extract_website_from_redirect(href)
-                                if extracted_url and self.is_valid_website(extracted_url):
-                                    website = self.clean_url(extracted_url)
-                                    print(f"✅ Extracted website from redirect: {website}")
-                                    break
-
-                            except Exception as e:
-                                print(f"  ⚠️ Could not follow redirect: {e}")
-
-                        # Handle direct links
-                        elif self.is_valid_website(href):
-                            website = self.clean_url(href)
-                            print(f"  ✅ Found direct website: {website}")
-                            break
-                        else:
-                            print(f"  ⚠️ Invalid website URL: {href[:100]}")
-
-                    if website:
-                        print(f"🔹 Website found with selector '{selector}': {website}")
-                        break
+        return ""
 
-                except Exception as e:
-                    print(f"⚠️ Error with selector '{selector}': {e}")
+    def pick_address(self, candidates, page_url="", page_content=None, picked=None):
+        """Choose the street address from raw element candidates (picked gets the winning selector)"""
+        for candidate in candidates:
+            for source in ("aria", "text", "value"):
+                value = (candidate.get(source) or "").strip()
+                if not value:
                     continue
+                addr_candidate = self.extract_address_from_text(value)
+                if addr_candidate:
+                    print(f"✅ Found address from {source} with selector '{candidate['selector']}': {addr_candidate}")
+                    if picked is not None:
+                        picked["address"] = candidate["selector"]
+                    return addr_candidate
+
+        if 'place/' in page_url:
+            place_part = page_url.split('place/')[-1].split('/')[0]
+            addr_candidate = self.extract_address_from_text(unquote(place_part))
+            if addr_candidate:
+                print(f"✅ Found address from URL: {addr_candidate}")
+                return addr_candidate
+
+        if page_content:
+            addr_candidate = self.extract_address_from_text(page_content)
+            if addr_candidate:
+                print(f"✅ Found address in page content: {addr_candidate}")
+                return addr_candidate
 
-            # Method 2: Search page source if website not found
-            if not website:
-                print("🔍 Searching page source for website patterns...")
-                try:
-                    page_content = await page.content()
-                    url_patterns = [
-                        r'https?://(?:www\.)?([a-zA-Z0-9-]+\.(?:com|org|net|edu|gov|co|io|biz|info))',
-                        r'"(https?://[^"]*\.(com|org|net|edu|gov|co|io|biz|info)[^"]*)"',
-                        r'url=(https?://[^&]*)'
-                    ]
-                    for pattern in url_patterns:
-                        matches = re.findall(pattern, page_content, re.IGNORECASE)
-                        for match in matches:
-                            potential_url = match[0] if isinstance(match, tuple) else match
-                            if potential_url.startswith('http') and self.is_valid_website(potential_url):
-                                website = self.clean_url(potential_url)
-                                print(f"✅ Found website in page source: {website}")
-                                break
-                        if website:
-                            break
-                except Exception as e:
-                    print(f"⚠️ Error searching page source: {e}")
-
-            # Method 3: Look through visible links as last resort
-            if not website:
-                print("🔍 Searching through all visible links...")
-                try:
-                    links = page.locator('a[href*="http"]')
-                    link_count = await links.count()
-                    link_count = min(link_count, 50)
-                    for i in range(link_count):
-                        try:
-                            href = await links.nth(i).get_attribute('href')
-                            if not href:
-                                continue
-                            if any(skip in href.lower() for skip in ['maps.google', 'facebook.com', 'instagram.com']):
-                                continue
-                            if self.is_valid_website(href):
-                                website = self.clean_url(href)
-                                print(f"✅ Found website in general links: {website}")
-                                break
-                        except Exception as e:
-                            print(f"  ⚠️ Error reading link {i}: {e}")
-                except Exception as e:
-                    print(f"⚠️ Error searching links: {e}")
+        return ""
 
-            if not website:
-                print("⚠️ No website found for this business")
+    async def extract_business_info(self, page):
+        """Extract business details from the current page in a single in-page pass
 
-            business_info["website"] = website
+        EXTRACTION_JS evaluates every selector in EXTRACTION_SELECTORS and
+        returns the raw candidates in one round-trip; the Python helpers then
+        apply the same validation rules as before. The full page source is
+        only fetched when a field has no usable candidate. Selector lists are
+        ordered by their recorded hit rates, and this page's hits are recorded.
+        """
+        business_info = {"name": "", "website": "", "phone": "", "address": "", "rating": "", "review_count": ""}
 
+        started = time.perf_counter()
+        try:
+            raw = await page.evaluate(EXTRACTION_JS, self.selector_stats.ordered_config(EXTRACTION_SELECTORS))
+        except Exception as e:
+            print(f"⚠️ Error extracting business info: {e}")
+            return business_info
 
-            # Continue with phone, address, rating extraction...
-            # PHONE
-            # -------------------
-            print("🔍 Extracting phone number...")
-            phone_selectors = [
-                'button[data-item-id="phone:tel:"]',
-                'button[aria-label*="Call"]',
-                'a[href^="tel:"]',
-                'button[jsaction*="phone"]',
-                '[data-item-id*="phone"]',
-                'button:has-text("Call")',
-                '.rogA2c button',
-                '.AeaXub button[data-item-id*="phone"]',
-                '.RcCsl button[aria-label*="Call"]',
-                '.CsEnBe a[href^="tel:"]',
-                '.lcr4fd button[data-item-id*="phone"]',
-                'span:has-text("+")',
-                'span[jsaction*="phone"]'
-            ]
+        try:
+            name = (raw.get("name") or "").strip()
+            if name:
+                print(f"✅ Found business name with selector '{raw.get('nameSelector')}': {name}")
+            else:
+                print("⚠️ Could not find business name, using placeholder")
+                name = "Unknown Business"
+            business_info["name"] = name
 
-            phone = ""
-            for selector in phone_selectors:
-                try:
-                    elements = page.locator(selector)
-                    count = await elements.count()
-                    for i in range(min(count, 3)):
-                        element = elements.nth(i)
-
-                        # Check href attribute
-                        href = await element.get_attribute('href')
-                        if href and href.startswith('tel:'):
-                            phone_candidate = href.replace('tel:', '').strip()
-                            if self.is_valid_phone(phone_candidate):
-                                phone = self.clean_phone(phone_candidate)
-                                print(f"✅ Found phone from tel: {phone}")
-                                break
-
-                        # Check aria-label
-                        aria_label = await element.get_attribute('aria-label')
-                        if aria_label:
-                            phone_candidate = self.extract_phone_from_text(aria_label)
-                            if phone_candidate:
-                                phone = phone_candidate
-                                print(f"✅ Found phone from aria-label: {phone}")
-                                break
-
-                        # Check data-item-id
-                        data_item_id = await element.get_attribute('data-item-id')
-                        if data_item_id and ':tel:' in data_item_id:
-                            phone_candidate = data_item_id.split(':tel:')[-1]
-                            if self.is_valid_phone(phone_candidate):
-                                phone = self.clean_phone(phone_candidate)
-                                print(f"✅ Found phone from data-item-id: {phone}")
-                                break
-
-                        # Check inner text
-                        text_content = await element.inner_text()
-                        if text_content:
-                            phone_candidate = self.extract_phone_from_text(text_content)
-                            if phone_candidate:
-                                phone = phone_candidate
-                                print(f"✅ Found phone from text content: {phone}")
-                                break
-                    if phone:
-                        break
-                except Exception as e:
-                    print(f"⚠️ Error with phone selector '{selector}': {e}")
-                    continue
+            page_url = raw.get("url") or ""
+            picked = {
+                "name": raw.get("nameSelector"),
+                "rating": raw.get("ratingSelector"),
+                "reviews": raw.get("reviewsSelector"),
+            }
+            website = self.pick_website(raw.get("website") or [], [], picked=picked)
+            phone = self.pick_phone(raw.get("phone") or [], picked=picked)
+            address = self.pick_address(raw.get("address") or [], page_url, picked=picked)
+            self.selector_stats.record_page(raw.get("timings"), picked)
 
-            if not phone:
-                print("🔍 Searching page content for phone...")
+            # Fallback: one page-source fetch shared by every missing field
+            if not (website and phone and address):
                 try:
                     page_content = await page.content()
-                    phone_candidate = self.extract_phone_from_text(page_content)
-                    if phone_candidate:
-                        phone = phone_candidate
-                        print(f"✅ Found phone in page content: {phone}")
                 except Exception as e:
-                    print(f"⚠️ Error searching page content for phone: {e}")
-
-            business_info["phone"] = phone or "Not found"
-
+                    print(f"⚠️ Error reading page content: {e}")
+                    page_content = ""
+                if not website:
+                    website = self.pick_website([], raw.get("links") or [], page_content)
+                if not phone:
+                    phone = self.pick_phone([], page_content)
+                if not address:
+                    address = self.pick_address([], "", page_content)
 
+            if not website:
+                print("⚠️ No website found for this business")
 
-        # ADDRESS EXTRACTION
-            # ADDRESS
-            # -------------------
-            print("🔍 Extracting address...")
-            address_selectors = [
-                'button[data-item-id="address"]',
-                'button[data-value="Address"]',
-                'button[aria-label*="Address"]',
-                '[data-item-id="address"]',
-                'button[jsaction*="address"]',
-                '.AeaXub button[data-item-id="address"]',
-                '.RcCsl button[data-value="Address"]',
-                '.CsEnBe [data-item-id="address"]',
-                '.lcr4fd button[data-item-id="address"]',
-                'button:has-text("Directions")',
-                'a[href*="directions"]',
-                'button[aria-label*="Get directions"]',
-                '.Io6YTe',
-                '.LrzXr',
-                '.rogA2c',
-                '.AeaXub .fontBodyMedium',
-                'span[jstcache*="address"]',
-                'div[jsaction*="address"]'
-            ]
-
-            address = ""
-            for selector in address_selectors:
-                try:
-                    elements = page.locator(selector)
-                    count = await elements.count()
-                    for i in range(min(count, 3)):
-                        element = elements.nth(i)
-
-                        # aria-label
-                        aria_label = await element.get_attribute('aria-label')
-                        if aria_label:
-                            addr_candidate = self.extract_address_from_text(aria_label)
-                            if addr_candidate:
-                                address = addr_candidate
-                                print(f"✅ Found address from aria-label: {address}")
-                                break
-
-                        # text content
-                        text_content = (await element.inner_text()).strip()
-                        if text_content:
-                            addr_candidate = self.extract_address_from_text(text_content)
-                            if addr_candidate:
-                                address = addr_candidate
-                                print(f"✅ Found address from text: {address}")
-                                break
-
-                        # data-value
-                        data_value = await element.get_attribute('data-value')
-                        if data_value:
-                            addr_candidate = self.extract_address_from_text(data_value)
-                            if addr_candidate:
-                                address = addr_candidate
-                                print(f"✅ Found address from data-value: {address}")
-                                break
-                    if address:
-                        break
-                except Exception as e:
-                    print(f"⚠️ Error with address selector '{selector}': {e}")
-                    continue
-
-            if not address:
-                print("🔍 Searching URL and page data for address...")
-                try:
-                    import urllib.parse
-                    parsed_url = urllib.parse.urlparse(page.url)
-                    if 'place/' in page.url:
-                        place_part = page.url.split('place/')[-1].split('/')[0]
-                        decoded_place = urllib.parse.unquote(place_part)
-                        addr_candidate = self.extract_address_from_text(decoded_place)
-                        if addr_candidate:
-                            address = addr_candidate
-                            print(f"✅ Found address from URL: {address}")
-                except Exception as e:
-                    print(f"⚠️ Error extracting from URL: {e}")
-
-            if not address:
-                print("🔍 Searching page content for address patterns...")
-                try:
-                    page_content = await page.content()
-                    addr_candidate = self.extract_address_from_text(page_content)
-                    if addr_candidate:
-                        address = addr_candidate
-                        print(f"✅ Found address in page content: {address}")
-                except Exception as e:
-                    print(f"⚠️ Error searching page content for address: {e}")
-
+            business_info["website"] = website
+            business_info["phone"] = phone or "Not found"
             business_info["address"] = address or "No address found"
 
             # RATING AND REVIEW COUNT
-            # -------------------
-            print("🔍 Extracting rating and review count...")
-            rating = ""
-            review_count = ""
-            try:
-                rating_element = page.locator('span[aria-label*="stars"], .MW4etd').first
-                if await rating_element.count() > 0:
-                    rating_text = await rating_element.inner_text()
-                    rating = self.extract_rating_from_text(rating_text)
-                    print(f"✅ Found rating: {rating}")
-
-                review_element = page.locator('span:has-text("review"), span:has-text("reviews")').first
-                if await review_element.count() > 0:
-                    review_text = await review_element.inner_text()
-                    review_count = self.extract_review_count_from_text(review_text)
-                    print(f"✅ Found review count: {review_count}")
-            except Exception as e:
-                print(f"⚠️ Error extracting rating/reviews: {e}")
-
+            rating = self.extract_rating_from_text(raw.get("rating") or "")
+            review_count = self.extract_review_count_from_text(raw.get("reviews") or "")
             business_info["rating"] = rating or "Not found"
             business_info["review_count"] = review_count or "Not found"
         except Exception as e:
             print(f"⚠️ Error extracting business info: {e}")
 
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.observe("extraction", elapsed_ms)
+        print(f"⏱️ Extracted business info in {elapsed_ms:.0f}ms")
         return business_info
 
 
@@ -784,16 +816,7 @@ class MapsBusinessScraper:
     async def verify_detail_page_loaded(self, page, business_name=""):
         """Verify that the business detail page has actually loaded"""
         try:
-            detail_indicators = [
-                'h1.DUwDvf',
-                '[data-attrid="title"]',
-                '.qrShPb',
-                '.SPZz6b h1',
-                'button[jsaction*="directions"]',
-                'button[aria-label*="Call"]',
-            ]
-
-            for indicator in detail_indicators:
+            for indicator in DETAIL_INDICATORS:
                 if await page.locator(indicator).count() > 0:
                     print(f"✅ Detail page loaded - found indicator: {indicator}")
                     return True
@@ -805,7 +828,7 @@ class MapsBusinessScraper:
             print(f"⚠️ Error verifying detail page: {e}")
             return False
 
-    def safe_click_card(self, card, card_index):
+    async def safe_click_card(self, card, card_index):
         """Safely click a card with multiple attempts and verification"""
         max_attempts = 3
 
@@ -815,49 +838,70 @@ class MapsBusinessScraper:
 
                 # Scroll card into view
                 print("📍 Scrolling card into view...")
-                card.scroll_into_view_if_needed()
-                time.sleep(1)
+                await card.scroll_into_view_if_needed()
 
                 # Ensure card is clickable
-                card.wait_for(state='visible', timeout=5000)
+                await card.wait_for(state='visible', timeout=5000)
 
                 # Get card URL for verification
-                card_url = card.get_attribute('href')
+                card_url = await card.get_attribute('href')
                 print(f"🔗 Card URL: {card_url}")
 
                 # Click the card
-                card.click()
+                await card.click()
 
-                # Wait for page to load
-                time.sleep(3)
+                # Wait for the detail view instead of a fixed sleep
+                await self.waiter.for_selector(card.page, DETAIL_INDICATORS, "detail_loaded")
 
                 # Verify the detail page loaded
-                if self.verify_detail_page_loaded(card.page):
+                if await self.verify_detail_page_loaded(card.page):
                     print(f"✅ Card {card_index} clicked successfully!")
                     return True, card_url
                 else:
                     print(f"❌ Card {card_index} click failed - detail page not loaded")
                     if attempt < max_attempts - 1:
                         print("🔄 Retrying click...")
-                        time.sleep(2)
+                        await asyncio.sleep(self.waiter.timeouts["click_retry"] / 1000)
                     continue
 
             except Exception as e:
                 print(f"❌ Error clicking card {card_index} (attempt {attempt + 1}): {e}")
                 if attempt < max_attempts - 1:
                     print("🔄 Retrying click...")
-                    time.sleep(2)
+                    await asyncio.sleep(self.waiter.timeouts["click_retry"] / 1000)
                 continue
 
         print(f"❌ Failed to click card {card_index} after {max_attempts} attempts")
         return False, None
 
-    async def discover_all_cards(self, page, query=""):
-        """Enhanced discovery that continues from last scroll position"""
+    def enqueue_discovered_urls(self, url_queue, card_urls):
+        """Push newly discovered, unvisited card URLs to the detail workers"""
+        queued = 0
+        for card_url in card_urls:
+            place_key = canonical_place_key(card_url)
+            if place_key in self.visited_places or place_key in self.queued_places:
+                continue
+            if self.business_index.check_place(place_key):
+                continue
+            self.queued_places.add(place_key)
+            url_queue.put_nowait((len(self.queued_places) - 1, card_url))
+            queued += 1
+        if queued:
+            self.metrics.gauge("url_queue_depth", url_queue.qsize())
+            print(f"📤 Queued {queued} new cards for extraction (queue depth: {url_queue.qsize()})")
+        return queued
+
+    async def discover_all_cards(self, page, query="", url_queue=None, max_results=None):
+        """Enhanced discovery that continues from last scroll position
+
+        When url_queue is given, new unvisited URLs are streamed to it as they
+        appear so detail workers can start before scrolling finishes, and
+        scrolling stops as soon as max_results businesses have been saved.
+        """
         print("\n🔍 DISCOVERING ALL CARDS (ENHANCED)...")
 
-        discovered_cards = set()
-        scrollable = page.locator('div[role="feed"]')
+        discovered_cards = {}  # place key -> first href seen for it
+        scrollable = page.locator(FEED_SELECTOR)
 
         if await scrollable.count() == 0:
             print("❌ Could not find scrollable feed")
@@ -872,10 +916,9 @@ class MapsBusinessScraper:
         # Start from saved position
         if start_position > 0:
             await scrollable.evaluate(f"el => el.scrollTo(0, {start_position})")
-            await page.wait_for_timeout(3000)
         else:
             await scrollable.evaluate("el => el.scrollTo(0, 0)")
-            await page.wait_for_timeout(2000)
+        await self.waiter.for_selector(page, f'{FEED_SELECTOR} a[href*="/maps/place/"]', "scroll_restore")
 
         scroll_position = start_position
         scroll_attempts = 0
@@ -884,29 +927,39 @@ class MapsBusinessScraper:
         max_no_new_cards = 8
 
         while scroll_attempts < max_scroll_attempts and no_new_cards_count < max_no_new_cards:
-            # Get current cards
-            cards = page.locator('a[href*="/maps/place/"]')
-            current_cards = set()
-
-            card_count = await cards.count()
-            for i in range(card_count):
-                try:
-                    card_url = await cards.nth(i).get_attribute('href')
-                    if card_url:
-                        current_cards.add(card_url)
-                        self.all_discovered_urls.add(card_url)
-                except:
-                    continue
+            step_started = time.perf_counter()
+            if max_results and self.processed_count >= max_results:
+                print("🛑 Result limit reached, stopping discovery early")
+                break
 
-            # Check for new cards
-            new_cards = current_cards - discovered_cards
+            # Pull only the hrefs added since the last call, in one round-trip
+            try:
+                snapshot = await scrollable.evaluate(DISCOVERY_JS, self.feed_harvest)
+            except Exception as e:
+                print(f"⚠️ Error collecting cards: {e}")
+                snapshot = {"hrefs": [], "end": False}
+
+            new_cards = []
+            for card_url in snapshot.get("hrefs") or []:
+                place_key = canonical_place_key(card_url)
+                if place_key not in discovered_cards:
+                    discovered_cards[place_key] = card_url
+                    self.discovered_places.add(place_key)
+                    new_cards.append(card_url)
+            if self.feed_harvest:
+                self.harvest_feed_cards(snapshot.get("cards") or [])
             if new_cards:
-                print(f"✅ Found {len(new_cards)} new cards at {scroll_position}px (total: {len(current_cards)})")
-                discovered_cards.update(new_cards)
+                print(f"✅ Found {len(new_cards)} new cards at {scroll_position}px (total: {len(discovered_cards)})")
                 no_new_cards_count = 0
+                if url_queue is not None:
+                    self.enqueue_discovered_urls(url_queue, new_cards)
             else:
                 no_new_cards_count += 1
 
+            if snapshot.get("end"):
+                print(f"🏁 Reached the end of the results list at {scroll_position}px")
+                break
+
             # Try to click "Show more results" button
             try:
                 show_more_buttons = page.locator(
@@ -916,8 +969,10 @@ class MapsBusinessScraper:
                     if await button.is_visible():
                         print("🔄 Clicking 'Show more results'...")
                         await button.click()
-                        await page.wait_for_timeout(4000)
+                        await self.waiter.for_feed_growth(page, snapshot.get("scrollHeight"),
+                                                          snapshot.get("count"), step="show_more")
                         no_new_cards_count = 0
+                        self.metrics.observe("discovery_scroll", (time.perf_counter() - step_started) * 1000)
                         continue
             except:
                 pass
@@ -930,11 +985,17 @@ class MapsBusinessScraper:
             # Trigger lazy loading every 10 scrolls
             if scroll_attempts % 10 == 0 and scroll_attempts > 0:
                 await scrollable.evaluate(f"el => el.scrollTo(0, {scroll_position - 1500})")
-                await page.wait_for_timeout(1000)
+                await self.waiter.for_feed_growth(page, snapshot.get("scrollHeight"),
+                                                  snapshot.get("count"), step="lazy_load")
                 await scrollable.evaluate(f"el => el.scrollTo(0, {scroll_position})")
 
-            await page.wait_for_timeout(2000)
+            # Near the bottom, wait until the feed grows (or the step budget runs out)
+            # instead of a fixed 2s; higher up the cards are already rendered
+            scroll_height = snapshot.get("scrollHeight") or 0
+            if scroll_position + (snapshot.get("clientHeight") or 0) >= scroll_height - 200:
+                await self.waiter.for_feed_growth(page, scroll_height, snapshot.get("count"))
             scroll_attempts += 1
+            self.metrics.observe("discovery_scroll", (time.perf_counter() - step_started) * 1000)
 
             # Save progress every 20 scrolls
             if scroll_attempts % 20 == 0 and query:
@@ -945,25 +1006,43 @@ class MapsBusinessScraper:
             self.save_deep_scroll_state(query)
 
         print(f"📊 DISCOVERY COMPLETE: {len(discovered_cards)} cards, scrolled to {scroll_position}px")
-        return list(discovered_cards)
+        return list(discovered_cards.values())
 
     def get_unvisited_cards_from_discovered(self, discovered_urls):
         """Get unvisited cards from discovered URLs"""
         unvisited_urls = []
 
         for url in discovered_urls:
-            if url not in self.visited_urls:
-                unvisited_urls.append(url)
+            place_key = canonical_place_key(url)
+            if place_key in self.visited_places or self.business_index.check_place(place_key):
+                continue
+            unvisited_urls.append(url)
 
         print(f"📊 UNVISITED CARDS: {len(unvisited_urls)} out of {len(discovered_urls)} total discovered")
         return unvisited_urls
 
+    async def navigate(self, page, url, timeout=30000, attempts=2):
+        """page.goto through the shared rate limiter; retries after a block cooldown, False if still blocked"""
+        if self.request_blocker:
+            await self.request_blocker.ready(page)
+        for attempt in range(attempts):
+            if self.rate_limiter:
+                with self.metrics.stage("rate_limit_wait"):
+                    await self.rate_limiter.acquire()
+            with self.metrics.stage("navigation"):
+                await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+            if not self.rate_limiter or await self.rate_limiter.check_page(page) != "blocked":
+                return True
+        return False
+
     async def navigate_to_card_directly(self, page, card_url):
         """Navigate directly to a card URL"""
         try:
             print(f"🎯 Navigating directly to: {card_url}")
-            await page.goto(card_url, timeout=30000)
-            await page.wait_for_timeout(3000)
+            if not await self.navigate(page, card_url, timeout=30000):
+                print("🚦 Still blocked by Google after the cooldown, leaving this card for later")
+                return False
+            await self.waiter.for_selector(page, DETAIL_INDICATORS, "detail_loaded")
 
             if await self.verify_detail_page_loaded(page):
                 print("✅ Successfully navigated to card detail page")
@@ -978,138 +1057,463 @@ class MapsBusinessScraper:
 
 
 
-    async def perform_clean_sweep(self, page, output_csv, max_results):
-        """Perform a clean sweep of all unvisited URLs"""
-        print(f"\n🧹 PERFORMING CLEAN SWEEP OF UNVISITED URLS")
+    def harvest_feed_cards(self, cards):
+        """Store business details read straight from result cards in the feed"""
+        for card in cards:
+            card_url = card.get("href")
+            if not card_url or not card.get("name"):
+                continue
 
-        # Extract query from current URL for state tracking
-        current_url = page.url
-        query = ""
-        if "/search/" in current_url:
-            query_part = current_url.split("/search/")[-1].split("/")[0]
-            query = unquote(query_part)
+            website = self.pick_website([{"selector": "feed", "href": card.get("website")}], [])
+            phone = self.extract_phone_from_text(card.get("phone") or "")
+            address = ""
+            for line in (card.get("text") or "").split("\n"):
+                for part in line.split("·"):
+                    address = self.extract_address_from_text(part)
+                    if address:
+                        break
+                if address:
+                    break
+            if not phone:
+                phone = self.extract_phone_from_text(card.get("text") or "")
+
+            self.feed_data[canonical_place_key(card_url)] = {
+                "name": card["name"].strip(),
+                "website": website,
+                "phone": phone or "Not found",
+                "address": address or "No address found",
+                "rating": self.extract_rating_from_text(card.get("rating") or "") or "Not found",
+                "review_count": self.extract_review_count_from_text(card.get("reviews") or "") or "Not found",
+            }
+
+    def has_required_fields(self, business_info):
+        """Check that a business dict covers every required feed field"""
+        missing_values = {"", "Not found", "No address found"}
+        for field in self.required_feed_fields:
+            if business_info.get(field) in missing_values:
+                return False
+        return True
+
+    def feed_business_info(self, card_url):
+        """Return harvested feed details if they cover every required field"""
+        business_info = self.feed_data.get(canonical_place_key(card_url))
+        if not business_info or not self.has_required_fields(business_info):
+            return None
+        return dict(business_info)
+
+    def network_business_info(self, card_url):
+        """Build a business dict from intercepted Maps responses, if they had this place"""
+        if not self.response_collector:
+            return None
+
+        try:
+            place = self.response_collector.lookup(card_url)
+            if not place or not place.get("name"):
+                return None
+
+            website = self.pick_website([{"selector": "network", "href": place.get("website")}], [])
+            phone = self.extract_phone_from_text(place.get("phone") or "")
+            address = (place.get("address") or "").strip()
+            return {
+                "name": place["name"],
+                "website": website,
+                "phone": phone or "Not found",
+                "address": address or "No address found",
+                "rating": place.get("rating") or "Not found",
+                "review_count": place.get("review_count") or "Not found",
+            }
+        except Exception as e:
+            print(f"⚠️ Could not parse network data, falling back to DOM: {e}")
+            return None
+
+    async def prepare_context(self, context, keep_cache=False):
+        """Attach per-context hooks (request blocking) to a new browser context"""
+        if self.request_blocker:
+            await self.request_blocker.install(context, keep_cache=keep_cache)
+
+    def prepare_page(self, page):
+        """Attach per-page hooks (response interception) to a new Playwright page"""
+        if self.response_collector:
+            self.response_collector.attach(page)
+
+    async def resolve_business_info(self, page, card_url):
+        """Get business details from the cheapest source that has them"""
+        business_info = self.feed_business_info(card_url) if self.feed_harvest else None
+        if business_info:
+            print(f"⚡ Using feed data, skipping detail page for: {business_info['name']}")
+            self.detail_pages_skipped += 1
+            return business_info
+
+        # Search responses often already contain every field for the place
+        business_info = self.network_business_info(card_url)
+        if business_info and self.has_required_fields(business_info):
+            print(f"📡 Using search response data, skipping detail page for: {business_info['name']}")
+            self.detail_pages_skipped += 1
+            self.network_extractions += 1
+            return business_info
+
+        if not await self.navigate_to_card_directly(page, card_url):
+            print("❌ Failed to navigate to card")
+            return None
+
+        # The place preview response arrives with the navigation; let its body finish parsing
+        if self.response_collector:
+            await self.response_collector.settle(page)
+        network_info = self.network_business_info(card_url)
+        if network_info and self.has_required_fields(network_info):
+            print(f"📡 Extracted from place preview response: {network_info['name']}")
+            self.network_extractions += 1
+            return network_info
+
+        if network_info:
+            print("⚠️ Network data is missing required fields, falling back to DOM extraction")
+        elif self.response_collector:
+            print("⚠️ No network data for this place, falling back to DOM extraction")
 
         # AWAIT the async function
-        discovered_urls = await self.discover_all_cards(page, query)
+        business_info = await self.extract_business_info(page)
+        if self.recorder:
+            await self.recorder.record(page, "detail", business_info)
+        if network_info:
+            self.fill_missing_fields(business_info, network_info)
+        return business_info
 
-        if not discovered_urls:
-            print("❌ No cards discovered")
-            return 0
+    def fill_missing_fields(self, business_info, fallback):
+        """Copy fields the DOM did not find from a partial network result"""
+        missing_values = {None, "", "Not found", "No address found", "Unknown Business"}
+        for field, value in fallback.items():
+            if business_info.get(field) in missing_values and value not in missing_values:
+                business_info[field] = value
+
+    async def process_card_url(self, page, card_url, output_csv, max_results):
+        """Resolve a single card URL to business details and save the business"""
+        business_info = await self.resolve_business_info(page, card_url)
+        if business_info is None:
+            self.metrics.count("failed")
+            return False
 
-        unvisited_urls = self.get_unvisited_cards_from_discovered(discovered_urls)
+        place_key = canonical_place_key(card_url)
+        self.mark_visited(place_key, persist=False)
+        self.business_index.add_place(place_key)
+        self.metrics.count("visited")
+        self.unsaved_snapshots.append(snapshot_row(place_key, self.current_query, card_url, business_info))
+
+        business_info["place_key"] = place_key
+        queued = await self.queue_business(business_info, max_results)
+        if not queued:
+            # No lead is waiting on this place, so its visit can be saved right away
+            self.unsaved_visits.append(place_key)
+        return queued
+
+    async def queue_business(self, business_info, max_results):
+        """Dedup a visited business and buffer its lead; returns True if it was queued"""
+        business_name = business_info.get("name", "").strip()
+        if not business_name or business_name.lower() == "unknown business":
+            print("⚠️ Could not extract valid business name")
+            self.metrics.count("skipped_no_name")
+            return False
 
-        if not unvisited_urls:
-            print("✅ All discovered cards have been visited!")
-            return 0
+        # Get website
+        website = (business_info.get("website") or "").strip()
+
+        # Skip if no website
+        if not website:
+            print(f"⚠️ Skipped: No website found")
+            self.metrics.count("skipped_no_website")
+            return False
+
+        # Dedup, DB write and counters are shared by every sweep worker
+        async with self.save_lock:
+            if self.processed_count >= max_results:
+                print(f"🛑 Limit reached while extracting, dropping: {business_name}")
+                return False
 
-        processed_count = 0
-        print(f"\n🎯 PROCESSING {len(unvisited_urls)} UNVISITED CARDS...")
+            business_name_lower = business_name.lower()
+            if business_name_lower in self.seen_names:
+                print(f"⚠️ Skipping duplicate business: {business_info['name']}")
+                self.metrics.count("skipped_duplicate")
+                return False
+
+            # Saved by another query in this process (or an earlier run)
+            if self.business_index.check_website(website):
+                print(f"⚠️ Skipping business already saved by another query (domain): {business_info['name']}")
+                self.metrics.count("skipped_duplicate")
+                return False
 
-        for i, card_url in enumerate(unvisited_urls):
-            if processed_count >= max_results:
-                print(f"🛑 Reached maximum results limit ({max_results})")
+            # Check for duplicate website against the preloaded lead domains
+            if self.lead_writer.is_known(website):
+                print(f"⚠️ Skipped: Website already exists in database")
+                self.metrics.count("skipped_duplicate")
+                return False
+
+            # Buffer for the batched DB write; the CSV row follows once it is committed
+            self.seen_names.add(business_name_lower)
+            self.business_index.add_website(website)
+            self.processed_count += 1
+            print(f"📥 Business {self.processed_count} queued for saving: {business_info['name']}")
+            created, rejected, failed = await self.lead_writer.add(business_info)
+            self.record_lead_batch(created, rejected, failed)
+            self.metrics.gauge("lead_buffer_depth", len(self.lead_writer.buffer))
+
+        return True
+
+    def record_lead_batch(self, created, rejected, failed):
+        """Move committed leads into results/CSV and release slots for rejected and failed ones"""
+        for business_info in created:
+            self.results.append(business_info)
+            if self.csv_sink:
+                self.csv_sink.write(business_info)
+            self.saved_count += 1
+            self.metrics.count("saved")
+
+            print(f"✅ SUCCESS! Business {self.saved_count} saved:")
+            print(f"   📍 Name: {business_info['name']}")
+            print(f"   🌐 Website: {business_info['website']}")
+            print(f"   📞 Phone: {business_info['phone'] or 'Not found'}")
+            print(f"   📌 Address: {business_info['address'] or 'No address found'}")
+
+        for business_info in rejected:
+            print(f"⚠️ Not saved, already in database: {business_info['name']}")
+            self.metrics.count("skipped_duplicate")
+
+        # Nothing of a failed lead is remembered, so a later run scrapes it again
+        for business_info in failed:
+            print(f"❌ Not saved, database write failed: {business_info['name']}")
+            self.metrics.count("failed")
+            self.seen_names.discard(business_info["name"].strip().lower())
+            self.visited_places.discard(business_info.get("place_key"))
+            self.business_index.forget(business_info.get("place_key"), business_info.get("website"))
+        self.processed_count -= len(rejected) + len(failed)
+
+        # Persist a place only once its lead's batch is committed, so a crash
+        # cannot mark places visited whose leads were still in the buffer
+        if created or rejected:
+            self.unsaved_visits.extend(business_info.get("place_key") for business_info in created + rejected)
+            self.save_visited_urls()
+
+    async def flush_leads(self):
+        """Write any buffered leads (called at the end of a sweep and on shutdown)"""
+        created, rejected, failed = await self.lead_writer.flush()
+        self.record_lead_batch(created, rejected, failed)
+
+    async def sweep_worker(self, worker_id, page, url_queue, total, output_csv, max_results):
+        """Pull card URLs from the shared queue until a None sentinel arrives"""
+        while True:
+            item = await url_queue.get()
+            self.metrics.gauge("url_queue_depth", url_queue.qsize())
+            if item is None:
+                url_queue.task_done()
                 break
 
+            index, card_url = item
+            if self.processed_count >= max_results:
+                # Drain remaining work without visiting it
+                url_queue.task_done()
+                continue
+
             print(f"\n{'=' * 50}")
-            print(f"🔄 Processing card {i + 1}/{len(unvisited_urls)}")
+            print(f"🔄 [worker {worker_id}] Processing card {index + 1}/{total or '?'}")
             print(f"🔗 URL: {card_url}")
-            print(f"📊 Progress: {processed_count}/{max_results}")
+            print(f"📊 Progress: {self.processed_count}/{max_results}")
 
             try:
-                # AWAIT the async function
-                if await self.navigate_to_card_directly(page, card_url):
-                    self.visited_urls.add(card_url)
+                await self.process_card_url(page, card_url, output_csv, max_results)
+            except Exception as e:
+                print(f"❌ [worker {worker_id}] Error processing card: {e}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                url_queue.task_done()
 
-                    # AWAIT the async function
-                    business_info = await self.extract_business_info(page)
+        print(f"🏁 [worker {worker_id}] Finished")
 
-                    business_name = business_info.get("name", "").strip()
-                    if not business_name or business_name.lower() == "unknown business":
-                        print("⚠️ Could not extract valid business name")
-                        continue
+    async def open_worker_pages(self, page, count):
+        """Open extra pages (or isolated contexts) for the sweep workers"""
+        extra_pages = []
+        extra_contexts = []
+        for _ in range(count):
+            try:
+                if self.isolate_worker_contexts:
+                    context = await page.context.browser.new_context(user_agent=USER_AGENT)
+                    await self.prepare_context(context)
+                    extra_contexts.append(context)
+                    extra_pages.append(await context.new_page())
+                else:
+                    extra_pages.append(await page.context.new_page())
+                self.prepare_page(extra_pages[-1])
+            except Exception as e:
+                print(f"⚠️ Could not open worker page: {e}")
+                break
+        return extra_pages, extra_contexts
 
-                    business_name_lower = business_name.lower()
-                    if business_name_lower in self.seen_names:
-                        print(f"⚠️ Skipping duplicate business: {business_info['name']}")
-                        continue
+    async def close_worker_pages(self, pages, contexts):
+        """Close pages and contexts opened for the sweep workers"""
+        for worker_page in pages:
+            try:
+                await worker_page.close()
+            except Exception:
+                pass
+        for context in contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
 
-                    # Grab rating and review count safely
-                    raw_review_count = business_info.get("review_count")
+    async def perform_clean_sweep(self, page, output_csv, max_results, workers=None, pipeline=None):
+        """Perform a clean sweep of all unvisited URLs with a pool of worker pages
 
-                    #if raw_review_count is None:
-                    #    print(f"❌ Skipped: Missing review count")
-                    #    continue
+        In pipeline mode discovery keeps scrolling on the search page while the
+        workers extract details on their own pages; otherwise discovery runs to
+        completion first and the search page is reused as worker 0.
+        """
+        print(f"\n🧹 PERFORMING CLEAN SWEEP OF UNVISITED URLS")
 
-                    #try:
-                    #    review_count = int(raw_review_count)
-                    #except (ValueError, TypeError):
-                    #    print(f"❌ Skipped: Review count not a valid number")
-                    #    continue
+        # Extract query from current URL for state tracking
+        current_url = page.url
+        query = ""
+        if "/search/" in current_url:
+            query_part = current_url.split("/search/")[-1].split("/")[0]
+            query = unquote(query_part)
 
-                    # Get website
-                    website = (business_info.get("website") or "").strip()
+        workers = max(1, workers or self.workers)
+        pipeline = self.pipeline if pipeline is None else pipeline
+        self.processed_count = 0
+        self.queued_places = set()
+        url_queue = asyncio.Queue()
+
+        if pipeline:
+            print(f"\n🎯 STREAMING DISCOVERED CARDS TO {workers} WORKER(S)...")
+            worker_pages, extra_contexts = await self.open_worker_pages(page, workers)
+            if not worker_pages:
+                print("⚠️ No worker pages available, falling back to sequential sweep")
+                return await self.perform_clean_sweep(page, output_csv, max_results, workers=1, pipeline=False)
+
+            worker_tasks = [
+                asyncio.create_task(
+                    self.sweep_worker(worker_id, worker_page, url_queue, None, output_csv, max_results)
+                )
+                for worker_id, worker_page in enumerate(worker_pages)
+            ]
+            try:
+                discovered_urls = await self.discover_all_cards(page, query, url_queue=url_queue, max_results=max_results)
+                if self.recorder and discovered_urls:
+                    await self.recorder.record(page, "feed", {"cards": len(discovered_urls)})
+                if not discovered_urls:
+                    print("❌ No cards discovered")
+                elif not self.queued_places:
+                    print("✅ All discovered cards have been visited!")
+            finally:
+                for _ in worker_tasks:
+                    url_queue.put_nowait(None)
+                await asyncio.gather(*worker_tasks, return_exceptions=True)
+                await self.close_worker_pages(worker_pages, extra_contexts)
+        else:
+            # AWAIT the async function
+            discovered_urls = await self.discover_all_cards(page, query)
+            if self.recorder and discovered_urls:
+                await self.recorder.record(page, "feed", {"cards": len(discovered_urls)})
 
-                    # Skip if no website
-                    if not website:
-                        print(f"⚠️ Skipped: No website found")
-                        continue
+            if not discovered_urls:
+                print("❌ No cards discovered")
+                return 0
 
-                    # Check for duplicate website in database
-                    try:
-                        exists = await sync_to_async(Lead.objects.filter(website__iexact=website).exists)()
-                        if exists:
-                            print(f"⚠️ Skipped: Website already exists in database")
-                            continue
-                    except Exception as e:
-                        print(f"⚠️ Error checking database: {e}")
-                        continue
+            unvisited_urls = self.get_unvisited_cards_from_discovered(discovered_urls)
 
-                    # Save to database
-                    try:
-                        await sync_to_async(Lead.objects.create)(
-                            name=business_info.get("name", "").strip(),
-                            phone=(business_info.get("phone") or "").strip() or None,
-                            website=website,
-                            source="google_maps",
-                            address=business_info.get("address", "").strip(),
-
-                        )
-                        print(f"💾 Saved to database successfully")
-                    except IntegrityError as e:
-                        print(f"⚠️ DB Integrity error (duplicate): {e}")
-                        continue
-                    except Exception as e:
-                        print(f"❌ Error saving to DB: {e}")
-                        continue
+            if not unvisited_urls:
+                print("✅ All discovered cards have been visited!")
+                return 0
 
-                    # Add to results and seen names
-                    self.seen_names.add(business_name_lower)
-                    self.results.append(business_info)
-                    processed_count += 1
-
-                    print(f"✅ SUCCESS! Business {processed_count} saved:")
-                    print(f"   📍 Name: {business_info['name']}")
-                    print(f"   🌐 Website: {website}")
-                    print(f"   📞 Phone: {business_info['phone'] or 'Not found'}")
-                    print(f"   📌 Address: {business_info['address'] or 'No address found'}")
-                    #print(f"   🗣 Reviews: {review_count}")
-
-                    # Periodic saves
-                    if processed_count % 3 == 0:
-                        self.save_to_csv(output_csv)
-                        self.save_visited_urls()
-                        print(f"💾 Intermediate save completed")
-                else:
-                    print("❌ Failed to navigate to card")
+            workers = min(workers, len(unvisited_urls))
+            print(f"\n🎯 PROCESSING {len(unvisited_urls)} UNVISITED CARDS WITH {workers} WORKER(S)...")
 
-            except Exception as e:
-                print(f"❌ Error processing card: {e}")
-                import traceback
-                traceback.print_exc()
+            # The search page is free once discovery is done, so it becomes worker 0
+            extra_pages, extra_contexts = await self.open_worker_pages(page, workers - 1)
+            worker_pages = [page] + extra_pages
+
+            self.enqueue_discovered_urls(url_queue, unvisited_urls)
+            for _ in worker_pages:
+                url_queue.put_nowait(None)
+
+            try:
+                await asyncio.gather(*[
+                    self.sweep_worker(worker_id, worker_page, url_queue, len(unvisited_urls), output_csv, max_results)
+                    for worker_id, worker_page in enumerate(worker_pages)
+                ])
+            finally:
+                await self.close_worker_pages(extra_pages, extra_contexts)
+
+        await self.flush_leads()
 
-        print(f"\n✅ CLEAN SWEEP COMPLETED: {processed_count} businesses saved")
-        return processed_count
+        if self.processed_count >= max_results:
+            print(f"🛑 Reached maximum results limit ({max_results})")
 
+        print(f"\n✅ CLEAN SWEEP COMPLETED: {self.processed_count} businesses saved")
+        return self.processed_count
+
+
+    async def recrawl(self, query=None, budget=50, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                      min_age_days=DEFAULT_MIN_AGE_DAYS, output_csv=None, workers=None, browser=None):
+        """
+        Revisit only the stale or promising places from earlier runs instead of a full sweep
+
+        Args:
+            query: Only recrawl places first scraped by this query (all queries if None)
+            budget: Maximum number of detail pages to visit
+            max_age_days: Age at which any place is due again
+            min_age_days: Places scraped more recently than this are never revisited
+            output_csv: CSV for businesses that become saveable (e.g. a website appeared)
+            workers: Concurrent detail pages (defaults to self.workers)
+            browser: Already-running Playwright browser or BrowserService (launches its own if None)
+        """
+        run_query = query or "recrawl"
+        if output_csv is None:
+            output_csv = location_output_path(run_query)
+
+        scheduler = RecrawlScheduler(self.state_store, max_age_days=max_age_days, min_age_days=min_age_days)
+        plan = scheduler.plan(budget, query)
+        scheduler.print_plan(plan)
+        if not plan:
+            print("✅ Nothing is due for a recrawl")
+            return 0
+
+        await self.prepare_run(run_query, output_csv)
+        try:
+            await self.run_with_browser(browser, lambda run_browser: self.recrawl_in_browser(
+                run_browser, [snapshot["url"] for snapshot in plan], output_csv, workers))
+        finally:
+            await self.finish_run(output_csv)
+
+        print(f"🔁 Recrawled {len(plan)} places: {self.places_changed} changed "
+              f"({', '.join(f'{field} {count}' for field, count in self.snapshot_changes.most_common()) or 'no field changes'}), "
+              f"{self.saved_count} newly saved")
+        return len(plan)
+
+    async def recrawl_in_browser(self, browser, card_urls, output_csv, workers=None):
+        """Visit the given place URLs with a pool of worker pages"""
+        context = await self.open_context(browser)
+        page = await context.new_page()
+        self.prepare_page(page)
+        try:
+            workers = max(1, min(workers or self.workers, len(card_urls)))
+            extra_pages, extra_contexts = await self.open_worker_pages(page, workers - 1)
+            worker_pages = [page] + extra_pages
+            self.processed_count = 0
+            url_queue = asyncio.Queue()
+            for index, card_url in enumerate(card_urls):
+                url_queue.put_nowait((index, card_url))
+            for _ in worker_pages:
+                url_queue.put_nowait(None)
+
+            try:
+                await asyncio.gather(*[
+                    self.sweep_worker(worker_id, worker_page, url_queue, len(card_urls), output_csv, len(card_urls))
+                    for worker_id, worker_page in enumerate(worker_pages)
+                ])
+            finally:
+                await self.close_worker_pages(extra_pages, extra_contexts)
+            await self.flush_leads()
+        finally:
+            await self.close_context(browser, context)
 
     def reset_deep_discovery(self, query=None):
         """Reset deep discovery state for testing or fresh start"""
@@ -1122,12 +1526,12 @@ class MapsBusinessScraper:
             print("🔄 Reset all deep discovery state")
 
         try:
-            with open(self.deep_scroll_state_file, 'w') as f:
-                json.dump(self.deep_scroll_state, f, indent=2)
-        except:
-            pass
+            self.state_store.delete_scroll_state(query or None)
+        except Exception as e:
+            print(f"⚠️ Error resetting deep discovery state: {e}")
 
-    async def scrape(self, query, max_results=15, output_csv=None, continue_from_last=True, clean_sweep=True):
+    async def scrape(self, query, max_results=15, output_csv=None, continue_from_last=True, clean_sweep=True, workers=None, pipeline=None,
+                     browser=None):
         """
         Scrape Google Maps businesses with optional clean sweep of unvisited URLs
 
@@ -1137,19 +1541,17 @@ class MapsBusinessScraper:
             output_csv: Output CSV file path (auto-generated if None)
             continue_from_last: Whether to continue from last pagination state
             clean_sweep: Whether to perform clean sweep of unvisited URLs
+            workers: Number of concurrent detail pages for the clean sweep (defaults to self.workers)
+            pipeline: Overlap discovery and extraction (defaults to self.pipeline)
+            browser: Already-running Playwright browser or BrowserService to take a context from
+                (launches its own browser if None)
         """
         if output_csv is None:
             output_csv = f"csv-json/visited/{query.replace(' ', '_')}.csv"
 
-        # Set query-specific file paths BEFORE loading data
-        self.set_query_specific_files(query)
-
-        # Now load the query-specific data
-        self.load_visited_urls()
-        # Load existing businesses to avoid duplicates
-        self.load_existing_businesses(output_csv)
+        await self.prepare_run(query, output_csv)
 
-        search_url = f"https://www.google.com/maps/search/{quote(query)}"
+        search_url = f"{self.maps_base_url}/maps/search/{quote(query)}"
 
         print(f"\n🚀 STARTING GOOGLE MAPS SCRAPER")
         print(f"=" * 50)
@@ -1157,115 +1559,302 @@ class MapsBusinessScraper:
         print(f"📊 Max results: {max_results}")
         print(f"📁 Output file: {output_csv}")
         print(f"🧹 Clean sweep: {clean_sweep}")
+        print(f"👷 Workers: {workers or self.workers}")
+        print(f"🔀 Pipeline: {self.pipeline if pipeline is None else pipeline}")
         print(f"🌐 Search URL: {search_url}")
         print(f"=" * 50)
 
+        try:
+            await self.run_with_browser(browser, lambda run_browser: self.scrape_in_browser(
+                run_browser, search_url, max_results, output_csv, clean_sweep, workers, pipeline))
+        finally:
+            # Buffered leads and visited places are written even if the run fails or is cancelled
+            await self.finish_run(output_csv)
+
+    async def prepare_run(self, query, output_csv):
+        """Load per-query state, the output CSV and the dedup indexes before a run"""
+        # Set query-specific file paths BEFORE loading data
+        self.set_query_specific_files(query)
+
+        # Now load the query-specific data
+        self.load_visited_urls()
+        # Load existing businesses to avoid duplicates
+        self.load_existing_businesses(output_csv)
+        try:
+            await self.lead_writer.load_known_domains()
+        except Exception as e:
+            print(f"⚠️ Error loading existing lead domains: {e}")
+        self.business_index.load(state_store=self.state_store)
+
+    async def run_with_browser(self, browser, run):
+        """Call run(browser) with the given browser, or with one launched just for this run"""
+        if browser is not None:
+            return await run(browser)
+
         from playwright.async_api import async_playwright
 
         async with async_playwright() as p:
             print("🌐 Launching browser...")
             browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            )
-            page = await context.new_page()
-
             try:
-                print("🔍 Navigating to Google Maps...")
-                await page.goto(search_url, timeout=60000)
-                print("✅ Page loaded successfully")
-
-                print("⏱️ Waiting for page to stabilize...")
-                await page.wait_for_timeout(5000)
-
-                # Handle cookie consent if it appears
-                try:
-                    cookie_button = page.locator(
-                        'button:has-text("Accept all"), button:has-text("I agree"), button:has-text("Accept")')
-                    if await cookie_button.count() > 0:
-                        print("🍪 Accepting cookies...")
-                        await cookie_button.first.click()
-                        await page.wait_for_timeout(2000)
-                except:
-                    pass
-
-                # Perform clean sweep if requested
-                if clean_sweep:
-                    processed_count = await self.perform_clean_sweep(page, output_csv, max_results)
-                    print(f"\n✅ Clean sweep completed! Processed {processed_count} businesses")
-                else:
-                    print("⚠️ Clean sweep disabled, using original card-by-card method")
-                    processed_count = 0
-
-            except Exception as e:
-                print(f"❌ Critical error during scraping: {e}")
-                import traceback
-                traceback.print_exc()
+                return await run(browser)
             finally:
                 print("🔒 Closing browser...")
                 await browser.close()
 
+    async def finish_run(self, output_csv):
+        """Flush leads, CSV and visited places, then print the run summary"""
         # Save final results
+        await self.flush_leads()
+        self.selector_stats.flush()
         self.save_to_csv(output_csv)
         self.save_visited_urls()
 
         print(f"\n🎉 FINAL RESULTS:")
-        print(f"📁 {len(self.results)} businesses saved to {output_csv}")
-        print(f"🌐 {len(self.visited_urls)} URLs tracked")
-        print(f"🔍 {len(self.all_discovered_urls)} total URLs discovered")
+        print(f"📁 {self.saved_count} businesses saved to {output_csv}")
+        print(f"🌐 {len(self.visited_places)} places tracked")
+        print(f"🔍 {len(self.discovered_places)} total places discovered")
         print(f"⏭️ {len(self.skipped_cards)} cards skipped")
+        print(f"🗄️ {self.lead_writer.created} leads written in {self.lead_writer.batches} batches "
+              f"({self.lead_writer.rejected} rejected at flush, {self.lead_writer.failed} failed)")
+        self.business_index.print_summary()
+        if self.selector_stats.pages:
+            self.selector_stats.print_summary(EXTRACTION_SELECTORS)
+        if self.request_blocker:
+            self.request_blocker.print_summary()
+        self.waiter.print_summary()
+        if self.rate_limiter:
+            self.rate_limiter.print_summary()
+        self.metrics.print_summary()
+        self.metrics.write_json(self.metrics_dir)
+        if self.feed_harvest or self.response_collector:
+            print(f"⚡ {self.detail_pages_skipped} detail pages skipped using feed/network data")
+        if self.response_collector:
+            print(f"📡 {self.network_extractions} businesses extracted from network responses "
+                  f"({self.response_collector.responses_parsed} responses parsed, "
+                  f"{self.response_collector.parse_failures} failed)")
+
+
+    async def scrape_in_browser(self, browser, search_url, max_results, output_csv, clean_sweep, workers, pipeline):
+        """Run one search in a context of the given browser (or service pool), closing only the context"""
+        context = await self.open_context(browser)
+        page = await context.new_page()
+        self.prepare_page(page)
 
+        try:
+            print("🔍 Navigating to Google Maps...")
+            if not await self.navigate(page, search_url, timeout=60000):
+                print("🚦 Google keeps blocking the search page, giving up on this query for now")
+                return
+            print("✅ Page loaded successfully")
+
+            print("⏱️ Waiting for results feed...")
+            await self.wait_for_search_results(page)
+
+            # Perform clean sweep if requested
+            if clean_sweep:
+                processed_count = await self.perform_clean_sweep(page, output_csv, max_results, workers=workers, pipeline=pipeline)
+                print(f"\n✅ Clean sweep completed! Processed {processed_count} businesses")
+            else:
+                print("⚠️ Clean sweep disabled, using original card-by-card method")
+                processed_count = 0
 
-    def save_to_csv(self, filename):
-        """Save results to CSV file with duplicate prevention"""
+        except Exception as e:
+            print(f"❌ Critical error during scraping: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            await self.close_context(browser, context)
+
+    async def wait_for_search_results(self, page):
+        """Wait for the results feed (or a detail page) and accept cookie consent if asked"""
+        await self.waiter.for_selector(page, [FEED_SELECTOR] + DETAIL_INDICATORS + CONSENT_SELECTORS,
+                                       "search_loaded")
+
+        # Handle cookie consent if it appears
         try:
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            cookie_button = page.locator(", ".join(CONSENT_SELECTORS))
+            if await cookie_button.count() > 0:
+                print("🍪 Accepting cookies...")
+                await cookie_button.first.click()
+                await self.waiter.for_selector(page, FEED_SELECTOR, "cookie_consent")
+        except:
+            pass
 
-            # Load existing businesses from file
-            existing_businesses = []
-            existing_names = set()
+    async def scrape_grid(self, niche, location, max_results=100, output_csv=None, bounds=None,
+                          cell_km=DEFAULT_CELL_KM, cell_concurrency=3, workers=None, browser=None):
+        """
+        Scrape a city by searching a grid of map viewports instead of deep-scrolling one feed
 
-            if os.path.exists(filename):
-                try:
-                    with open(filename, mode="r", newline="", encoding="utf-8") as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            existing_businesses.append(row)
-                            existing_names.add(row['name'].strip().lower())
-                    print(f"📂 Loaded {len(existing_businesses)} existing businesses from {filename}")
-                except Exception as e:
-                    print(f"⚠️ Could not read existing file: {e}")
-                    existing_businesses = []
-                    existing_names = set()
+        Args:
+            niche: What to search for in every cell (e.g. "print shops")
+            location: City or area to tile; geocoded unless bounds are given
+            max_results: Maximum number of results to collect
+            output_csv: Output CSV file path (auto-generated if None)
+            bounds: Optional (south, west, north, east) box to tile
+            cell_km: Starting cell size; saturated cells are split further
+            cell_concurrency: Number of cells searched at once
+            workers: Number of concurrent detail pages (defaults to self.workers)
+            browser: Already-running Playwright browser or BrowserService
+        """
+        query = f"{niche} in {location}"
+        if output_csv is None:
+            output_csv = f"csv-json/visited/{query.replace(' ', '_')}.csv"
 
-            # Filter out duplicates from current results
-            new_businesses = []
-            duplicate_count = 0
+        if bounds is None:
+            try:
+                bounds = await asyncio.to_thread(geocode_bounds, location)
+            except Exception as e:
+                print(f"⚠️ Could not geocode {location} ({e}), falling back to a single feed")
+                return await self.scrape(query, max_results=max_results, output_csv=output_csv,
+                                         workers=workers, pipeline=True, browser=browser)
 
-            for business in self.results:
-                business_name_lower = business['name'].strip().lower()
+        await self.prepare_run(query, output_csv)
+        planner = GridPlanner(bounds, cell_km=cell_km)
 
-                if business_name_lower not in existing_names:
-                    new_businesses.append(business)
-                    existing_names.add(business_name_lower)
-                else:
-                    duplicate_count += 1
+        print("\n🗺️ STARTING GRID SCRAPE")
+        print("=" * 50)
+        print(f"🔍 Query: {query}")
+        print(f"📦 Bounds: {bounds}")
+        if planner.cell_km != cell_km:
+            print(f"🔲 {cell_km}km cells would be too many, coarsened to {planner.cell_km:.1f}km")
+        print(f"🔲 {planner.initial_cells} cells of {planner.cell_km:.1f}km, {cell_concurrency} searched at once")
+        print(f"📊 Max results: {max_results}")
+        print(f"📁 Output file: {output_csv}")
+        print("=" * 50)
 
-            # Combine existing and new businesses
-            all_businesses = existing_businesses + new_businesses
+        try:
+            await self.run_with_browser(browser, lambda run_browser: self.sweep_grid(
+                run_browser, planner, niche, max_results, output_csv, cell_concurrency, workers))
+            planner.print_summary()
+        finally:
+            await self.finish_run(output_csv)
+
+    async def sweep_grid(self, browser, planner, niche, max_results, output_csv, cell_concurrency, workers):
+        """Feed grid cells to a few cell pages while workers extract the places they stream out"""
+        context = await self.open_context(browser)
+        self.processed_count = 0
+        self.queued_places = set()
+        url_queue = asyncio.Queue()
+        # At most one queued cell per cell page; the planner keeps the rest
+        cell_queue = asyncio.Queue(maxsize=max(1, cell_concurrency))
+        in_flight = [0]
 
-            # Save the merged data
-            with open(filename, mode="w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=["name", "website", "phone", "address", "rating", "review_count"])
-                writer.writeheader()
-                writer.writerows(all_businesses)
+        try:
+            cell_pages = []
+            for _ in range(max(1, cell_concurrency)):
+                cell_pages.append(await context.new_page())
+                self.prepare_page(cell_pages[-1])
+
+            worker_pages, extra_contexts = await self.open_worker_pages(cell_pages[0], max(1, workers or self.workers))
+            worker_tasks = [
+                asyncio.create_task(
+                    self.sweep_worker(worker_id, worker_page, url_queue, None, output_csv, max_results)
+                )
+                for worker_id, worker_page in enumerate(worker_pages)
+            ]
+            cell_tasks = [
+                asyncio.create_task(self.cell_worker(cell_page, planner, niche, cell_queue, in_flight,
+                                                     url_queue, max_results))
+                for cell_page in cell_pages
+            ]
+            try:
+                await self.produce_cells(planner, cell_queue, in_flight, max_results)
+            finally:
+                for _ in cell_tasks:
+                    await cell_queue.put(None)
+                await asyncio.gather(*cell_tasks, return_exceptions=True)
+                for _ in worker_tasks:
+                    url_queue.put_nowait(None)
+                await asyncio.gather(*worker_tasks, return_exceptions=True)
+                await self.close_worker_pages(worker_pages, extra_contexts)
+
+            await self.flush_leads()
+            print(f"\n✅ GRID SWEEP COMPLETED: {self.processed_count} businesses saved")
+        except Exception as e:
+            print(f"❌ Critical error during grid scraping: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            await self.close_context(browser, context)
+
+    async def produce_cells(self, planner, cell_queue, in_flight, max_results):
+        """Move planner cells into the bounded cell queue until the grid is done or max_results is hit"""
+        while self.processed_count < max_results:
+            cell = planner.next_cell()
+            if cell is not None:
+                in_flight[0] += 1
+                await cell_queue.put(cell)
+            elif in_flight[0]:
+                # A cell still being searched may be subdivided into more cells
+                await asyncio.sleep(0.2)
+            else:
+                break
 
-            print(f"💾 Results saved to {filename}")
-            print(f"   📊 {len(new_businesses)} new businesses added")
-            print(f"   📈 Total businesses in file: {len(all_businesses)}")
-            if duplicate_count > 0:
-                print(f"   🔄 {duplicate_count} duplicates avoided")
+    async def cell_worker(self, page, planner, niche, cell_queue, in_flight, url_queue, max_results):
+        """Search queued cells on one page until the producer sends None"""
+        while True:
+            cell = await cell_queue.get()
+            if cell is None:
+                return
+            try:
+                await self.search_cell(page, planner, niche, cell, url_queue, max_results)
+            finally:
+                in_flight[0] -= 1
 
+    async def search_cell(self, page, planner, niche, cell, url_queue, max_results):
+        """Search one viewport cell and stream its unvisited places to the workers"""
+        if self.processed_count >= max_results:
+            return
+        try:
+            if not await self.navigate(page, cell_search_url(niche, cell, self.maps_base_url), timeout=60000):
+                print(f"🚦 Cell {cell['lat']},{cell['lng']} blocked, skipping")
+                return
+            await self.wait_for_search_results(page)
+            card_urls = await self.discover_all_cards(page, "", url_queue=url_queue, max_results=max_results)
+            new_places = planner.record(cell, [canonical_place_key(card_url) for card_url in card_urls])
+            print(f"🗺️ Cell {cell['lat']},{cell['lng']} z{cell['zoom']}: "
+                  f"{len(card_urls)} places, {new_places} new")
+        except Exception as e:
+            print(f"⚠️ Cell {cell['lat']},{cell['lng']} failed: {e}")
+
+    async def open_context(self, browser):
+        """New prepared context from a browser, or a leased one from a BrowserService pool"""
+        if isinstance(browser, BrowserService):
+            context = await browser.acquire_context(user_agent=USER_AGENT)
+        else:
+            context = await browser.new_context(user_agent=USER_AGENT)
+        # Routing would disable the service profile's HTTP cache
+        await self.prepare_context(context, keep_cache=isinstance(browser, BrowserService))
+        return context
+
+    async def close_context(self, browser, context):
+        try:
+            if isinstance(browser, BrowserService):
+                if self.request_blocker:
+                    self.request_blocker.uninstall(context)
+                await browser.release_context(context)
+            else:
+                await context.close()
+        except Exception:
+            pass
+
+    def save_to_csv(self, filename):
+        """Flush and close the streaming CSV sink for this file
+
+        Without an open sink (e.g. results collected by another code path) the
+        in-memory results are streamed through a temporary one instead.
+        """
+        try:
+            if self.csv_sink and self.csv_sink.path == filename:
+                self.csv_sink.close()
+                self.csv_sink = None
+                return
+
+            sink = StreamingCsvSink(filename, metrics=self.metrics).open()
+            for business in self.results:
+                sink.write(business)
+            sink.close()
         except Exception as e:
             print(f"❌ Error saving to CSV: {e}")
 
@@ -1275,18 +1864,18 @@ class MapsBusinessScraper:
         """Reset pagination state for a specific query"""
         if query in self.pagination_state:
             del self.pagination_state[query]
-            self.save_pagination_state()
+            self.state_store.delete_pagination_state(query)
             print(f"🔄 Reset pagination state for query: {query}")
 
     def clear_all_pagination(self):
         """Clear all pagination state"""
         self.pagination_state = {}
-        self.save_pagination_state()
+        self.state_store.delete_pagination_state()
         print("🔄 Cleared all pagination state")
 
     def print_results(self):
         """Print all results to console"""
-        print(f"\n📊 SCRAPED RESULTS ({len(self.results)} businesses):")
+        print(f"\n📊 SCRAPED RESULTS ({self.saved_count} businesses, last {len(self.results)} shown):")
         print("=" * 80)
 
         for i, business in enumerate(self.results, 1):
@@ -1299,41 +1888,193 @@ class MapsBusinessScraper:
 
     def print_unvisited_summary(self):
         """Print summary of unvisited URLs"""
-        unvisited_count = len(self.all_discovered_urls - self.visited_urls)
+        unvisited_count = len(self.discovered_places - self.visited_places)
         print(f"\n📋 UNVISITED URLS SUMMARY:")
-        print(f"🔍 Total discovered: {len(self.all_discovered_urls)}")
-        print(f"✅ Visited: {len(self.visited_urls)}")
+        print(f"🔍 Total discovered: {len(self.discovered_places)}")
+        print(f"✅ Visited: {len(self.visited_places)}")
         print(f"❌ Unvisited: {unvisited_count}")
 
         if unvisited_count > 0:
             print(f"\n⚠️ {unvisited_count} URLs remain unvisited. Run with clean_sweep=True to process them.")
 
 
-async def google_map(niche: str,location: str, max_results: int = 100, clean_sweep: bool = True):
-    scraper = MapsBusinessScraper(headless=True)
+def location_output_path(query):
+    return f"csv-json/visited/batch_2/{query.replace(' ', '_')}.csv"
+
+
+async def google_map(niche: str,location: str, max_results: int = 100, clean_sweep: bool = True, workers: int = 3, pipeline: bool = True,
+                     feed_harvest: bool = False, extraction_backend: str = "dom", browser=None, use_browser_service: bool = False,
+                     tiling: bool = False):
+    if browser is None and use_browser_service:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            service = await BrowserService(user_agent=USER_AGENT).connect(p)
+            try:
+                return await google_map(niche, location, max_results=max_results, clean_sweep=clean_sweep,
+                                        workers=workers, pipeline=pipeline, feed_harvest=feed_harvest,
+                                        extraction_backend=extraction_backend, browser=service, tiling=tiling)
+            finally:
+                await service.close()
+
+    scraper = MapsBusinessScraper(headless=True, workers=workers, pipeline=pipeline, feed_harvest=feed_harvest,
+                                  extraction_backend=extraction_backend)
 
     query = f"{niche} in {location}"
-    output_path = f"csv-json/visited/batch_2/{query.replace(' ', '_')}.csv"
+    output_path = location_output_path(query)
+
+    if tiling:
+        # Search a grid of map viewports instead of deep-scrolling one feed
+        await scraper.scrape_grid(niche, location, max_results=max_results, output_csv=output_path, browser=browser)
+        return output_path
 
     await scraper.scrape(
         query=query,
         max_results=max_results,
         output_csv=output_path,
         continue_from_last=True,
-        clean_sweep=clean_sweep
+        clean_sweep=clean_sweep,
+        browser=browser
     )
 
     return output_path  # or scraper.print_results() if preferred
 
 
+async def recrawl_places(niche: str = None, location: str = None, budget: int = 50, workers: int = 3,
+                         max_age_days: int = DEFAULT_MAX_AGE_DAYS, browser=None):
+    """Refresh stale or promising places of one query (or of every query) within a visit budget"""
+    query = f"{niche} in {location}" if niche and location else None
+    scraper = MapsBusinessScraper(headless=True, workers=workers)
+    return await scraper.recrawl(query=query, budget=budget, max_age_days=max_age_days, browser=browser)
+
+
+class LocationScheduler:
+    """Run many (niche, location) queries concurrently on one shared browser
+
+    Each query gets its own MapsBusinessScraper and browser context; at most
+    `concurrency` queries run at once, so the number of open pages is capped at
+    concurrency * workers. Progress for every running query is printed every
+    `progress_interval` seconds. With use_browser_service the queries lease
+    contexts from the long-lived browser service instead of a private browser,
+    and with tiling each query is scraped as a grid of map viewports.
+    """
+
+    def __init__(self, concurrency=3, progress_interval=30, headless=True, use_browser_service=False, tiling=False,
+                 **scraper_options):
+        self.concurrency = max(1, concurrency)
+        self.progress_interval = progress_interval
+        self.headless = headless
+        self.use_browser_service = use_browser_service
+        self.tiling = tiling
+        self.scraper_options = scraper_options
+        self.browser = None
+        self.browser_lock = asyncio.Lock()
+        self.running = {}  # query -> (scraper, started)
+        self.finished = {}  # query -> {"status", "saved", "seconds", "output"}
+        self.total = 0
+
+    async def ensure_browser(self, playwright):
+        """Return the shared browser, relaunching it if it crashed or disconnected"""
+        async with self.browser_lock:
+            if self.browser is None or not self.browser.is_connected():
+                if self.use_browser_service:
+                    self.browser = await BrowserService(headless=self.headless, user_agent=USER_AGENT).connect(playwright)
+                else:
+                    print("🌐 Launching shared browser...")
+                    self.browser = await playwright.chromium.launch(headless=self.headless)
+            return self.browser
+
+    async def run_query(self, playwright, semaphore, niche, location, max_results, clean_sweep):
+        query = f"{niche} in {location}"
+        output_path = location_output_path(query)
+        async with semaphore:
+            started = time.perf_counter()
+            scraper = MapsBusinessScraper(headless=self.headless, **self.scraper_options)
+            self.running[query] = (scraper, started)
+            print(f"🚦 [{len(self.finished) + len(self.running)}/{self.total}] Starting: {query}")
+            status = "done"
+            try:
+                browser = await self.ensure_browser(playwright)
+                if self.tiling:
+                    await scraper.scrape_grid(niche, location, max_results=max_results, output_csv=output_path,
+                                              browser=browser)
+                else:
+                    await scraper.scrape(query=query, max_results=max_results, output_csv=output_path,
+                                         continue_from_last=True, clean_sweep=clean_sweep, browser=browser)
+            except Exception as e:
+                status = "failed"
+                print(f"❌ Query failed: {query}: {e}")
+            finally:
+                del self.running[query]
+                scraper.state_store.close()
+            self.finished[query] = {
+                "status": status,
+                "saved": scraper.saved_count,
+                "seconds": round(time.perf_counter() - started, 1),
+                "output": output_path,
+            }
+            icon = "✅" if status == "done" else "❌"
+            print(f"{icon} [{len(self.finished)}/{self.total}] {query}: {scraper.saved_count} saved "
+                  f"in {self.finished[query]['seconds']}s ({status})")
+        return output_path
+
+    async def report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            print(f"\n📊 SCHEDULER: {len(self.running)} running, {len(self.finished)}/{self.total} finished")
+            for query, (scraper, started) in list(self.running.items()):
+                print(f"   • {query}: {scraper.processed_count} processed, "
+                      f"{len(scraper.discovered_places)} discovered, {time.perf_counter() - started:.0f}s")
+
+    async def run(self, jobs, max_results=100, clean_sweep=True):
+        """Scrape every (niche, location) pair; returns output paths in job order"""
+        from playwright.async_api import async_playwright
+
+        jobs = list(jobs)
+        self.total = len(jobs)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        print(f"🚦 Scheduling {self.total} queries, {self.concurrency} at a time on one browser")
+
+        async with async_playwright() as p:
+            reporter = asyncio.create_task(self.report_progress())
+            try:
+                results = await asyncio.gather(*[
+                    self.run_query(p, semaphore, niche, location, max_results, clean_sweep)
+                    for niche, location in jobs
+                ])
+            finally:
+                reporter.cancel()
+                if self.browser is not None:
+                    print("🔒 Closing shared browser...")
+                    await self.browser.close()
+
+        failed = [query for query, row in self.finished.items() if row["status"] != "done"]
+        saved = sum(row["saved"] for row in self.finished.values())
+        print(f"\n🎉 SCHEDULER FINISHED: {saved} businesses saved across {self.total} queries"
+              f"{f', {len(failed)} failed' if failed else ''}")
+        return results
+
+
 # Still allows terminal usage:
-async def run_multi_location(niche: str, locations: list, max_results: int = 100, clean_sweep: bool = True):
-    results = []
-    for location in locations:
-        print(f"🔎 Scraping {niche} in {location}...")
-        output_path = await google_map(niche, location, max_results=max_results, clean_sweep=clean_sweep)
-        results.append(output_path)
-        print(f"✅ Saved: {output_path}")
+async def run_multi_location(niche: str, locations: list, max_results: int = 100, clean_sweep: bool = True, workers: int = 3, pipeline: bool = True,
+                             feed_harvest: bool = False, extraction_backend: str = "dom", concurrency: int = 3,
+                             use_browser_service: bool = False, processes: int = 1, tiling: bool = False):
+    if processes > 1:
+        # One event loop and browser per process; blocks a worker thread, not this loop
+        merged = await asyncio.to_thread(
+            run_sharded, [(niche, location) for location in locations], processes=processes,
+            concurrency=concurrency, max_results=max_results, clean_sweep=clean_sweep,
+            use_browser_service=use_browser_service, tiling=tiling, workers=workers, pipeline=pipeline,
+            feed_harvest=feed_harvest, extraction_backend=extraction_backend)
+        return merged["outputs"]
+
+    scheduler = LocationScheduler(concurrency=concurrency, use_browser_service=use_browser_service, tiling=tiling,
+                                  workers=workers, pipeline=pipeline,
+                                  feed_harvest=feed_harvest, extraction_backend=extraction_backend)
+    results = await scheduler.run([(niche, location) for location in locations],
+                                  max_results=max_results, clean_sweep=clean_sweep)
+    # Every scraper in this process shared one index; report what it saved across locations
+    shared_business_index().print_summary()
     return results
 
 
@@ -1354,7 +2095,7 @@ if __name__ == "__main__":
     ]
 
     # Run scraper for each location
-    asyncio.run(run_multi_location(niche, nordic_finland_cities))
+    run_monitored(run_multi_location(niche, nordic_finland_cities))
 
 
 
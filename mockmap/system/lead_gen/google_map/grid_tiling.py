@@ -0,0 +1,152 @@
+import math
+from collections import deque
+from urllib.parse import quote
+
+import requests
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+DEFAULT_CELL_KM = 4.0
+MIN_CELL_KM = 0.5
+# Large areas (a state, a country) get coarser starting cells instead of an unbounded grid
+MAX_GRID_CELLS = 400
+# Maps stops a feed at roughly 120 results; a cell that comes close was probably truncated
+SATURATION_RESULTS = 100
+# Approximate width of the map area next to the results panel
+MAP_VIEWPORT_PX = 1000
+KM_PER_DEGREE_LAT = 110.574
+
+
+def geocode_bounds(location, timeout=15):
+    """(south, west, north, east) bounding box for a place name via Nominatim"""
+    response = requests.get(
+        NOMINATIM_URL,
+        params={"q": location, "format": "json", "limit": 1},
+        headers={"User-Agent": "mockmap-lead-gen/1.0"},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        raise ValueError(f"Could not geocode {location!r}")
+    south, north, west, east = (float(value) for value in results[0]["boundingbox"])
+    return south, west, north, east
+
+
+def km_per_degree_lng(lat):
+    return 111.320 * math.cos(math.radians(lat))
+
+
+def zoom_for_cell(size_km, lat):
+    """Web-Mercator zoom at which a size_km wide cell fills the map viewport"""
+    meters_per_px = size_km * 1000 / MAP_VIEWPORT_PX
+    zoom = math.log2(156543.03 * math.cos(math.radians(lat)) / meters_per_px)
+    return max(3, min(21, int(round(zoom))))
+
+
+def make_cell(lat, lng, size_km, depth=0):
+    return {
+        "lat": round(lat, 6),
+        "lng": round(lng, 6),
+        "size_km": size_km,
+        "zoom": zoom_for_cell(size_km, lat),
+        "depth": depth,
+    }
+
+
+def grid_shape(bounds, cell_km):
+    """(rows, cols, lat_step, lng_step) of a cell_km grid over a (south, west, north, east) box"""
+    south, west, north, east = bounds
+    mid_lat = (south + north) / 2
+    lat_step = cell_km / KM_PER_DEGREE_LAT
+    lng_step = cell_km / km_per_degree_lng(mid_lat)
+    rows = max(1, math.ceil((north - south) / lat_step))
+    cols = max(1, math.ceil((east - west) / lng_step))
+    return rows, cols, lat_step, lng_step
+
+
+def fit_cell_km(bounds, cell_km=DEFAULT_CELL_KM, max_cells=MAX_GRID_CELLS):
+    """Smallest cell size, starting at cell_km, whose grid over bounds has at most max_cells cells"""
+    while True:
+        rows, cols, _, _ = grid_shape(bounds, cell_km)
+        if rows * cols <= max(1, max_cells):
+            return cell_km
+        cell_km *= max(1.1, math.sqrt(rows * cols / max_cells))
+
+
+def grid_cells(bounds, cell_km=DEFAULT_CELL_KM):
+    """Cover a (south, west, north, east) box with square cells of about cell_km"""
+    south, west, _, _ = bounds
+    rows, cols, lat_step, lng_step = grid_shape(bounds, cell_km)
+
+    cells = []
+    for row in range(rows):
+        for col in range(cols):
+            lat = south + (row + 0.5) * lat_step
+            lng = west + (col + 0.5) * lng_step
+            cells.append(make_cell(lat, lng, cell_km))
+    return cells
+
+
+def subdivide(cell):
+    """Split a cell into its four quadrants at the next zoom level"""
+    half = cell["size_km"] / 2
+    lat_offset = half / 2 / KM_PER_DEGREE_LAT
+    lng_offset = half / 2 / km_per_degree_lng(cell["lat"])
+    return [
+        make_cell(cell["lat"] + dlat, cell["lng"] + dlng, half, cell["depth"] + 1)
+        for dlat in (-lat_offset, lat_offset)
+        for dlng in (-lng_offset, lng_offset)
+    ]
+
+
+def cell_search_url(query, cell, base_url):
+    """Search URL centred on a cell at its zoom; base_url is the scraper's maps_base_url"""
+    return f"{base_url}/maps/search/{quote(query)}/@{cell['lat']},{cell['lng']},{cell['zoom']}z"
+
+
+class GridPlanner:
+    """Breadth-first queue of viewport cells with adaptive subdivision
+
+    A cell whose feed hit the saturation size (so Maps probably cut it off) is
+    split into four smaller cells, down to min_cell_km, even if every place it
+    showed was already seen: the places it could not show may still be new.
+    Cells that added no new places are only counted (cells_without_new); the
+    grid is never pruned. If the starting grid would have more than max_cells
+    cells, cell_km is coarsened until it fits.
+    """
+
+    def __init__(self, bounds, cell_km=DEFAULT_CELL_KM, min_cell_km=MIN_CELL_KM, saturation=SATURATION_RESULTS,
+                 max_cells=MAX_GRID_CELLS):
+        self.requested_cell_km = cell_km
+        self.cell_km = fit_cell_km(bounds, cell_km, max_cells)
+        self.pending = deque(grid_cells(bounds, self.cell_km))
+        self.min_cell_km = min_cell_km
+        self.saturation = saturation
+        self.seen = set()
+        self.cells_searched = 0
+        self.cells_without_new = 0
+        self.cells_subdivided = 0
+        self.initial_cells = len(self.pending)
+
+    def next_cell(self):
+        """Next pending cell (coarsest first), or None when none are queued"""
+        return self.pending.popleft() if self.pending else None
+
+    def record(self, cell, place_keys):
+        """Merge a cell's place keys by ID; returns how many were new"""
+        place_keys = set(place_keys)
+        new_keys = place_keys - self.seen
+        self.seen.update(new_keys)
+        self.cells_searched += 1
+
+        if not new_keys:
+            self.cells_without_new += 1
+        if len(place_keys) >= self.saturation and cell["size_km"] / 2 >= self.min_cell_km:
+            self.cells_subdivided += 1
+            self.pending.extend(subdivide(cell))
+        return len(new_keys)
+
+    def print_summary(self):
+        print(f"🗺️ Grid: {self.cells_searched} cells searched ({self.initial_cells} initial, "
+              f"{self.cells_subdivided} subdivided, {self.cells_without_new} with no new places), "
+              f"{len(self.seen)} unique places")
@@ -0,0 +1,139 @@
+import time
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+
+from mockmap.models import Lead
+
+
+def normalize_domain(website):
+    """Reduce a website URL to its bare domain (no scheme, www. or path)"""
+    if not website:
+        return ""
+    website = website.strip().lower()
+    if "://" not in website:
+        website = f"http://{website}"
+    try:
+        domain = urlparse(website).netloc
+    except Exception:
+        return ""
+    domain = domain.split("@")[-1].split(":")[0]
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+class BufferedLeadWriter:
+    """Write-behind buffer for scraped Leads
+
+    Existing lead domains are loaded once, so duplicate checks are in-memory.
+    Accepted leads are buffered and flushed with one existence query per batch
+    on the indexed website_domain column (guarding against other processes
+    writing the same domains) followed by a bulk_create. A batch whose write fails is returned
+    as failed, apart from the duplicates, and its domains are forgotten so the
+    leads can be scraped again.
+    """
+
+    def __init__(self, batch_size=20, source="google_maps", metrics=None):
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self.source = source
+        self.known_domains = set()
+        self.buffer = []
+        self.created = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+        self.domains_loaded = False
+
+    def load_known_domains_sync(self):
+        started = time.perf_counter()
+        websites = Lead.objects.exclude(website__isnull=True).exclude(website="").values_list("website", flat=True)
+        for website in websites.iterator(chunk_size=2000):
+            domain = normalize_domain(website)
+            if domain:
+                self.known_domains.add(domain)
+        self.domains_loaded = True
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"🗄️ Loaded {len(self.known_domains)} existing lead domains in {elapsed_ms:.0f}ms")
+
+    async def load_known_domains(self):
+        if not self.domains_loaded:
+            await sync_to_async(self.load_known_domains_sync)()
+
+    def is_known(self, website):
+        return normalize_domain(website) in self.known_domains
+
+    async def add(self, business_info):
+        """Buffer a lead; returns (created, rejected, failed) business dicts if a batch was flushed"""
+        self.known_domains.add(normalize_domain(business_info.get("website")))
+        self.buffer.append(business_info)
+        if len(self.buffer) >= self.batch_size:
+            return await self.flush()
+        return [], [], []
+
+    def flush_sync(self):
+        if not self.buffer:
+            return [], [], []
+
+        pending = self.buffer
+        self.buffer = []
+        started = time.perf_counter()
+
+        # One indexed lookup for the whole batch against the normalized domains
+        domains = {normalize_domain(business.get("website")) for business in pending}
+        domains.discard("")
+        existing = set()
+        if domains:
+            existing.update(Lead.objects.filter(website_domain__in=domains).values_list("website_domain", flat=True))
+        checked = time.perf_counter()
+
+        created = []
+        rejected = []
+        batch_domains = set()
+        for business in pending:
+            domain = normalize_domain(business.get("website"))
+            if domain in existing or domain in batch_domains:
+                rejected.append(business)
+            else:
+                batch_domains.add(domain)
+                created.append(business)
+
+        Lead.objects.bulk_create([
+            Lead(
+                name=business.get("name", "").strip(),
+                phone=(business.get("phone") or "").strip() or None,
+                website=business.get("website", "").strip(),
+                website_domain=normalize_domain(business.get("website")) or None,
+                source=self.source,
+                address=business.get("address", "").strip(),
+            )
+            for business in created
+        ])
+        finished = time.perf_counter()
+
+        if self.metrics:
+            self.metrics.observe("db_check", (checked - started) * 1000)
+            self.metrics.observe("db_write", (finished - checked) * 1000)
+        self.batches += 1
+        self.created += len(created)
+        self.rejected += len(rejected)
+        print(f"🗄️ Lead batch {self.batches}: {len(created)} created, {len(rejected)} already in DB "
+              f"(check {(checked - started) * 1000:.0f}ms, write {(finished - checked) * 1000:.0f}ms)")
+        return created, rejected, []
+
+    async def flush(self):
+        """Write the buffered leads now; returns (created, rejected, failed) business dicts
+
+        rejected leads were already in the database; failed ones were not
+        written because the batch raised.
+        """
+        if not self.buffer:
+            return [], [], []
+        pending = list(self.buffer)
+        try:
+            return await sync_to_async(self.flush_sync)()
+        except Exception as e:
+            print(f"❌ Error writing lead batch of {len(pending)}: {e}")
+            for business in pending:
+                self.known_domains.discard(normalize_domain(business.get("website")))
+            self.failed += len(pending)
+            return [], [], pending
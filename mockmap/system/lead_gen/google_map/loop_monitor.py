@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+# "1" turns the monitor on for run_monitored entry points, "strict" also fails runs that block too much
+LOOP_MONITOR_ENV = "MOCKMAP_LOOP_MONITOR"
+LAG_INTERVAL_SECONDS = 0.1
+BLOCK_THRESHOLD_MS = 200
+# Strict mode: a single block this long, or this much blocking in total, fails the run
+STRICT_MAX_BLOCK_MS = 1000
+STRICT_MAX_BLOCKED_MS = 10000
+MAX_REPORTED_STACKS = 20
+# Innermost frames kept per captured stack
+STACK_DEPTH = 12
+
+
+class EventLoopBlockedError(RuntimeError):
+    """Raised in strict mode when the event loop was blocked for too long"""
+
+
+class LoopMonitor:
+    """Measure event-loop lag and catch callbacks that block the loop
+
+    A heartbeat task wakes every `interval` seconds and records how late it
+    was (the loop lag). A watchdog thread watches that heartbeat; when it
+    goes stale for longer than block_threshold_ms the loop thread's current
+    stack is captured, so the blocking call shows up by file and line. With
+    debug=True asyncio's own debug mode also logs slow callbacks.
+    """
+
+    def __init__(self, interval=LAG_INTERVAL_SECONDS, block_threshold_ms=BLOCK_THRESHOLD_MS, strict=False,
+                 max_block_ms=STRICT_MAX_BLOCK_MS, max_blocked_ms=STRICT_MAX_BLOCKED_MS, debug=False):
+        self.interval = interval
+        self.block_threshold_ms = block_threshold_ms
+        self.strict = strict
+        self.max_block_ms = max_block_ms
+        self.max_blocked_ms = max_blocked_ms
+        self.debug = debug
+        self.lags_ms = deque(maxlen=10000)
+        self.max_lag_ms = 0.0
+        self.blocks = []  # (duration ms, stack text) per detected block
+        self.blocked_ms = 0.0
+        self.heartbeat = time.perf_counter()
+        self.loop_thread_id = None
+        self.task = None
+        self.watchdog = None
+        self.stopping = threading.Event()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        if self.debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.block_threshold_ms / 1000
+        self.heartbeat = time.perf_counter()
+        self.task = asyncio.create_task(self.measure_lag())
+        self.watchdog = threading.Thread(target=self.watch, name="loop-monitor", daemon=True)
+        self.watchdog.start()
+        print(f"🩺 Event-loop monitor on (block threshold {self.block_threshold_ms}ms"
+              f"{', strict' if self.strict else ''})")
+        return self
+
+    async def measure_lag(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.heartbeat = now
+            lag_ms = max(0.0, (now - expected) * 1000)
+            self.lags_ms.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def watch(self):
+        """Watchdog thread: report the loop thread's stack once per block"""
+        threshold = self.block_threshold_ms / 1000
+        poll = min(self.interval, threshold) / 2
+        blocked_since = None
+        stack = ""
+        while not self.stopping.wait(poll):
+            stale = time.perf_counter() - self.heartbeat - self.interval
+            if stale >= threshold:
+                if blocked_since is None:
+                    blocked_since = self.heartbeat + self.interval
+                    frame = sys._current_frames().get(self.loop_thread_id)
+                    stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH)) if frame else ""
+                    print(f"🐢 Event loop blocked for over {self.block_threshold_ms}ms, loop thread is at:\n{stack}")
+            elif blocked_since is not None:
+                self.record_block((self.heartbeat - blocked_since) * 1000, stack)
+                blocked_since = None
+
+    def record_block(self, duration_ms, stack):
+        self.blocked_ms += duration_ms
+        if len(self.blocks) < MAX_REPORTED_STACKS:
+            self.blocks.append((duration_ms, stack))
+        print(f"🐢 Event loop was blocked for {duration_ms:.0f}ms")
+
+    async def stop(self):
+        self.stopping.set()
+        if self.watchdog:
+            self.watchdog.join()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.print_summary()
+        if self.strict:
+            self.check()
+
+    def longest_block_ms(self):
+        return max((duration for duration, _ in self.blocks), default=0.0)
+
+    def summary(self):
+        lags = sorted(self.lags_ms)
+        return {
+            "samples": len(lags),
+            "mean_lag_ms": round(sum(lags) / len(lags), 2) if lags else 0.0,
+            "p99_lag_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 2) if lags else 0.0,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "blocks": len(self.blocks),
+            "blocked_ms": round(self.blocked_ms, 1),
+            "longest_block_ms": round(self.longest_block_ms(), 1),
+        }
+
+    def check(self):
+        """Raise EventLoopBlockedError if the run blocked the loop past the strict limits"""
+        longest = self.longest_block_ms()
+        if longest > self.max_block_ms or self.blocked_ms > self.max_blocked_ms:
+            slowest_stack = max(self.blocks, key=lambda block: block[0])[1] if self.blocks else ""
+            raise EventLoopBlockedError(
+                f"Event loop blocked for {self.blocked_ms:.0f}ms in total (longest {longest:.0f}ms; "
+                f"limits {self.max_blocked_ms}ms / {self.max_block_ms}ms). Slowest block at:\n{slowest_stack}"
+            )
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"🩺 Event loop: mean lag {summary['mean_lag_ms']}ms, p99 {summary['p99_lag_ms']}ms, "
+              f"max {summary['max_lag_ms']}ms; {summary['blocks']} blocks totalling {summary['blocked_ms']}ms")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.stop()
+        except EventLoopBlockedError:
+            # Don't hide the run's own exception behind the blocking report
+            if exc_type is None:
+                raise
+        return False
+
+
+def monitor_mode():
+    """The monitor mode from MOCKMAP_LOOP_MONITOR: "on", "strict" or "" when off"""
+    value = os.getenv(LOOP_MONITOR_ENV, "").strip().lower()
+    if value == "strict":
+        return "strict"
+    return "on" if value in ("1", "true", "on", "yes") else ""
+
+
+def run_monitored(coro, mode=None, **monitor_options):
+    """asyncio.run(coro), under a LoopMonitor when mode (default: MOCKMAP_LOOP_MONITOR) asks for one"""
+    mode = monitor_mode() if mode is None else mode
+    if not mode:
+        return asyncio.run(coro)
+
+    async def monitored():
+        async with LoopMonitor(strict=mode == "strict", debug=mode == "strict", **monitor_options):
+            return await coro
+
+    return asyncio.run(monitored(), debug=mode == "strict")
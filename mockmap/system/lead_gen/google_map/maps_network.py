@@ -0,0 +1,163 @@
+import asyncio
+import json
+import re
+
+from mockmap.system.lead_gen.google_map.place_ids import canonical_place_key, place_key_from_ftid
+
+# XHR endpoints Google Maps uses for the results feed and the place preview
+SEARCH_RESPONSE_MARKERS = ("tbm=map", "/maps/preview/place")
+XSSI_PREFIX = ")]}'"
+# How long a lookup waits for response bodies a page is still reading
+RESPONSE_SETTLE_SECONDS = 1.0
+
+PLACE_ID_RE = re.compile(r"^0x[0-9a-f]+:0x[0-9a-f]+$", re.IGNORECASE)
+
+
+def decode_maps_payload(text):
+    """Turn a raw Maps XHR body into Python data (None if it isn't one)"""
+    if not text:
+        return None
+
+    body = text.strip()
+    # Search responses are wrapped as {"c":0,"d":")]}'\n[...]"}/*""*/
+    if body.startswith('{"c"'):
+        try:
+            wrapper = json.loads(body[:body.rfind("}") + 1])
+            body = wrapper.get("d") or ""
+        except Exception:
+            return None
+
+    if body.startswith(XSSI_PREFIX):
+        body = body[len(XSSI_PREFIX):]
+
+    try:
+        return json.loads(body)
+    except Exception:
+        return None
+
+
+def dig(data, *path):
+    """Safely follow list indexes into the nested Maps arrays"""
+    for index in path:
+        if not isinstance(data, list) or index >= len(data):
+            return None
+        data = data[index]
+    return data
+
+
+def parse_place_info(info):
+    """Map a Maps place-info array to raw business fields"""
+    name = dig(info, 11)
+    place_id = dig(info, 10)
+    if not isinstance(name, str) or not isinstance(place_id, str) or not PLACE_ID_RE.match(place_id):
+        return None
+
+    address = dig(info, 39)
+    if not isinstance(address, str):
+        address_lines = dig(info, 2)
+        address = ", ".join(line for line in address_lines if isinstance(line, str)) if isinstance(address_lines, list) else ""
+
+    phone = dig(info, 178, 0, 0)
+    if not isinstance(phone, str):
+        phone = dig(info, 3, 0) if isinstance(dig(info, 3, 0), str) else ""
+
+    website = dig(info, 7, 0)
+    rating = dig(info, 4, 7)
+    review_count = dig(info, 4, 8)
+
+    return {
+        "place_id": place_id.lower(),
+        "place_key": place_key_from_ftid(place_id),
+        "name": name.strip(),
+        "website": website if isinstance(website, str) else "",
+        "phone": phone or "",
+        "address": address or "",
+        "rating": rating if isinstance(rating, (int, float)) else None,
+        "review_count": review_count if isinstance(review_count, int) else None,
+    }
+
+
+def find_places(data, found=None, depth=0):
+    """Walk a decoded payload and collect every array that looks like a place"""
+    if found is None:
+        found = []
+    if not isinstance(data, list) or depth > 12:
+        return found
+
+    place = parse_place_info(data)
+    if place:
+        found.append(place)
+        return found
+
+    for item in data:
+        if isinstance(item, list):
+            find_places(item, found, depth + 1)
+    return found
+
+
+class MapsResponseCollector:
+    """Collect place data from the XHR responses Maps loads for search and previews
+
+    Places are matched to card URLs by place key only; names are not unique
+    enough (chains, same-name shops in one city) to stand in for a missing key.
+    """
+
+    def __init__(self):
+        self.places_by_key = {}
+        self.in_flight = {}  # page -> tasks still reading a response body
+        self.responses_parsed = 0
+        self.parse_failures = 0
+
+    def attach(self, page):
+        """Start listening to responses on a Playwright page"""
+        page.on("response", lambda response: self.track(page, response))
+        page.on("close", lambda _: self.in_flight.pop(page, None))
+
+    def is_maps_data_response(self, url):
+        return "google." in url and any(marker in url for marker in SEARCH_RESPONSE_MARKERS)
+
+    def track(self, page, response):
+        """Read a Maps data response in a task that settle() can wait for"""
+        if not self.is_maps_data_response(response.url):
+            return
+        task = asyncio.ensure_future(self.on_response(response))
+        tasks = self.in_flight.setdefault(page, set())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def settle(self, page, timeout=RESPONSE_SETTLE_SECONDS):
+        """Wait up to timeout for the page's in-flight response bodies to be parsed"""
+        tasks = self.in_flight.get(page)
+        if tasks:
+            await asyncio.wait(list(tasks), timeout=timeout)
+
+    async def on_response(self, response):
+        try:
+            text = await response.text()
+        except Exception:
+            return
+        self.ingest(text)
+
+    def ingest(self, text):
+        """Parse one response body and index every place found in it"""
+        data = decode_maps_payload(text)
+        if data is None:
+            self.parse_failures += 1
+            return 0
+
+        places = find_places(data)
+        for place in places:
+            existing = self.places_by_key.get(place["place_key"], {})
+            # Previews carry more fields than feed results, so keep the richest values
+            merged = dict(existing)
+            merged.update({key: value for key, value in place.items() if value not in ("", None)})
+            self.places_by_key[place["place_key"]] = merged
+
+        self.responses_parsed += 1
+        if places:
+            print(f"📡 Parsed {len(places)} places from Maps response ({len(self.places_by_key)} total)")
+        return len(places)
+
+    def lookup(self, card_url):
+        """Return the raw place data for a card URL, if any response contained it"""
+        return self.places_by_key.get(canonical_place_key(card_url))
@@ -0,0 +1,43 @@
+import re
+from urllib.parse import urlparse, unquote
+
+# /maps/place/<name>/data=!4m7!3m6!1s0x88f5...:0x8cac...!8m2!3d..!4d..
+FTID_RE = re.compile(r"(0x[0-9a-f]+):(0x[0-9a-f]+)", re.IGNORECASE)
+URL_FTID_RE = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.IGNORECASE)
+CID_PARAM_RE = re.compile(r"[?&](?:cid|ludocid)=(\d+)")
+PLACE_KEY_PREFIXES = ("cid:", "url:")
+
+
+def place_key_from_ftid(ftid):
+    """Turn a 0x...:0x... feature id into the canonical cid:<decimal> key"""
+    match = FTID_RE.search(ftid or "")
+    if not match:
+        return ""
+    # The second half of the feature id is the place's CID in hex
+    return f"cid:{int(match.group(2), 16)}"
+
+
+def canonical_place_key(url):
+    """Stable dedup key for a Maps place URL (or an already-canonical key)
+
+    Two URLs for the same business differ in coordinates, zoom, rclk/authuser
+    params and the !19s/!16s tail, but share the feature id / CID. Falls back
+    to the decoded place name path when neither is present.
+    """
+    if not url:
+        return ""
+    if url.startswith(PLACE_KEY_PREFIXES):
+        return url
+
+    match = URL_FTID_RE.search(url)
+    if match:
+        return place_key_from_ftid(match.group(1))
+
+    match = CID_PARAM_RE.search(url)
+    if match:
+        return f"cid:{int(match.group(1))}"
+
+    parsed = urlparse(url)
+    path = unquote(parsed.path or url).split("/data=")[0].split("/@")[0].rstrip("/")
+    return f"url:{path.lower()}"
+
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections import Counter
+
+# Navigations per second: start, floor and ceiling of the shared rate
+DEFAULT_RATE = 1.0
+MIN_RATE = 0.1
+MAX_RATE = 4.0
+BURST = 3
+# AIMD: every clean navigation adds RATE_INCREASE, every block multiplies by RATE_DECREASE
+RATE_INCREASE = 0.05
+RATE_DECREASE = 0.5
+# After a captcha or "unusual traffic" page every process pauses this long
+BLOCK_COOLDOWN_SECONDS = 120
+MAX_WAIT_STEP_SECONDS = 5
+
+BLOCK_CHECK_JS = """
+() => ({
+    captcha: !!document.querySelector('#captcha-form, form[action*="sorry"], iframe[src*="recaptcha"], .g-recaptcha'),
+    text: ((document.body && document.body.innerText) || '').slice(0, 3000),
+})
+"""
+BLOCKED_URL_MARKERS = ("/sorry/", "google.com/sorry", "ipv4.google.com/sorry")
+CONSENT_URL_MARKERS = ("consent.google.", "consent.youtube.")
+BLOCKED_TEXT_MARKERS = (
+    "unusual traffic",
+    "our systems have detected",
+    "not a robot",
+    "automated queries",
+)
+CONSENT_TEXT_MARKERS = ("before you continue to google",)
+
+
+def classify_page(url, captcha=False, text=""):
+    """Classify a page as "blocked", "consent" or "" (normal) from its URL, captcha flag and text"""
+    url = (url or "").lower()
+    text = (text or "").lower()
+    if captcha or any(marker in url for marker in BLOCKED_URL_MARKERS):
+        return "blocked"
+    if any(marker in text for marker in BLOCKED_TEXT_MARKERS):
+        return "blocked"
+    if any(marker in url for marker in CONSENT_URL_MARKERS) or any(marker in text for marker in CONSENT_TEXT_MARKERS):
+        return "consent"
+    return ""
+
+
+class NavigationRateLimiter:
+    """Token bucket for Maps navigations with AIMD rate control, shared through the state store
+
+    The bucket lives in the SQLite state store, so every page, context and
+    process using the same database draws from one budget. Clean navigations
+    raise the shared rate a little; a captcha or "unusual traffic" page halves
+    it and pauses everyone for a cooldown; further blocks during that cooldown
+    do not halve it again. Consent interstitials are reported but are not a
+    throttling signal.
+    """
+
+    def __init__(self, state_store, name="google_maps", rate=DEFAULT_RATE, burst=BURST, min_rate=MIN_RATE,
+                 max_rate=MAX_RATE, increase=RATE_INCREASE, decrease=RATE_DECREASE,
+                 cooldown_seconds=BLOCK_COOLDOWN_SECONDS):
+        self.state_store = state_store
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown_seconds = cooldown_seconds
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.outcomes = Counter()
+
+    def bucket_options(self):
+        return self.name, self.rate, self.burst
+
+    async def acquire(self):
+        """Wait until the shared bucket has a token for one navigation"""
+        started = time.perf_counter()
+        while True:
+            try:
+                wait = self.state_store.take_rate_token(*self.bucket_options())
+            except Exception as e:
+                print(f"⚠️ Rate limiter unavailable, navigating without it: {e}")
+                wait = 0
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(wait, MAX_WAIT_STEP_SECONDS))
+        self.acquired += 1
+        self.waited_seconds += time.perf_counter() - started
+
+    def adjust(self, **changes):
+        try:
+            self.rate = self.state_store.adjust_rate(*self.bucket_options(), self.min_rate, self.max_rate, **changes)
+        except Exception as e:
+            print(f"⚠️ Could not update the shared rate: {e}")
+
+    def record_success(self):
+        self.outcomes["ok"] += 1
+        self.adjust(increase=self.increase)
+
+    def record_block(self, kind="blocked"):
+        self.outcomes[kind] += 1
+        self.adjust(factor=self.decrease, cooldown_seconds=self.cooldown_seconds)
+        print(f"🚦 Google served a {kind} page: rate now {self.rate:.2f}/s, "
+              f"pausing navigations for {self.cooldown_seconds}s")
+
+    async def check_page(self, page):
+        """Classify the page after a navigation and feed the result into the AIMD controller"""
+        try:
+            signals = await page.evaluate(BLOCK_CHECK_JS)
+        except Exception:
+            signals = {}
+        kind = classify_page(page.url, signals.get("captcha"), signals.get("text"))
+        if kind == "blocked":
+            self.record_block()
+        elif kind == "consent":
+            self.outcomes["consent"] += 1
+        else:
+            self.record_success()
+        return kind
+
+    def print_summary(self):
+        if not self.acquired:
+            return
+        try:
+            # Other pages and processes move the shared rate too
+            self.rate = (self.state_store.load_rate_limit(self.name) or {}).get("rate", self.rate)
+        except Exception:
+            pass
+        print(f"🚦 Rate limiter: {self.acquired} navigations, {self.waited_seconds:.1f}s waiting, "
+              f"rate now {self.rate:.2f}/s, outcomes {dict(self.outcomes)}")
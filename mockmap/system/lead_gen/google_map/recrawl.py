@@ -0,0 +1,109 @@
+import hashlib
+import math
+import time
+
+SNAPSHOT_FIELDS = ("name", "website", "phone", "address", "rating", "review_count")
+# Placeholders extract_business_info uses for missing values
+MISSING_VALUES = frozenset({"", "not found", "no address found", "unknown business"})
+
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MIN_AGE_DAYS = 3
+# Score bonuses on top of age (1.0 = max_age_days old)
+MISSING_WEBSITE_BONUS = 1.0
+RECENT_CHANGE_BONUS = 0.5
+POPULARITY_WEIGHT = 0.5
+SECONDS_PER_DAY = 86400
+
+
+def normalized_value(value):
+    value = str(value if value is not None else "").strip().lower()
+    return "" if value in MISSING_VALUES else " ".join(value.split())
+
+
+def field_hashes(business_info):
+    """Short hash of every snapshot field's normalized value"""
+    return {
+        field: hashlib.sha1(normalized_value(business_info.get(field)).encode("utf-8")).hexdigest()[:12]
+        for field in SNAPSHOT_FIELDS
+    }
+
+
+def parse_number(value, kind=float):
+    try:
+        return kind(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot_row(place_key, query, url, business_info):
+    """Row for ScraperStateStore.save_place_snapshots"""
+    return (
+        place_key,
+        query or "",
+        url,
+        field_hashes(business_info),
+        parse_number(business_info.get("rating")),
+        parse_number(business_info.get("review_count"), int),
+        bool(normalized_value(business_info.get("website"))),
+    )
+
+
+class RecrawlScheduler:
+    """Pick the already-scraped places most worth revisiting within a visit budget
+
+    A place is due once it is max_age_days old. Younger places (but at least
+    min_age_days old) also qualify when a revisit could pay off: no website
+    was found last time, or its fields changed on the previous recrawl.
+    Candidates are ranked by age (1.0 at max_age_days) plus those bonuses and
+    a small popularity term from the review count, and the top `budget` are
+    visited.
+    """
+
+    def __init__(self, state_store, max_age_days=DEFAULT_MAX_AGE_DAYS, min_age_days=DEFAULT_MIN_AGE_DAYS):
+        self.state_store = state_store
+        self.max_age_days = max_age_days
+        self.min_age_days = min_age_days
+        self.known = 0
+        self.eligible = 0
+
+    def priority(self, snapshot, now):
+        """Score for a snapshot, or None if it should not be revisited yet"""
+        age_days = (now - snapshot["scraped_at"]) / SECONDS_PER_DAY
+        if age_days < self.min_age_days:
+            return None
+
+        bonus = 0.0
+        if not snapshot["has_website"]:
+            bonus += MISSING_WEBSITE_BONUS
+        if snapshot["changed_fields"]:
+            bonus += RECENT_CHANGE_BONUS
+        stale = age_days >= self.max_age_days
+        if not stale and not bonus:
+            return None
+
+        popularity = min(1.0, math.log10(1 + (snapshot["review_count"] or 0)) / 4)
+        return age_days / self.max_age_days + bonus + POPULARITY_WEIGHT * popularity
+
+    def plan(self, budget, query=None):
+        """Snapshots to revisit, highest priority first (at most budget)"""
+        now = time.time()
+        snapshots = self.state_store.load_place_snapshots(
+            query=query, scraped_before=now - self.min_age_days * SECONDS_PER_DAY)
+        self.known = self.state_store.count_place_snapshots(query)
+
+        scored = []
+        for snapshot in snapshots:
+            score = self.priority(snapshot, now)
+            if score is not None:
+                snapshot["priority"] = round(score, 3)
+                scored.append(snapshot)
+        self.eligible = len(scored)
+        scored.sort(key=lambda snapshot: snapshot["priority"], reverse=True)
+        return scored[:max(0, budget)]
+
+    def print_plan(self, plan):
+        missing_website = sum(1 for snapshot in plan if not snapshot["has_website"])
+        changed = sum(1 for snapshot in plan if snapshot["changed_fields"])
+        share = f" ({len(plan) / self.known:.0%} of {self.known} known places)" if self.known else ""
+        print(f"🔁 Recrawl plan: {len(plan)} of {self.eligible} eligible places{share}; "
+              f"{missing_website} missing a website, {changed} changed last time")
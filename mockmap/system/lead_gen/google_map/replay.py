@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+DEFAULT_FIXTURES_DIR = "csv-json/fixtures"
+INDEX_FILE = "index.jsonl"
+BENCHMARK_HISTORY_FILE = "benchmarks.jsonl"
+COMPARED_FIELDS = ("name", "website", "phone", "address", "rating", "review_count")
+SCRIPT_RE = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
+# A replayed feed never grows, so growth waits only need to notice the end marker
+REPLAY_WAIT_TIMEOUTS = {"scroll_restore": 2000, "feed_growth": 150, "lazy_load": 150, "show_more": 150}
+
+
+class PageRecorder:
+    """Save rendered Maps pages as static HTML fixtures for offline replay
+
+    Each fixture is the page's DOM with scripts removed (so it stays exactly
+    as recorded when served again), plus an index.jsonl line with its URL and
+    the values the scraper extracted at record time, which the benchmark uses
+    as the expected result. Expected values can be corrected by hand.
+    """
+
+    def __init__(self, fixtures_dir=DEFAULT_FIXTURES_DIR, max_per_kind=50):
+        self.fixtures_dir = fixtures_dir
+        self.max_per_kind = max_per_kind
+        self.recorded = defaultdict(int)
+        self.known_urls = {entry["url"] for entry in load_fixture_index(fixtures_dir)}
+
+    async def record(self, page, kind, expected):
+        """Save the current page as a `kind` ("detail" or "feed") fixture"""
+        if self.recorded[kind] >= self.max_per_kind:
+            return None
+        try:
+            url = page.url
+            if url in self.known_urls:
+                return None
+            html = SCRIPT_RE.sub("", await page.content())
+
+            directory = os.path.join(self.fixtures_dir, kind)
+            os.makedirs(directory, exist_ok=True)
+            filename = f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]}.html"
+            with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+                f.write(html)
+
+            entry = {
+                "kind": kind,
+                "url": url,
+                "file": os.path.join(kind, filename),
+                "expected": expected,
+                "recorded_at": time.time(),
+            }
+            with open(os.path.join(self.fixtures_dir, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.known_urls.add(url)
+            self.recorded[kind] += 1
+            print(f"📼 Recorded {kind} fixture: {filename}")
+            return entry
+        except Exception as e:
+            print(f"⚠️ Could not record {kind} fixture: {e}")
+            return None
+
+
+def load_fixture_index(fixtures_dir=DEFAULT_FIXTURES_DIR):
+    """Fixture entries from index.jsonl, newest recording per URL"""
+    entries = {}
+    try:
+        with open(os.path.join(fixtures_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["url"]] = entry
+    except FileNotFoundError:
+        pass
+    return list(entries.values())
+
+
+async def install_replay_routes(context, fixtures_dir, entries):
+    """Serve recorded pages at their original URLs and abort every other request"""
+    bodies = {}
+    for entry in entries:
+        with open(os.path.join(fixtures_dir, entry["file"]), "r", encoding="utf-8") as f:
+            bodies[entry["url"]] = f.read()
+
+    async def handle(route):
+        body = bodies.get(route.request.url)
+        if body is None:
+            await route.abort()
+        else:
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=body)
+
+    await context.route("**/*", handle)
+
+
+def field_matches(expected, actual):
+    if expected in (None, "", "Not found", "No address found"):
+        return actual in (None, "", "Not found", "No address found")
+    return str(expected).strip().lower() == str(actual).strip().lower()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def run_replay_benchmark(fixtures_dir=DEFAULT_FIXTURES_DIR, iterations=1, headless=True):
+    """Replay recorded fixtures through the real extraction code and report speed and accuracy"""
+    from playwright.async_api import async_playwright
+    from mockmap.system.lead_gen.google_map.gm_scraper import MapsBusinessScraper, USER_AGENT
+    from mockmap.system.lead_gen.google_map.selector_stats import SelectorStats
+
+    entries = load_fixture_index(fixtures_dir)
+    details = [entry for entry in entries if entry["kind"] == "detail"]
+    feeds = [entry for entry in entries if entry["kind"] == "feed"]
+    if not entries:
+        print(f"❌ No fixtures in {fixtures_dir}; record some with record_fixtures=True first")
+        return None
+    print(f"📼 Replaying {len(details)} detail and {len(feeds)} feed fixtures x{iterations}")
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        # Fresh state: no learned selector order, no visited places
+        scraper = MapsBusinessScraper(block_resources=False, wait_timeouts=REPLAY_WAIT_TIMEOUTS,
+                                      state_db=os.path.join(state_dir, "state.sqlite3"))
+        scraper.selector_stats = SelectorStats(None, flush_every=0)
+
+        detail_ms = []
+        correct = defaultdict(int)
+        feed_ms = []
+        feed_cards = []
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=headless)
+            context = await browser.new_context(user_agent=USER_AGENT)
+            await install_replay_routes(context, fixtures_dir, entries)
+            page = await context.new_page()
+            try:
+                for _ in range(iterations):
+                    for entry in details:
+                        await page.goto(entry["url"], wait_until="domcontentloaded")
+                        started = time.perf_counter()
+                        business_info = await scraper.extract_business_info(page)
+                        detail_ms.append((time.perf_counter() - started) * 1000)
+                        for field in COMPARED_FIELDS:
+                            if field_matches(entry["expected"].get(field), business_info.get(field)):
+                                correct[field] += 1
+
+                    for entry in feeds:
+                        await page.goto(entry["url"], wait_until="domcontentloaded")
+                        started = time.perf_counter()
+                        card_urls = await scraper.discover_all_cards(page, "")
+                        feed_ms.append((time.perf_counter() - started) * 1000)
+                        feed_cards.append((len(card_urls), entry["expected"].get("cards", 0)))
+            finally:
+                await browser.close()
+        scraper.state_store.close()
+
+    # In-page selector time per field, from the extraction timings
+    field_ms = defaultdict(float)
+    for (field, _), (_, _, total_ms) in scraper.selector_stats.pending.items():
+        field_ms[field] += total_ms
+
+    detail_runs = len(detail_ms)
+    report = {
+        "recorded_at": time.time(),
+        "detail_pages": detail_runs,
+        "pages_per_sec": round(detail_runs / (sum(detail_ms) / 1000), 2) if detail_ms else 0.0,
+        "detail_mean_ms": round(sum(detail_ms) / detail_runs, 1) if detail_ms else 0.0,
+        "detail_p95_ms": round(percentile(detail_ms, 0.95), 1),
+        "field_query_ms": {field: round(total / detail_runs, 2) for field, total in field_ms.items()} if detail_runs else {},
+        "accuracy": {field: round(correct[field] / detail_runs, 3) for field in COMPARED_FIELDS} if detail_runs else {},
+        "feed_pages": len(feed_ms),
+        "feed_mean_ms": round(sum(feed_ms) / len(feed_ms), 1) if feed_ms else 0.0,
+        "feed_card_recall": round(sum(min(found, expected) for found, expected in feed_cards) /
+                                  max(1, sum(expected for _, expected in feed_cards)), 3),
+    }
+    print_benchmark_report(report, load_last_benchmark(fixtures_dir))
+    with open(os.path.join(fixtures_dir, BENCHMARK_HISTORY_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps(report) + "\n")
+    return report
+
+
+def load_last_benchmark(fixtures_dir):
+    try:
+        with open(os.path.join(fixtures_dir, BENCHMARK_HISTORY_FILE), "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        return json.loads(lines[-1]) if lines else None
+    except FileNotFoundError:
+        return None
+
+
+def print_benchmark_report(report, previous=None):
+    def delta(key):
+        if not previous or key not in previous:
+            return ""
+        return f" (prev {previous[key]})"
+
+    print("\n📊 REPLAY BENCHMARK")
+    print(f"   • Detail pages: {report['detail_pages']} at {report['pages_per_sec']} pages/sec{delta('pages_per_sec')}")
+    print(f"   • Extraction: mean {report['detail_mean_ms']}ms{delta('detail_mean_ms')}, "
+          f"p95 {report['detail_p95_ms']}ms{delta('detail_p95_ms')}")
+    for field, value in sorted(report["field_query_ms"].items()):
+        print(f"   • {field}: {value}ms of selector queries per page")
+    for field, value in report["accuracy"].items():
+        previous_value = (previous or {}).get("accuracy", {}).get(field)
+        suffix = f" (prev {previous_value:.0%})" if previous_value is not None else ""
+        print(f"   • {field} accuracy: {value:.0%}{suffix}")
+    if report["feed_pages"]:
+        print(f"   • Feeds: {report['feed_pages']} discovered in mean {report['feed_mean_ms']}ms"
+              f"{delta('feed_mean_ms')}, card recall {report['feed_card_recall']:.0%}")
+
+
+if __name__ == "__main__":
+    fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURES_DIR
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    asyncio.run(run_replay_benchmark(fixtures_dir, iterations))
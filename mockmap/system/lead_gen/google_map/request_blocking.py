@@ -0,0 +1,243 @@
+import asyncio
+from collections import Counter
+from urllib.parse import urlparse
+
+# Rough transfer size per aborted request, used to estimate bandwidth saved.
+# Aborted requests never report a size, so these are averages, not measurements.
+ESTIMATED_BYTES = {
+    "image": 35_000,
+    "media": 250_000,
+    "font": 40_000,
+    "stylesheet": 25_000,
+    "script": 60_000,
+    "map_tile": 20_000,
+    "tracker": 5_000,
+    "other": 5_000,
+}
+
+TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "facebook.com/tr",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "cdn.segment.com",
+    "mixpanel.com",
+    "newrelic.com",
+    "nr-data.net",
+    "sentry.io",
+    "intercom.io",
+    "tiktok.com/i18n/pixel",
+    "bat.bing.com",
+)
+
+
+
+def split_tracker(tracker):
+    """Split a TRACKER_HOSTS entry ("facebook.com/tr") into its host and path prefix"""
+    host, _, path = tracker.lower().partition("/")
+    return host, f"/{path}" if path else ""
+
+
+def is_tracker_url(url, trackers):
+    """True if the URL's host is a tracker host (or a subdomain of one) under its path prefix
+
+    Only the parsed host and path are compared, so "facebook.com/tr" matches
+    facebook.com/tr?id=1 but neither facebook.com/travel nor a tracker name
+    that appears in some other site's query string.
+    """
+    parsed = urlparse(url.lower())
+    host = parsed.hostname or ""
+    path = parsed.path or "/"
+    for tracker_host, prefix in trackers:
+        if host != tracker_host and not host.endswith(f".{tracker_host}"):
+            continue
+        if not prefix or path == prefix or path.startswith(f"{prefix}/"):
+            return True
+    return False
+
+
+def tracker_url_patterns(tracker):
+    """CDP Network.setBlockedURLs wildcards equivalent to is_tracker_url for one entry"""
+    host, prefix = split_tracker(tracker)
+    patterns = []
+    for pattern_host in (host, f"*.{host}"):
+        if prefix:
+            patterns += [f"*://{pattern_host}{prefix}", f"*://{pattern_host}{prefix}?*",
+                         f"*://{pattern_host}{prefix}/*"]
+        else:
+            patterns.append(f"*://{pattern_host}/*")
+    return patterns
+
+
+# Google Maps: keep scripts, styles and XHR (extraction needs them),
+# drop pixels, tiles, street view and logging pings.
+MAPS_BLOCKING_PROFILE = {
+    "name": "maps",
+    "resource_types": {"image", "media", "font"},
+    "map_tile_patterns": (
+        "/maps/vt", "/vt?", "/kh?", "/maps/rpc/vt", "khms", "streetviewpixels",
+        "/maps/photo", "googleusercontent.com/p/", "lh5.googleusercontent", "lh3.googleusercontent",
+    ),
+    "url_patterns": ("/gen_204", "/log?", "csi.gstatic.com", "/maps/preview/log204"),
+    "tracker_hosts": TRACKER_HOSTS,
+}
+
+# Business websites (email extraction): only the HTML and text matter
+WEBSITE_BLOCKING_PROFILE = {
+    "name": "website",
+    "resource_types": {"image", "media", "font", "stylesheet"},
+    "map_tile_patterns": (),
+    "url_patterns": ("/gen_204", "/collect?", "/pixel", "/beacon"),
+    "tracker_hosts": TRACKER_HOSTS,
+}
+
+# CDP URL blocking only matches URL wildcards, so resource types become file extensions
+RESOURCE_TYPE_URL_PATTERNS = {
+    "image": ("*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"),
+    "media": ("*.mp4*", "*.webm*", "*.mp3*", "*.m4a*"),
+    "font": ("*.woff*", "*.ttf*", "*.otf*"),
+    "stylesheet": ("*.css*",),
+}
+
+
+class RequestBlocker:
+    """Abort non-essential requests on a Playwright context and count what was saved"""
+
+    def __init__(self, profile=MAPS_BLOCKING_PROFILE):
+        self.profile = profile
+        self.trackers = [split_tracker(tracker) for tracker in profile["tracker_hosts"]]
+        self.allowed = 0
+        self.blocked = Counter()
+        self.bytes_saved = 0
+        self.page_listeners = {}
+        self.page_setups = {}
+
+    async def install(self, target, keep_cache=False):
+        """Route every request of a page or browser context through the blocker
+
+        Routing turns off Chromium's HTTP cache for the target. With keep_cache
+        (contexts leased from the browser service, whose disk cache is the point
+        of the service) requests are blocked with CDP Network.setBlockedURLs
+        instead. The cache keeps working, but blocking is by URL pattern only:
+        resource types are matched by file extension, and blocked requests are
+        counted by resource type rather than tracker or map tile.
+        """
+        if keep_cache:
+            await self.install_cdp(target)
+        else:
+            await target.route("**/*", self.handle_route)
+
+    def blocked_url_patterns(self):
+        patterns = [pattern for tracker in self.profile["tracker_hosts"] for pattern in tracker_url_patterns(tracker)]
+        patterns += [f"*{pattern}*" for pattern in self.profile["map_tile_patterns"]]
+        patterns += [f"*{pattern}*" for pattern in self.profile["url_patterns"]]
+        for resource_type in self.profile["resource_types"]:
+            patterns += RESOURCE_TYPE_URL_PATTERNS.get(resource_type, ())
+        return patterns
+
+    async def install_cdp(self, context):
+        """Block by URL pattern on every current and future page of a context, keeping its HTTP cache"""
+        def on_page(page):
+            self.page_setups[page] = asyncio.ensure_future(self.block_page(context, page))
+            page.once("close", lambda _: self.page_setups.pop(page, None))
+
+        self.page_listeners[context] = on_page
+        context.on("page", on_page)
+        for page in context.pages:
+            await self.block_page(context, page)
+
+    async def block_page(self, context, page):
+        try:
+            session = await context.new_cdp_session(page)
+            session.on("Network.responseReceived", self.count_cdp_response)
+            session.on("Network.loadingFailed", self.count_cdp_failure)
+            await session.send("Network.enable")
+            await session.send("Network.setBlockedURLs", {"urls": self.blocked_url_patterns()})
+        except Exception as e:
+            print(f"⚠️ Could not block requests over CDP: {e}")
+
+    async def ready(self, page):
+        """Wait until a new page's CDP blocking is in place (no-op for routed targets)"""
+        setup = self.page_setups.pop(page, None)
+        if setup:
+            await setup
+
+    def uninstall(self, context):
+        """Stop blocking new pages of a context before it goes back to the browser service pool"""
+        listener = self.page_listeners.pop(context, None)
+        if listener:
+            context.remove_listener("page", listener)
+
+    def count_cdp_response(self, event):
+        self.allowed += 1
+
+    def count_cdp_failure(self, event):
+        if event.get("blockedReason") != "inspector":
+            return
+        category = (event.get("type") or "other").lower()
+        if category not in ESTIMATED_BYTES:
+            category = "other"
+        self.blocked[category] += 1
+        self.bytes_saved += ESTIMATED_BYTES[category]
+
+    def classify(self, url, resource_type):
+        """Return the block category for a request, or None to let it through"""
+        url_lower = url.lower()
+
+        if is_tracker_url(url_lower, self.trackers):
+            return "tracker"
+        if any(pattern in url_lower for pattern in self.profile["map_tile_patterns"]):
+            return "map_tile"
+        if resource_type in self.profile["resource_types"]:
+            return resource_type
+        if any(pattern in url_lower for pattern in self.profile["url_patterns"]):
+            return "other"
+        return None
+
+    async def handle_route(self, route):
+        request = route.request
+        try:
+            category = self.classify(request.url, request.resource_type)
+        except Exception:
+            category = None
+
+        if category is None:
+            self.allowed += 1
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+            return
+
+        self.blocked[category] += 1
+        self.bytes_saved += ESTIMATED_BYTES.get(category, ESTIMATED_BYTES["other"])
+        try:
+            await route.abort()
+        except Exception:
+            pass
+
+    def summary(self):
+        total_blocked = sum(self.blocked.values())
+        return {
+            "profile": self.profile["name"],
+            "allowed_requests": self.allowed,
+            "blocked_requests": total_blocked,
+            "blocked_by_type": dict(self.blocked),
+            "estimated_bytes_saved": self.bytes_saved,
+        }
+
+    def print_summary(self):
+        total_blocked = sum(self.blocked.values())
+        total = total_blocked + self.allowed
+        share = (total_blocked / total) * 100 if total else 0
+        print(f"🚫 Blocked {total_blocked}/{total} requests ({share:.1f}%) with '{self.profile['name']}' profile")
+        print(f"   📉 ~{self.bytes_saved / 1_000_000:.1f} MB saved (estimated)")
+        for category, count in self.blocked.most_common():
+            print(f"   • {category}: {count}")
@@ -0,0 +1,206 @@
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_METRICS_DIR = "csv-json/metrics"
+STAGES = ("discovery_scroll", "navigation", "extraction", "db_check", "db_write", "csv_flush")
+COUNTERS = ("visited", "skipped_duplicate", "skipped_no_website", "skipped_no_name", "failed", "saved")
+# Upper bounds in ms; the last bucket is +Inf
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+METRIC_PREFIX = "mockmap_scraper"
+
+
+class StageHistogram:
+    """Fixed-bucket latency histogram (ms) with count, sum and max"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.buckets[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (max for the +Inf bucket)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return float(HISTOGRAM_BUCKETS_MS[index]) if index < len(HISTOGRAM_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 1),
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip([str(bound) for bound in HISTOGRAM_BUCKETS_MS] + ["+Inf"], self.buckets)),
+        }
+
+
+class RunMetrics:
+    """Stage latency histograms, outcome counters and queue-depth gauges for one scraper run
+
+    Safe to update from the sync_to_async worker threads that run DB writes.
+    """
+
+    def __init__(self, run=""):
+        self.run = run
+        self.started_at = time.time()
+        self.stages = {stage: StageHistogram() for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges = {}
+        self.gauge_peaks = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, ms):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = StageHistogram()
+            self.stages[stage].observe(ms)
+
+    @contextmanager
+    def stage(self, stage):
+        """Time the body of a with block as one observation of stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+            self.gauge_peaks[name] = max(self.gauge_peaks.get(name, value), value)
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.time() - self.started_at
+            return {
+                "run": self.run,
+                "started_at": self.started_at,
+                "seconds": round(elapsed, 1),
+                "saved_per_min": round(self.counters.get("saved", 0) / elapsed * 60, 2) if elapsed else 0.0,
+                "counters": dict(self.counters),
+                "gauges": {name: {"last": value, "peak": self.gauge_peaks[name]}
+                           for name, value in self.gauges.items()},
+                "stages": {stage: histogram.summary() for stage, histogram in self.stages.items()},
+            }
+
+    def write_json(self, directory=DEFAULT_METRICS_DIR):
+        """Write the summary to <directory>/<run>-<timestamp>.json and return the path"""
+        try:
+            os.makedirs(directory, exist_ok=True)
+            safe_run = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.run or "run")
+            path = os.path.join(directory, f"{safe_run}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, indent=2)
+            print(f"📈 Run metrics saved to {path}")
+            return path
+        except Exception as e:
+            print(f"⚠️ Could not save run metrics: {e}")
+            return None
+
+    def prometheus_lines(self):
+        """Prometheus text-format samples for this run, labelled run="<run>" """
+        label = 'run="' + self.run.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        lines = []
+        with self.lock:
+            for counter, value in self.counters.items():
+                lines.append(f"{METRIC_PREFIX}_{counter}_total{{{label}}} {value}")
+            for name, value in self.gauges.items():
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label}}} {value}")
+            for stage, histogram in self.stages.items():
+                name = f"{METRIC_PREFIX}_{stage}_seconds"
+                cumulative = 0
+                for bound, bucket_count in zip(list(HISTOGRAM_BUCKETS_MS) + [None], histogram.buckets):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound is None else f"{bound / 1000:g}"
+                    lines.append(f'{name}_bucket{{{label},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label}}} {histogram.total_ms / 1000:.6f}")
+                lines.append(f"{name}_count{{{label}}} {histogram.count}")
+        return lines
+
+    def print_summary(self):
+        summary = self.summary()
+        counters = summary["counters"]
+        print(f"📈 Stage timings ({summary['seconds']}s run):")
+        for stage, row in summary["stages"].items():
+            if row["count"]:
+                print(f"   • {stage}: {row['count']}x, mean {row['mean_ms']}ms, p95 ≤{row['p95_ms']:.0f}ms, "
+                      f"total {row['total_ms'] / 1000:.1f}s")
+        print(f"   • visited {counters.get('visited', 0)}, saved {counters.get('saved', 0)}, "
+              f"duplicates {counters.get('skipped_duplicate', 0)}, no website {counters.get('skipped_no_website', 0)}")
+        for name, row in summary["gauges"].items():
+            print(f"   • {name}: peak {row['peak']}")
+
+
+class MetricsExporter:
+    """Serve the registered runs' metrics in Prometheus text format on a local port"""
+
+    def __init__(self, port, host="127.0.0.1"):
+        self.runs = []
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"📈 Prometheus metrics at http://{host}:{self.server.server_address[1]}/metrics")
+
+    def register(self, metrics):
+        if metrics not in self.runs:
+            self.runs.append(metrics)
+
+    def render(self):
+        lines = []
+        for metrics in list(self.runs):
+            lines.extend(metrics.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def make_handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                payload = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+_exporters = {}
+
+
+def shared_metrics_exporter(port):
+    """The per-process exporter on a port, shared by every scraper that asks for it"""
+    if port not in _exporters:
+        _exporters[port] = MetricsExporter(port)
+    return _exporters[port]
@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+# Fields whose selector lists are reordered; "links" is a single catch-all selector
+ORDERED_FIELDS = ("name", "website", "phone", "address", "rating", "reviews")
+
+
+class SelectorStats:
+    """Per-selector hit/miss counts and in-page query latency, persisted in the state store
+
+    A selector "hits" when it produced the value that was used for its field;
+    every other selector evaluated for that field counts as a miss. Selector
+    lists are ordered by smoothed hit rate (then mean latency), so unseen
+    selectors sit between proven and failing ones and keep their original order.
+    """
+
+    def __init__(self, state_store=None, flush_every=25):
+        self.state_store = state_store
+        self.flush_every = flush_every
+        self.totals = {}
+        self.pending = defaultdict(lambda: [0, 0, 0.0])
+        self.pages = 0
+        if state_store is not None:
+            try:
+                self.totals = state_store.load_selector_stats()
+            except Exception as e:
+                print(f"⚠️ Could not load selector stats: {e}")
+
+    def counts(self, field, selector):
+        hits, misses, total_ms = self.totals.get((field, selector), (0, 0, 0.0))
+        extra = self.pending.get((field, selector))
+        if extra:
+            hits, misses, total_ms = hits + extra[0], misses + extra[1], total_ms + extra[2]
+        return hits, misses, total_ms
+
+    def score(self, field, selector):
+        hits, misses, total_ms = self.counts(field, selector)
+        evaluated = hits + misses
+        hit_rate = (hits + 1) / (evaluated + 2)
+        mean_ms = total_ms / evaluated if evaluated else 0.0
+        return -hit_rate, mean_ms
+
+    def ordered(self, field, selectors):
+        """Selectors for a field, most useful first (stable for ties)"""
+        return sorted(selectors, key=lambda selector: self.score(field, selector))
+
+    def ordered_config(self, config):
+        """Copy of an EXTRACTION_SELECTORS-style config with every list reordered"""
+        ordered = dict(config)
+        for field in ORDERED_FIELDS:
+            if field in ordered:
+                ordered[field] = self.ordered(field, ordered[field])
+        return ordered
+
+    def record_page(self, timings, used):
+        """Record one extraction: timings are [field, selector, ms, matches], used maps field -> selector"""
+        for field, selector, elapsed_ms, _ in timings or []:
+            row = self.pending[(field, selector)]
+            if used.get(field) == selector:
+                row[0] += 1
+            else:
+                row[1] += 1
+            row[2] += elapsed_ms
+
+        self.pages += 1
+        if self.flush_every and self.pages % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        """Add pending counts to the persisted totals"""
+        if not self.pending:
+            return
+        rows = [(field, selector, hits, misses, total_ms)
+                for (field, selector), (hits, misses, total_ms) in self.pending.items()]
+        try:
+            if self.state_store is not None:
+                self.state_store.add_selector_stats(rows)
+        except Exception as e:
+            print(f"⚠️ Could not save selector stats: {e}")
+            return
+        for field, selector, hits, misses, total_ms in rows:
+            totals = self.totals.setdefault((field, selector), [0, 0, 0.0])
+            totals[0] += hits
+            totals[1] += misses
+            totals[2] += total_ms
+        self.pending.clear()
+
+    def never_hit(self, config, min_evaluations=20):
+        """(field, selector, evaluations) for selectors evaluated often but never used"""
+        stale = []
+        for field in ORDERED_FIELDS:
+            for selector in config.get(field, []):
+                hits, misses, _ = self.counts(field, selector)
+                if hits == 0 and misses >= min_evaluations:
+                    stale.append((field, selector, misses))
+        return stale
+
+    def print_summary(self, config):
+        stale = self.never_hit(config)
+        print("🎯 Selector order (by hit rate):")
+        for field in ORDERED_FIELDS:
+            top = self.ordered(field, config.get(field, []))[:2]
+            described = []
+            for selector in top:
+                hits, misses, total_ms = self.counts(field, selector)
+                evaluated = hits + misses
+                if evaluated:
+                    described.append(f"{selector} ({hits}/{evaluated}, {total_ms / evaluated:.2f}ms)")
+            if described:
+                print(f"   • {field}: {', '.join(described)}")
+        if stale:
+            print(f"🪦 {len(stale)} selectors never hit:")
+            for field, selector, evaluations in stale:
+                print(f"   • {field}: {selector} (0/{evaluations})")
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from mockmap.system.lead_gen.google_map.loop_monitor import run_monitored
+
+
+def shard_jobs(jobs, shards):
+    """Split (niche, location) jobs round-robin into at most `shards` non-empty lists"""
+    buckets = [[] for _ in range(max(1, shards))]
+    for index, job in enumerate(jobs):
+        buckets[index % len(buckets)].append(job)
+    return [bucket for bucket in buckets if bucket]
+
+
+def run_shard(shard_id, jobs, options):
+    """Process-pool entry point: scrape one shard on its own event loop and browser"""
+    # Imported here so each spawned process sets up Django and Playwright itself
+    from mockmap.system.lead_gen.google_map.gm_scraper import LocationScheduler
+    from mockmap.system.lead_gen.google_map.business_index import shared_business_index
+
+    started = time.perf_counter()
+    scheduler = LocationScheduler(**options.get("scheduler", {}))
+    outputs = run_monitored(scheduler.run(jobs, max_results=options.get("max_results", 100),
+                                           clean_sweep=options.get("clean_sweep", True)))
+    return {
+        "shard": shard_id,
+        "pid": os.getpid(),
+        "outputs": outputs,
+        "queries": scheduler.finished,
+        "index": shared_business_index().summary(),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def merge_shard_metrics(shard_results):
+    """Combine per-shard results into one summary"""
+    merged = {
+        "shards": len(shard_results),
+        "queries": {},
+        "outputs": [],
+        "saved": 0,
+        "failed": [],
+        "index": {},
+        "slowest_shard_seconds": 0,
+    }
+    for result in shard_results:
+        merged["outputs"].extend(result["outputs"])
+        merged["queries"].update(result["queries"])
+        merged["slowest_shard_seconds"] = max(merged["slowest_shard_seconds"], result["seconds"])
+        for key, value in result["index"].items():
+            if not key.endswith("_rate"):
+                merged["index"][key] = merged["index"].get(key, 0) + value
+
+    for query, row in merged["queries"].items():
+        merged["saved"] += row["saved"]
+        if row["status"] != "done":
+            merged["failed"].append(query)
+
+    index = merged["index"]
+    if index.get("place_lookups"):
+        index["place_hit_rate"] = round(index["place_hits"] / index["place_lookups"], 3)
+    if index.get("website_lookups"):
+        index["domain_hit_rate"] = round(index["domain_hits"] / index["website_lookups"], 3)
+    return merged
+
+
+def run_sharded(jobs, processes=None, concurrency=2, max_results=100, clean_sweep=True, **scraper_options):
+    """Scrape (niche, location) jobs across a pool of processes
+
+    Each process runs a LocationScheduler over its shard with its own event loop
+    and browser. Processes share the SQLite state store (WAL) and the Lead table,
+    which is where cross-process dedup happens; per-shard metrics are merged
+    and printed at the end.
+    """
+    jobs = list(jobs)
+    processes = max(1, min(processes or os.cpu_count() or 1, len(jobs) or 1))
+    shards = shard_jobs(jobs, processes)
+    options = {
+        "max_results": max_results,
+        "clean_sweep": clean_sweep,
+        "scheduler": dict(scraper_options, concurrency=concurrency),
+    }
+
+    print(f"🧩 Sharding {len(jobs)} queries across {len(shards)} processes "
+          f"({concurrency} concurrent queries per process)")
+    started = time.perf_counter()
+    shard_results = []
+    # spawn: Playwright and Django connections must not be inherited through fork
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(run_shard, shard_id, shard, options): shard_id for shard_id, shard in enumerate(shards)}
+        for future in as_completed(futures):
+            shard_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Shard {shard_id} crashed: {e}")
+                result = {
+                    "shard": shard_id, "pid": None, "outputs": [], "index": {}, "seconds": 0,
+                    "queries": {f"{niche} in {location}": {"status": "failed", "saved": 0, "seconds": 0, "output": ""}
+                                for niche, location in shards[shard_id]},
+                }
+            shard_results.append(result)
+            print(f"🧩 Shard {shard_id} finished: {sum(row['saved'] for row in result['queries'].values())} saved "
+                  f"in {result['seconds']}s (pid {result['pid']})")
+
+    merged = merge_shard_metrics(shard_results)
+    merged["seconds"] = round(time.perf_counter() - started, 1)
+    # Shards finish in any order; report outputs in job order like run_multi_location
+    merged["outputs"] = [merged["queries"].get(f"{niche} in {location}", {}).get("output", "")
+                         for niche, location in jobs]
+    index = merged["index"]
+    print(f"\n🎉 SHARDED RUN FINISHED in {merged['seconds']}s: {merged['saved']} businesses saved "
+          f"across {len(merged['queries'])} queries and {merged['shards']} processes")
+    if merged["failed"]:
+        print(f"   ❌ Failed: {', '.join(merged['failed'])}")
+    if index.get("place_lookups"):
+        print(f"   🗂️ Cross-query index saved {index['place_hits']} navigations "
+              f"({index['place_hit_rate']:.0%} of {index['place_lookups']} place lookups)")
+    return merged
+
+
+if __name__ == "__main__":
+    niche = sys.argv[1] if len(sys.argv) > 1 else "print shops"
+    locations = sys.argv[2:] or ["atlanta", "new york", "california"]
+    run_sharded([(niche, location) for location in locations])
@@ -0,0 +1,402 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_STATE_DB = "csv-json/scraper_state.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visited_places (
+    query TEXT NOT NULL,
+    place_key TEXT NOT NULL,
+    visited_at REAL NOT NULL,
+    PRIMARY KEY (query, place_key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS visited_places_key ON visited_places (place_key);
+
+CREATE TABLE IF NOT EXISTS scroll_state (
+    query TEXT PRIMARY KEY,
+    max_scroll_position INTEGER NOT NULL DEFAULT 0,
+    last_discovered_count INTEGER NOT NULL DEFAULT 0,
+    timestamp REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS pagination_state (
+    query TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS selector_stats (
+    field TEXT NOT NULL,
+    selector TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    total_ms REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (field, selector)
+);
+
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name TEXT PRIMARY KEY,
+    rate REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS place_snapshots (
+    place_key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    url TEXT NOT NULL,
+    field_hashes TEXT NOT NULL,
+    rating REAL,
+    review_count INTEGER,
+    has_website INTEGER NOT NULL DEFAULT 0,
+    first_scraped_at REAL NOT NULL,
+    scraped_at REAL NOT NULL,
+    changed_at REAL,
+    changed_fields TEXT NOT NULL DEFAULT '',
+    scrape_count INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS place_snapshots_scraped ON place_snapshots (scraped_at);
+
+CREATE TABLE IF NOT EXISTS legacy_imports (
+    path TEXT PRIMARY KEY,
+    imported_at REAL NOT NULL
+);
+"""
+
+
+class ScraperStateStore:
+    """SQLite-backed scraper state: visited places, scroll positions and pagination
+
+    Every write is a small INSERT/UPSERT inside its own transaction, so save cost
+    no longer grows with history size and a crash never leaves a half-written
+    file behind. WAL mode lets several scraper processes share one database.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def transaction(self):
+        """Wrap statements in BEGIN IMMEDIATE / COMMIT, rolling back on error"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # Visited places
+
+    def add_visited(self, query, place_keys):
+        """Append visited place keys for a query; returns how many were new"""
+        place_keys = [key for key in place_keys if key]
+        if not place_keys:
+            return 0
+        now = time.time()
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO visited_places (query, place_key, visited_at) VALUES (?, ?, ?)",
+                [(query, key, now) for key in place_keys],
+            )
+            return conn.total_changes - before
+
+    def visited_for_query(self, query):
+        rows = self.conn.execute("SELECT place_key FROM visited_places WHERE query = ?", (query,))
+        return {row[0] for row in rows}
+
+    def all_visited_keys(self):
+        """Distinct place keys visited by any query"""
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT place_key FROM visited_places")}
+
+    def is_visited(self, place_key, query=None):
+        if query is None:
+            row = self.conn.execute("SELECT 1 FROM visited_places WHERE place_key = ? LIMIT 1", (place_key,))
+        else:
+            row = self.conn.execute("SELECT 1 FROM visited_places WHERE query = ? AND place_key = ?",
+                                    (query, place_key))
+        return row.fetchone() is not None
+
+    def count_visited(self, query=None):
+        if query is None:
+            return self.conn.execute("SELECT COUNT(*) FROM visited_places").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM visited_places WHERE query = ?", (query,)).fetchone()[0]
+
+    # Scroll positions
+
+    def save_scroll_state(self, query, max_scroll_position, last_discovered_count):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO scroll_state (query, max_scroll_position, last_discovered_count, timestamp) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(query) DO UPDATE SET "
+                "max_scroll_position = excluded.max_scroll_position, "
+                "last_discovered_count = excluded.last_discovered_count, "
+                "timestamp = excluded.timestamp",
+                (query, max_scroll_position, last_discovered_count, time.time()),
+            )
+
+    def load_scroll_states(self):
+        rows = self.conn.execute(
+            "SELECT query, max_scroll_position, last_discovered_count, timestamp FROM scroll_state")
+        return {
+            query: {
+                "max_scroll_position": position,
+                "last_discovered_count": count,
+                "timestamp": timestamp,
+            }
+            for query, position, count, timestamp in rows
+        }
+
+    def delete_scroll_state(self, query=None):
+        with self.transaction() as conn:
+            if query is None:
+                conn.execute("DELETE FROM scroll_state")
+            else:
+                conn.execute("DELETE FROM scroll_state WHERE query = ?", (query,))
+
+    # Pagination
+
+    def save_pagination_state(self, query, state):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO pagination_state (query, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(query) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (query, json.dumps(state), time.time()),
+            )
+
+    def load_pagination_states(self):
+        rows = self.conn.execute("SELECT query, state FROM pagination_state")
+        return {query: json.loads(state) for query, state in rows}
+
+    def delete_pagination_state(self, query=None):
+        with self.transaction() as conn:
+            if query is None:
+                conn.execute("DELETE FROM pagination_state")
+            else:
+                conn.execute("DELETE FROM pagination_state WHERE query = ?", (query,))
+
+    # Selector telemetry
+
+    def add_selector_stats(self, rows):
+        """Add (field, selector, hits, misses, total_ms) deltas to the running totals"""
+        if not rows:
+            return
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO selector_stats (field, selector, hits, misses, total_ms, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(field, selector) DO UPDATE SET "
+                "hits = hits + excluded.hits, misses = misses + excluded.misses, "
+                "total_ms = total_ms + excluded.total_ms, updated_at = excluded.updated_at",
+                [(field, selector, hits, misses, total_ms, now) for field, selector, hits, misses, total_ms in rows],
+            )
+
+    def load_selector_stats(self):
+        rows = self.conn.execute("SELECT field, selector, hits, misses, total_ms FROM selector_stats")
+        return {(field, selector): [hits, misses, total_ms] for field, selector, hits, misses, total_ms in rows}
+
+    # Per-place snapshots for incremental recrawls
+
+    def save_place_snapshots(self, rows):
+        """Upsert (place_key, query, url, field_hashes, rating, review_count, has_website) rows
+
+        A place keeps the query that first scraped it. Returns
+        {place_key: [changed field names]} for places that were already
+        known; a change is any field whose hash differs.
+        """
+        if not rows:
+            return {}
+        now = time.time()
+        changes = {}
+        with self.transaction() as conn:
+            for place_key, query, url, field_hashes, rating, review_count, has_website in rows:
+                previous = conn.execute("SELECT field_hashes FROM place_snapshots WHERE place_key = ?",
+                                        (place_key,)).fetchone()
+                if previous is None:
+                    conn.execute(
+                        "INSERT INTO place_snapshots (place_key, query, url, field_hashes, rating, review_count, "
+                        "has_website, first_scraped_at, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (place_key, query, url, json.dumps(field_hashes), rating, review_count,
+                         int(has_website), now, now),
+                    )
+                    continue
+
+                old_hashes = json.loads(previous[0])
+                changed = sorted(field for field, value in field_hashes.items() if old_hashes.get(field) != value)
+                changes[place_key] = changed
+                conn.execute(
+                    "UPDATE place_snapshots SET url = ?, field_hashes = ?, rating = ?, review_count = ?, "
+                    "has_website = ?, scraped_at = ?, scrape_count = scrape_count + 1, "
+                    "changed_fields = ?, changed_at = CASE WHEN ? != '' THEN ? ELSE changed_at END "
+                    "WHERE place_key = ?",
+                    (url, json.dumps(field_hashes), rating, review_count, int(has_website), now,
+                     ",".join(changed), ",".join(changed), now, place_key),
+                )
+        return changes
+
+    def count_place_snapshots(self, query=None):
+        if query is None:
+            return self.conn.execute("SELECT COUNT(*) FROM place_snapshots").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM place_snapshots WHERE query = ?", (query,)).fetchone()[0]
+
+    def load_place_snapshots(self, query=None, scraped_before=None):
+        """Snapshots (as dicts) for a query or all queries, optionally only those scraped before a timestamp"""
+        sql = ("SELECT place_key, query, url, rating, review_count, has_website, first_scraped_at, scraped_at, "
+               "changed_at, changed_fields, scrape_count FROM place_snapshots WHERE 1 = 1")
+        params = []
+        if query is not None:
+            sql += " AND query = ?"
+            params.append(query)
+        if scraped_before is not None:
+            sql += " AND scraped_at < ?"
+            params.append(scraped_before)
+        columns = ("place_key", "query", "url", "rating", "review_count", "has_website", "first_scraped_at",
+                   "scraped_at", "changed_at", "changed_fields", "scrape_count")
+        return [dict(zip(columns, row)) for row in self.conn.execute(sql, params)]
+
+    # Shared token buckets (one row per limiter, used by every process)
+
+    def rate_limit_row(self, conn, name, default_rate, burst, now):
+        row = conn.execute("SELECT rate, tokens, updated_at, blocked_until FROM rate_limits WHERE name = ?",
+                           (name,)).fetchone()
+        if row is None:
+            conn.execute("INSERT INTO rate_limits (name, rate, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                         (name, default_rate, burst, now))
+            return default_rate, burst, 0.0
+        rate, tokens, updated_at, blocked_until = row
+        return rate, min(burst, tokens + max(0.0, now - updated_at) * rate), blocked_until
+
+    def take_rate_token(self, name, default_rate, burst):
+        """Take one token from a bucket; returns 0 on success, else seconds to wait before retrying"""
+        now = time.time()
+        with self.transaction() as conn:
+            rate, tokens, blocked_until = self.rate_limit_row(conn, name, default_rate, burst, now)
+            wait = 0.0
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("UPDATE rate_limits SET tokens = ?, updated_at = ? WHERE name = ?", (tokens, now, name))
+            return wait
+
+    def adjust_rate(self, name, default_rate, burst, min_rate, max_rate, increase=0.0, factor=1.0,
+                    cooldown_seconds=0.0):
+        """Scale a bucket's rate by factor, add increase, clamp it, and optionally pause it; returns the new rate
+
+        A pause (cooldown_seconds) that arrives while the bucket is already paused
+        is ignored, so blocks seen by several pages at once cut the rate only once.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            rate, tokens, blocked_until = self.rate_limit_row(conn, name, default_rate, burst, now)
+            if cooldown_seconds and blocked_until > now:
+                return rate
+            rate = max(min_rate, min(max_rate, rate * factor + increase))
+            if cooldown_seconds:
+                blocked_until = max(blocked_until, now + cooldown_seconds)
+                tokens = 0.0
+            conn.execute("UPDATE rate_limits SET rate = ?, tokens = ?, updated_at = ?, blocked_until = ? "
+                         "WHERE name = ?", (rate, tokens, now, blocked_until, name))
+            return rate
+
+    def load_rate_limit(self, name):
+        row = self.conn.execute("SELECT rate, tokens, updated_at, blocked_until FROM rate_limits WHERE name = ?",
+                                (name,)).fetchone()
+        return dict(zip(("rate", "tokens", "updated_at", "blocked_until"), row)) if row else None
+
+    # One-off import of the old per-query JSON files
+
+    def already_imported(self, path):
+        row = self.conn.execute("SELECT 1 FROM legacy_imports WHERE path = ?", (os.path.abspath(path),))
+        return row.fetchone() is not None
+
+    def mark_imported(self, conn, path):
+        conn.execute("INSERT OR REPLACE INTO legacy_imports (path, imported_at) VALUES (?, ?)",
+                     (os.path.abspath(path), time.time()))
+
+    def import_legacy_visited(self, query, json_path, key_func):
+        """Import a visited_urls_<query>.json file once; returns places imported"""
+        if not os.path.exists(json_path) or self.already_imported(json_path):
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                keys = {key_func(url) for url in json.load(f)}
+        except Exception as e:
+            print(f"⚠️ Could not import {json_path}: {e}")
+            return 0
+
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO visited_places (query, place_key, visited_at) VALUES (?, ?, ?)",
+                [(query, key, now) for key in keys if key],
+            )
+            self.mark_imported(conn, json_path)
+        print(f"📥 Imported {len(keys)} visited places from {json_path}")
+        return len(keys)
+
+    def import_legacy_scroll_state(self, json_path):
+        if not os.path.exists(json_path) or self.already_imported(json_path):
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                states = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not import {json_path}: {e}")
+            return 0
+
+        with self.transaction() as conn:
+            for query, state in states.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO scroll_state "
+                    "(query, max_scroll_position, last_discovered_count, timestamp) VALUES (?, ?, ?, ?)",
+                    (query, state.get("max_scroll_position", 0), state.get("last_discovered_count", 0),
+                     state.get("timestamp", time.time())),
+                )
+            self.mark_imported(conn, json_path)
+        print(f"📥 Imported scroll state for {len(states)} queries from {json_path}")
+        return len(states)
+
+    def import_legacy_pagination_state(self, json_path):
+        if not os.path.exists(json_path) or self.already_imported(json_path):
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                states = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not import {json_path}: {e}")
+            return 0
+
+        now = time.time()
+        with self.transaction() as conn:
+            for query, state in states.items():
+                conn.execute("INSERT OR IGNORE INTO pagination_state (query, state, updated_at) VALUES (?, ?, ?)",
+                             (query, json.dumps(state), now))
+            self.mark_imported(conn, json_path)
+        print(f"📥 Imported pagination state for {len(states)} queries from {json_path}")
+        return len(states)
+
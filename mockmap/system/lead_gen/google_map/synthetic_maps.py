@@ -0,0 +1,328 @@
+import asyncio
+import html
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from mockmap.system.lead_gen.google_map.browser_service import process_tree_rss_mb
+
+# Lead websites use a reserved TLD so the benchmark's rows can be found and removed
+SYNTHETIC_DOMAIN = "mockmap-synthetic.test"
+SYNTHETIC_QUERY = "synthetic print shops"
+BENCHMARK_HISTORY_FILE = "csv-json/load_benchmarks.jsonl"
+# Small feed-growth budget: the server answers within latency_ms, not Maps' seconds
+BENCHMARK_WAIT_TIMEOUTS = {"feed_growth": 1500, "lazy_load": 1500, "show_more": 1500}
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><title>{title} - Google Maps</title></head>
+<body style="margin:0">
+<div role="feed" aria-label="Results for {title}" style="height:800px;overflow-y:auto">
+{cards}
+</div>
+<script>
+(() => {{
+    const feed = document.querySelector('div[role="feed"]');
+    let offset = {next_offset};
+    let loading = false;
+    const more = async () => {{
+        if (loading || offset < 0) return;
+        if (feed.scrollTop + feed.clientHeight < feed.scrollHeight - 400) return;
+        loading = true;
+        const response = await fetch('/feed?q={query}&offset=' + offset);
+        offset = parseInt(response.headers.get('X-Next-Offset'), 10);
+        feed.insertAdjacentHTML('beforeend', await response.text());
+        loading = false;
+        more();
+    }};
+    feed.addEventListener('scroll', more);
+}})();
+</script>
+</body></html>
+"""
+
+CARD = """<div class="Nv2PK" role="article" style="height:120px">
+<a href="{url}" aria-label="{name}"></a>
+<div class="qBF1Pd">{name}</div>
+<span class="MW4etd">{rating}</span> <span class="UY7F9">({reviews})</span>
+</div>"""
+
+END_MARKER = '<div><span class="HlvSq">You\'ve reached the end of the list.</span></div>'
+
+DETAIL_PAGE = """<!DOCTYPE html>
+<html><head><title>{name} - Google Maps</title></head>
+<body>
+<div role="main" aria-label="{name}">
+<h1 class="DUwDvf">{name}</h1>
+<div class="F7nice"><span aria-label="{rating} stars">{rating}</span>
+<span aria-label="{reviews} reviews">{reviews_text} reviews</span></div>
+<button data-item-id="address" aria-label="Address: {address}"><div class="Io6YTe">{address}</div></button>
+{website}
+<button data-item-id="phone:tel:{phone_digits}" aria-label="Phone: {phone}"><div class="Io6YTe">{phone}</div></button>
+<button jsaction="pane.placeActions.directions" aria-label="Directions to {name}">Directions</button>
+</div>
+</body></html>
+"""
+
+WEBSITE_LINK = ('<a data-item-id="authority" href="{website}" aria-label="Website: {host}">'
+                '<div class="Io6YTe">{host}</div></a>')
+
+
+def synthetic_place(index, website_every=10):
+    """Deterministic fake business; every website_every-th place has no website"""
+    cid = 0x5000000 + index
+    reviews = (index * 37) % 2500 + 1
+    place = {
+        "index": index,
+        "name": f"Synthetic Print Shop {index}",
+        "ftid": f"0x88f5{index:08x}:0x{cid:x}",
+        "rating": f"{3 + (index % 20) / 10:.1f}",
+        "reviews": reviews,
+        "phone": f"(404) 5{index // 10000 % 10}{index // 1000 % 10}-{index % 1000:04d}",
+        "address": f"{100 + index} Peachtree Street NE, Atlanta, GA 30309",
+        "website": f"https://shop-{index}.{SYNTHETIC_DOMAIN}/",
+    }
+    if website_every and index % website_every == website_every - 1:
+        place["website"] = ""
+    return place
+
+
+class SyntheticMapsServer:
+    """Local HTTP server that imitates the parts of Google Maps the scraper reads
+
+    /maps/search/<query> is a scrollable div[role="feed"] that fetches the next
+    page of /maps/place/ cards when scrolled near the bottom and ends with the
+    "reached the end of the list" marker. Detail pages carry the elements
+    EXTRACTION_SELECTORS looks for. latency_ms is added to every feed page and
+    detail page response, and each request is handled on its own thread.
+    """
+
+    def __init__(self, places=1000, page_size=20, latency_ms=0, website_every=10, host="127.0.0.1", port=0):
+        self.places = places
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.website_every = website_every
+        self.requests = {"search": 0, "feed": 0, "detail": 0}
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"🧪 Synthetic Maps server with {self.places} places at {self.base_url} "
+              f"({self.latency_ms}ms latency)")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def place_url(self, place):
+        return (f"{self.base_url}/maps/place/{quote(place['name'].replace(' ', '+'), safe='+')}"
+                f"/data=!4m7!3m6!1s{place['ftid']}!8m2!3d33.7!4d-84.3")
+
+    def render_cards(self, offset):
+        """Feed cards from offset, plus the offset of the next page (-1 at the end)"""
+        end = min(self.places, offset + self.page_size)
+        cards = []
+        for index in range(offset, end):
+            place = synthetic_place(index, self.website_every)
+            cards.append(CARD.format(url=html.escape(self.place_url(place)), name=html.escape(place["name"]),
+                                     rating=place["rating"], reviews=f"{place['reviews']:,}"))
+        if end >= self.places:
+            cards.append(END_MARKER)
+            return "\n".join(cards), -1
+        return "\n".join(cards), end
+
+    def render_detail(self, index):
+        place = synthetic_place(index, self.website_every)
+        website = ""
+        if place["website"]:
+            host = urlparse(place["website"]).netloc
+            website = WEBSITE_LINK.format(website=html.escape(place["website"]), host=host)
+        return DETAIL_PAGE.format(
+            name=html.escape(place["name"]), rating=place["rating"], reviews=place["reviews"],
+            reviews_text=f"{place['reviews']:,}", address=html.escape(place["address"]), website=website,
+            phone=place["phone"], phone_digits="+1" + "".join(c for c in place["phone"] if c.isdigit()),
+        )
+
+    def place_index(self, path):
+        """Index of the place a /maps/place/ path refers to, or None"""
+        marker = path.find("!1s0x")
+        if marker < 0:
+            return None
+        try:
+            cid = int(path[marker:].split(":", 1)[1].split("!", 1)[0], 16)
+        except (IndexError, ValueError):
+            return None
+        index = cid - 0x5000000
+        return index if 0 <= index < self.places else None
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                headers = {}
+                if parsed.path.startswith("/maps/search/"):
+                    server.requests["search"] += 1
+                    title = unquote(parsed.path[len("/maps/search/"):]).strip("/")
+                    cards, next_offset = server.render_cards(0)
+                    body = SEARCH_PAGE.format(title=html.escape(title), cards=cards, next_offset=next_offset,
+                                              query=quote(title))
+                elif parsed.path == "/feed":
+                    server.requests["feed"] += 1
+                    offset = int(parse_qs(parsed.query).get("offset", ["0"])[0])
+                    body, next_offset = server.render_cards(offset)
+                    headers["X-Next-Offset"] = str(next_offset)
+                elif parsed.path.startswith("/maps/place/"):
+                    index = server.place_index(parsed.path)
+                    if index is None:
+                        self.send_error(404)
+                        return
+                    server.requests["detail"] += 1
+                    body = server.render_detail(index)
+                else:
+                    self.send_error(404)
+                    return
+
+                if server.latency_ms and not parsed.path.startswith("/maps/search/"):
+                    time.sleep(server.latency_ms / 1000)
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class RssSampler:
+    """Track the peak resident memory of this process and its children (the browser)"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.task = None
+
+    def sample(self):
+        self.peak_mb = max(self.peak_mb, process_tree_rss_mb(os.getpid()))
+
+    async def run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.sample()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+async def run_load_benchmark(places=500, latency_ms=50, workers=3, pipeline=True, page_size=20,
+                             max_results=None, headless=True, keep_leads=False, **scraper_options):
+    """Scrape the synthetic server end to end and report places/min, peak RSS and DB writes/sec
+
+    Leads are written to the configured database like a real run and removed
+    afterwards unless keep_leads is set.
+    """
+    # Imported here: gm_scraper configures Django on import
+    from mockmap.system.lead_gen.google_map.gm_scraper import MapsBusinessScraper
+    from mockmap.system.lead_gen.google_map.business_index import BusinessIndex
+    from mockmap.models import Lead
+    from asgiref.sync import sync_to_async
+
+    max_results = max_results or places
+    report = None
+    with SyntheticMapsServer(places, page_size, latency_ms) as server, \
+            tempfile.TemporaryDirectory() as run_dir:
+        # Fresh state: nothing visited, nothing seen by other queries
+        # The shared Google rate limit would only measure itself against a local server
+        options = dict({"wait_timeouts": BENCHMARK_WAIT_TIMEOUTS, "rate_limit": False}, **scraper_options)
+        scraper = MapsBusinessScraper(headless=headless, workers=workers, pipeline=pipeline,
+                                      state_db=os.path.join(run_dir, "state.sqlite3"),
+                                      business_index=BusinessIndex(), maps_base_url=server.base_url,
+                                      **options)
+        sampler = RssSampler()
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await scraper.scrape(SYNTHETIC_QUERY, max_results=max_results,
+                                 output_csv=os.path.join(run_dir, "synthetic.csv"))
+        finally:
+            elapsed = time.perf_counter() - started
+            await sampler.stop()
+            scraper.state_store.close()
+            if not keep_leads:
+                deleted, _ = await sync_to_async(
+                    Lead.objects.filter(website__icontains=SYNTHETIC_DOMAIN).delete)()
+                print(f"🧹 Removed {deleted} synthetic leads")
+
+        report = {
+            "recorded_at": time.time(),
+            "places": places,
+            "latency_ms": latency_ms,
+            "workers": workers,
+            "pipeline": pipeline,
+            "seconds": round(elapsed, 1),
+            "discovered": len(scraper.discovered_places),
+            "visited": len(scraper.visited_places),
+            "saved": scraper.saved_count,
+            "places_per_min": round(len(scraper.visited_places) / elapsed * 60, 1) if elapsed else 0.0,
+            "peak_rss_mb": round(sampler.peak_mb, 1),
+            "db_writes": scraper.lead_writer.created,
+            "db_batches": scraper.lead_writer.batches,
+            "db_writes_per_sec": round(scraper.lead_writer.created / elapsed, 2) if elapsed else 0.0,
+            "requests": dict(server.requests),
+        }
+
+    print(f"\n📊 LOAD BENCHMARK ({places} places, {latency_ms}ms latency, {workers} workers, "
+          f"pipeline {'on' if pipeline else 'off'})")
+    print(f"   • {report['visited']} places visited in {report['seconds']}s: {report['places_per_min']} places/min")
+    print(f"   • Peak RSS (scraper + browser): {report['peak_rss_mb']}MB")
+    print(f"   • DB: {report['db_writes']} leads in {report['db_batches']} batches, "
+          f"{report['db_writes_per_sec']} writes/sec")
+    print(f"   • Server requests: {report['requests']}")
+    try:
+        os.makedirs(os.path.dirname(BENCHMARK_HISTORY_FILE), exist_ok=True)
+        with open(BENCHMARK_HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+    except Exception as e:
+        print(f"⚠️ Could not save benchmark result: {e}")
+    return report
+
+
+if __name__ == "__main__":
+    places = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    asyncio.run(run_load_benchmark(places, latency_ms, workers))
@@ -0,0 +1,249 @@
+import re
+import sys
+import time
+
+# Tried in order; the first pattern with a valid match wins
+PHONE_PATTERNS = [re.compile(pattern) for pattern in (
+    # International format: +1 (555) 123-4567
+    r'\+\d{1,3}\s*\(\d{3}\)\s*\d{3}[-.\s]*\d{4}',
+    # International format: +1 555-123-4567
+    r'\+\d{1,3}\s*\d{3}[-.\s]*\d{3}[-.\s]*\d{4}',
+    # US format: (555) 123-4567
+    r'\(\d{3}\)\s*\d{3}[-.\s]*\d{4}',
+    # US format: 555-123-4567
+    r'\d{3}[-.\s]*\d{3}[-.\s]*\d{4}',
+    # International with country code: +1234567890
+    r'\+\d{10,15}',
+    # Simple 10-digit: 5551234567
+    r'\b\d{10}\b',
+    # With spaces: 555 123 4567
+    r'\d{3}\s+\d{3}\s+\d{4}',
+)]
+# Every phone pattern needs three digits in a row (or a parenthesised area code)
+PHONE_HINT_RE = re.compile(r'\d{3}')
+NON_DIGIT_RE = re.compile(r'\D')
+WHITESPACE_RE = re.compile(r'\s+')
+FAKE_PHONES = frozenset({'1234567890', '0000000000', '9999999999'})
+
+STREET_TYPES = r'(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|place|pl|court|ct|circle|cir)'
+ADDRESS_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    # Full address with street number, street name, city, state, zip
+    r'\b\d+\s+[A-Za-z0-9\s,.-]+' + STREET_TYPES + r'\s*,?\s*[A-Za-z\s]+,?\s*[A-Z]{2}\s*\d{5}(?:-\d{4})?\b',
+    # Address with street and city/state
+    r'\b\d+\s+[A-Za-z0-9\s,.-]+' + STREET_TYPES + r'\s*,\s*[A-Za-z\s]+,?\s*[A-Z]{2}\b',
+    # Simple street address
+    r'\b\d+\s+[A-Za-z0-9\s,.-]+' + STREET_TYPES + r'\b',
+    # International format
+    r'\b\d+\s+[A-Za-z0-9\s,.-]+,\s*[A-Za-z\s]+\s+\d{4,6}\b',
+)]
+# Button labels and other text that is never an address (substring match)
+ADDRESS_SKIP_RE = re.compile(
+    r'call|website|menu|photos|reviews|hours|directions to|get directions|save|share|nearby')
+ADDRESS_WORDS_RE = re.compile(r'street|st|avenue|ave|road|rd|drive|dr')
+DIGIT_RE = re.compile(r'\d')
+
+RATING_RE = re.compile(r'([0-5]\.\d)')
+REVIEW_COUNT_RE = re.compile(r'(\d[\d,]*)')
+
+# Hosts (and their subdomains) that are never the business's own website
+SKIP_DOMAINS = frozenset({
+    'google.com', 'maps.google.com', 'facebook.com', 'instagram.com',
+    'twitter.com', 'linkedin.com', 'youtube.com', 'tiktok.com',
+    'yelp.com', 'tripadvisor.com', 'foursquare.com', 'pinterest.com',
+    'amazon.com', 'ebay.com', 'craigslist.org', 'wikipedia.org',
+    'apple.com', 'microsoft.com', 'android.com', 'ios.com', 'schema.org', 'compass-group.fi', 'wolt.com',
+})
+# Skipped under any public suffix (google.com.au, google.fi, ...)
+SKIP_LABELS = frozenset({'google'})
+
+WEBSITE_SOURCE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'https?://(?:www\.)?([a-zA-Z0-9-]+\.(?:com|org|net|edu|gov|co|io|biz|info))',
+    r'"(https?://[^"]*\.(com|org|net|edu|gov|co|io|biz|info)[^"]*)"',
+    r'url=(https?://[^&]*)',
+)]
+
+
+HOST_END_RE = re.compile(r'[/?#\\]')
+
+
+def url_host(url):
+    """Lower-cased host of a URL (scheme optional), without port or credentials"""
+    url = url.strip().lower()
+    scheme_end = url.find("://")
+    if scheme_end >= 0:
+        url = url[scheme_end + 3:]
+    elif url.startswith("/"):
+        return ""
+    end = HOST_END_RE.search(url)
+    netloc = url[:end.start()] if end else url
+    return netloc.rsplit("@", 1)[-1].split(":")[0].rstrip(".")
+
+
+def is_valid_website(url):
+    """Check if a URL points at a business website rather than Google, social media, etc.
+
+    The host and each of its parent domains are looked up in SKIP_DOMAINS, so
+    "m.facebook.com" is skipped but "notfacebook.com" is not. Relative URLs
+    have no host and are never a website.
+    """
+    if not url:
+        return False
+    host = url_host(url)
+    if not host:
+        return False
+    if not SKIP_LABELS.isdisjoint(host.split(".")):
+        return False
+    while True:
+        if host in SKIP_DOMAINS:
+            return False
+        dot = host.find(".")
+        if dot < 0:
+            return True
+        host = host[dot + 1:]
+
+
+def clean_phone(phone):
+    """Strip whitespace and a tel: prefix, collapsing inner whitespace"""
+    if not phone:
+        return ""
+    phone = phone.strip()
+    if phone.startswith('tel:'):
+        phone = phone[4:]
+    return WHITESPACE_RE.sub(' ', phone)
+
+
+def is_valid_phone(phone):
+    """7-15 digits, not all the same digit and not a well-known fake number"""
+    if not phone:
+        return False
+    digits_only = NON_DIGIT_RE.sub('', phone)
+    if len(digits_only) < 7 or len(digits_only) > 15:
+        return False
+    if len(set(digits_only)) == 1:
+        return False
+    return digits_only not in FAKE_PHONES
+
+
+def extract_phone(text):
+    """First valid phone number in text, trying PHONE_PATTERNS in order"""
+    if not text or not PHONE_HINT_RE.search(text):
+        return ""
+    for pattern in PHONE_PATTERNS:
+        for match in pattern.findall(text):
+            cleaned = clean_phone(match)
+            if is_valid_phone(cleaned):
+                return cleaned
+    return ""
+
+
+def extract_address(text):
+    """Street address in text: the longest match of the first matching pattern"""
+    if not text or len(text.strip()) < 5:
+        return ""
+    text = text.strip()
+    lowered = text.lower()
+    if ADDRESS_SKIP_RE.search(lowered) or not DIGIT_RE.search(text):
+        return ""
+
+    for pattern in ADDRESS_PATTERNS:
+        matches = pattern.findall(text)
+        if matches:
+            # Return the longest match (likely most complete address)
+            return max(matches, key=len).strip()
+
+    # No pattern matched, but it still reads like an address
+    if ADDRESS_WORDS_RE.search(lowered) and 10 < len(text) < 200:
+        return text
+    return ""
+
+
+def extract_rating(text):
+    """Float rating from text like "4.7 stars", or None"""
+    match = RATING_RE.search(text or "")
+    return float(match.group(1)) if match else None
+
+
+def extract_review_count(text):
+    """Integer count from text like "1,234 reviews", or None"""
+    match = REVIEW_COUNT_RE.search(text or "")
+    return int(match.group(1).replace(",", "")) if match else None
+
+
+EXTRACTORS = {
+    "phone": extract_phone,
+    "address": extract_address,
+    "rating": extract_rating,
+    "review_count": extract_review_count,
+}
+
+
+def extract_batch(texts, fields=("phone", "address", "rating", "review_count")):
+    """Run the extractors over many strings at once; returns one {field: value} dict per text
+
+    Repeated strings (the same aria-label on many cards, say) are only parsed once.
+    """
+    extractors = [(field, EXTRACTORS[field]) for field in fields]
+    parsed = {}
+    results = []
+    for text in texts:
+        key = text or ""
+        if key not in parsed:
+            parsed[key] = {field: extractor(key) for field, extractor in extractors}
+        results.append(dict(parsed[key]))
+    return results
+
+
+def filter_websites(urls):
+    """The subset of urls that pass is_valid_website, in order"""
+    return [url for url in urls if is_valid_website(url)]
+
+
+BENCHMARK_SAMPLES = [
+    "Call phone number +1 (404) 555-0187",
+    "Phone: 404-555-0187",
+    "Address: 1234 Peachtree Street NE, Atlanta, GA 30309",
+    "Mannerheimintie 12, 00100 Helsinki",
+    "4.7 stars 1,284 reviews",
+    "Open ⋅ Closes 6 PM",
+    "Website: print-shop-atlanta.com",
+    "Directions",
+]
+
+BENCHMARK_URLS = [
+    "https://www.printshopatlanta.com/contact",
+    "https://m.facebook.com/printshop",
+    "https://www.google.com/maps/place/Print+Shop",
+    "http://example.org",
+]
+
+
+def run_benchmark(iterations=20000):
+    """Print the per-call cost of each extractor over the sample strings"""
+    cases = [
+        ("extract_phone", extract_phone, BENCHMARK_SAMPLES),
+        ("extract_address", extract_address, BENCHMARK_SAMPLES),
+        ("extract_rating", extract_rating, BENCHMARK_SAMPLES),
+        ("extract_review_count", extract_review_count, BENCHMARK_SAMPLES),
+        ("is_valid_website", is_valid_website, BENCHMARK_URLS),
+    ]
+    print(f"⏱️ Text extraction micro-benchmark ({iterations} iterations per case)")
+    for name, function, samples in cases:
+        rounds = max(1, iterations // len(samples))
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for sample in samples:
+                function(sample)
+        per_call_us = (time.perf_counter() - started) / (rounds * len(samples)) * 1e6
+        print(f"   • {name}: {per_call_us:.2f}µs per call")
+
+    batch = BENCHMARK_SAMPLES * 50
+    rounds = max(1, iterations // len(batch))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        extract_batch(batch)
+    per_text_us = (time.perf_counter() - started) / (rounds * len(batch)) * 1e6
+    print(f"   • extract_batch ({len(batch)} texts, all fields): {per_text_us:.2f}µs per text")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
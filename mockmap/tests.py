@@ -1,3 +1,1188 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from mockmap.models import Lead
+from mockmap.system.lead_gen.google_map.browser_service import BrowserService
+from mockmap.system.lead_gen.google_map.business_index import BusinessIndex
+from mockmap.system.lead_gen.google_map.csv_sink import StreamingCsvSink
+from mockmap.system.lead_gen.google_map.gm_scraper import MapsBusinessScraper
+from mockmap.system.lead_gen.google_map.grid_tiling import GridPlanner, cell_search_url, grid_cells
+from mockmap.system.lead_gen.google_map.lead_writer import BufferedLeadWriter, normalize_domain
+from mockmap.system.lead_gen.google_map.loop_monitor import (
+    EventLoopBlockedError, LOOP_MONITOR_ENV, LoopMonitor, monitor_mode, run_monitored,
+)
+from mockmap.system.lead_gen.google_map.place_ids import canonical_place_key
+from mockmap.system.lead_gen.google_map.rate_limiter import NavigationRateLimiter, classify_page
+from mockmap.system.lead_gen.google_map.recrawl import RecrawlScheduler, SECONDS_PER_DAY, snapshot_row
+from mockmap.system.lead_gen.google_map.request_blocking import (
+    ESTIMATED_BYTES, RequestBlocker, WEBSITE_BLOCKING_PROFILE, tracker_url_patterns,
+)
+from mockmap.system.lead_gen.google_map.run_metrics import MetricsExporter, RunMetrics, StageHistogram
+from mockmap.system.lead_gen.google_map.selector_stats import SelectorStats
+from mockmap.system.lead_gen.google_map.state_store import ScraperStateStore
+from mockmap.system.lead_gen.google_map import maps_network, text_extraction
+
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), "testdata")
+PEACHTREE_URL = ("https://www.google.com/maps/place/Peachtree+Print+Co./@33.76,-84.38,17z/data=!4m7!3m6"
+                 "!1s0x88f5045d6993098d:0x66fede2f990b630b!8m2!3d33.76!4d-84.38")
+MINUTEMAN_URL = ("https://www.google.com/maps/place/Minuteman+Press+Midtown/data=!4m7!3m6"
+                 "!1s0x88f50469cf3b7a1d:0x1f2e3d4c5b6a7980!8m2!3d33.78!4d-84.39")
+
+
+def read_testdata(filename):
+    with open(os.path.join(TESTDATA_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+class FakeEventPage:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, *args):
+        for handler in self.handlers.get(event, []):
+            handler(*args)
+
+
+class FakeMapsResponse:
+    def __init__(self, url, body, delay=0.0):
+        self.url = url
+        self.body = body
+        self.delay = delay
+
+    async def text(self):
+        await asyncio.sleep(self.delay)
+        return self.body
+
+
+class MapsPayloadTests(SimpleTestCase):
+    def test_decode_wrapped_search_response(self):
+        data = maps_network.decode_maps_payload(read_testdata("maps_search_response.txt"))
+        self.assertIsInstance(data, list)
+        self.assertEqual(data[0][0], "print shops in atlanta")
+
+    def test_decode_xssi_prefixed_preview(self):
+        data = maps_network.decode_maps_payload(read_testdata("maps_place_preview.txt"))
+        self.assertIsInstance(data, list)
+
+    def test_decode_rejects_non_payloads(self):
+        self.assertIsNone(maps_network.decode_maps_payload(""))
+        self.assertIsNone(maps_network.decode_maps_payload(None))
+        self.assertIsNone(maps_network.decode_maps_payload("<html>not json</html>"))
+        self.assertIsNone(maps_network.decode_maps_payload('{"c":0,"d":")]}\'\\n[1,"}'))
+
+    def test_dig(self):
+        self.assertEqual(maps_network.dig([[1, [2, 3]]], 0, 1, 1), 3)
+        self.assertIsNone(maps_network.dig([[1]], 0, 5))
+        self.assertIsNone(maps_network.dig([["text"]], 0, 0, 0))
+
+    def test_find_places_in_search_response(self):
+        places = maps_network.find_places(maps_network.decode_maps_payload(read_testdata("maps_search_response.txt")))
+        self.assertEqual([place["name"] for place in places], ["Peachtree Print Co.", "Minuteman Press Midtown"])
+
+        peachtree, minuteman = places
+        self.assertEqual(peachtree["place_id"], "0x88f5045d6993098d:0x66fede2f990b630b")
+        self.assertEqual(peachtree["address"], "123 Peachtree St NE, Atlanta, GA 30303")
+        self.assertEqual(peachtree["phone"], "(404) 555-0101")
+        self.assertEqual(peachtree["website"], "https://peachtreeprint.example/")
+        self.assertEqual((peachtree["rating"], peachtree["review_count"]), (4.6, 212))
+
+        # Address from the single-line field, phone from the fallback index, no website
+        self.assertEqual(minuteman["address"], "950 W Peachtree St NW, Atlanta, GA 30309")
+        self.assertEqual(minuteman["phone"], "+1 404-555-0199")
+        self.assertEqual(minuteman["website"], "")
+
+    def test_parse_place_info_rejects_bad_ids_and_types(self):
+        info = [None] * 12
+        info[10] = "0x1:0x2"
+        info[11] = "Shop"
+        self.assertEqual(maps_network.parse_place_info(info)["name"], "Shop")
+        info[10] = "ChIJ-not-a-feature-id"
+        self.assertIsNone(maps_network.parse_place_info(info))
+        self.assertIsNone(maps_network.parse_place_info([None] * 5))
+
+        info[10] = "0x1:0x2"
+        info[4] = [None] * 7 + ["4.5", 1.5]
+        place = maps_network.parse_place_info(info)
+        self.assertIsNone(place["rating"])
+        self.assertIsNone(place["review_count"])
+
+    def test_find_places_depth_limit(self):
+        info = [None] * 12
+        info[10] = "0x1:0x2"
+        info[11] = "Deep"
+        nested = info
+        for _ in range(14):
+            nested = [nested]
+        self.assertEqual(maps_network.find_places(nested), [])
+        self.assertEqual(len(maps_network.find_places([[[info]]])), 1)
+
+
+class MapsResponseCollectorTests(SimpleTestCase):
+    def test_data_response_urls(self):
+        collector = maps_network.MapsResponseCollector()
+        self.assertTrue(collector.is_maps_data_response("https://www.google.com/search?tbm=map&q=x"))
+        self.assertTrue(collector.is_maps_data_response("https://www.google.com/maps/preview/place?pb=1"))
+        self.assertFalse(collector.is_maps_data_response("https://www.google.com/maps/vt?pb=1"))
+        self.assertFalse(collector.is_maps_data_response("https://example.com/?tbm=map"))
+
+    def test_preview_enriches_search_result(self):
+        collector = maps_network.MapsResponseCollector()
+        self.assertEqual(collector.ingest(read_testdata("maps_search_response.txt")), 2)
+        self.assertFalse(collector.lookup(MINUTEMAN_URL).get("website"))
+
+        self.assertEqual(collector.ingest(read_testdata("maps_place_preview.txt")), 1)
+        minuteman = collector.lookup(MINUTEMAN_URL)
+        self.assertEqual(minuteman["website"], "https://minuteman-midtown.example/")
+        self.assertEqual(minuteman["phone"], "(404) 555-0199")
+        # Values the preview lacks are kept from the search result
+        self.assertEqual(minuteman["review_count"], 87)
+        self.assertEqual(collector.responses_parsed, 2)
+
+    def test_lookup_by_place_id_and_unparseable_responses(self):
+        collector = maps_network.MapsResponseCollector()
+        collector.ingest(read_testdata("maps_search_response.txt"))
+        self.assertEqual(collector.lookup(PEACHTREE_URL)["name"], "Peachtree Print Co.")
+        self.assertEqual(collector.ingest("<html></html>"), 0)
+        self.assertEqual(collector.parse_failures, 1)
+
+    def test_places_are_keyed_like_card_urls(self):
+        collector = maps_network.MapsResponseCollector()
+        collector.ingest(read_testdata("maps_search_response.txt"))
+        self.assertEqual(set(collector.places_by_key),
+                         {f"cid:{int('0x66fede2f990b630b', 16)}", f"cid:{int('0x1f2e3d4c5b6a7980', 16)}"})
+        self.assertIs(collector.lookup(PEACHTREE_URL + "?authuser=0"), collector.lookup(PEACHTREE_URL))
+
+    def test_same_name_with_other_place_id_is_not_matched(self):
+        collector = maps_network.MapsResponseCollector()
+        collector.ingest(read_testdata("maps_search_response.txt"))
+        other_branch = MINUTEMAN_URL.replace("0x1f2e3d4c5b6a7980", "0x1f2e3d4c5b6a7981")
+        self.assertIsNone(collector.lookup(other_branch))
+        self.assertIsNone(collector.lookup("https://www.google.com/maps/place/Minuteman+Press+Midtown/"))
+
+    def test_settle_waits_for_bodies_still_being_read(self):
+        collector = maps_network.MapsResponseCollector()
+        page = FakeEventPage()
+        collector.attach(page)
+
+        async def navigate_and_look_up():
+            page.emit("response", FakeMapsResponse("https://www.google.com/maps/preview/place?pb=1",
+                                                   read_testdata("maps_place_preview.txt"), delay=0.05))
+            page.emit("response", FakeMapsResponse("https://www.google.com/maps/vt?pb=1", "", delay=5))
+            before = collector.lookup(MINUTEMAN_URL)
+            await collector.settle(page, timeout=2)
+            return before, collector.lookup(MINUTEMAN_URL)
+
+        before, after = asyncio.run(navigate_and_look_up())
+        self.assertIsNone(before)
+        self.assertEqual(after["website"], "https://minuteman-midtown.example/")
+        self.assertEqual(collector.in_flight[page], set())
+
+    def test_settle_gives_up_after_timeout(self):
+        collector = maps_network.MapsResponseCollector()
+        page = FakeEventPage()
+        collector.attach(page)
+
+        async def slow_response():
+            page.emit("response", FakeMapsResponse("https://www.google.com/search?tbm=map",
+                                                   read_testdata("maps_search_response.txt"), delay=5))
+            await collector.settle(page, timeout=0.05)
+            return collector.lookup(PEACHTREE_URL)
+
+        self.assertIsNone(asyncio.run(slow_response()))
+        page.emit("close", page)
+        self.assertNotIn(page, collector.in_flight)
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = type("FakeRequest", (), {"url": url, "resource_type": resource_type})()
+        self.action = None
+
+    async def continue_(self):
+        self.action = "continue"
+
+    async def abort(self):
+        self.action = "abort"
+
+
+class RequestBlockerTests(SimpleTestCase):
+    def test_classify_maps_profile(self):
+        blocker = RequestBlocker()
+        self.assertEqual(blocker.classify("https://www.google-analytics.com/g/collect?v=2", "xhr"), "tracker")
+        self.assertEqual(blocker.classify("https://www.facebook.com/tr?id=1&ev=PageView", "image"), "tracker")
+        self.assertEqual(blocker.classify("https://www.google.com/maps/vt?pb=!1m5", "image"), "map_tile")
+        self.assertEqual(blocker.classify("https://lh5.googleusercontent.com/p/AF1Qip=w80", "image"), "map_tile")
+        self.assertEqual(blocker.classify("https://fonts.gstatic.com/s/roboto.woff2", "font"), "font")
+        self.assertEqual(blocker.classify("https://www.google.com/gen_204?atyp=i", "xhr"), "other")
+
+    def test_tracker_matches_host_and_path_prefix_only(self):
+        blocker = RequestBlocker()
+        self.assertEqual(blocker.classify("https://www.facebook.com/tr/?id=1", "image"), "tracker")
+        self.assertEqual(blocker.classify("https://region1.google-analytics.com/g/collect", "xhr"), "tracker")
+        self.assertIsNone(blocker.classify("https://www.facebook.com/travel", "document"))
+        self.assertIsNone(blocker.classify("https://notfacebook.com/tr", "document"))
+        self.assertIsNone(blocker.classify("https://shop.example/?ref=hotjar.com", "document"))
+        self.assertIsNone(blocker.classify("https://shop.example/go?u=https://facebook.com/tr", "document"))
+
+    def test_tracker_url_patterns(self):
+        self.assertEqual(tracker_url_patterns("hotjar.com"), ["*://hotjar.com/*", "*://*.hotjar.com/*"])
+        patterns = tracker_url_patterns("facebook.com/tr")
+        self.assertIn("*://*.facebook.com/tr?*", patterns)
+        self.assertNotIn("*facebook.com/tr*", patterns)
+
+    def test_classify_lets_extraction_requests_through(self):
+        blocker = RequestBlocker()
+        self.assertIsNone(blocker.classify("https://www.google.com/search?tbm=map&q=print", "xhr"))
+        self.assertIsNone(blocker.classify("https://www.google.com/maps/_/js/k=maps.m.en.js", "script"))
+        self.assertIsNone(blocker.classify("https://www.google.com/maps/_/ss/k=maps.m.css", "stylesheet"))
+
+    def test_website_profile_blocks_stylesheets(self):
+        blocker = RequestBlocker(WEBSITE_BLOCKING_PROFILE)
+        self.assertEqual(blocker.classify("https://shop.example/site.css", "stylesheet"), "stylesheet")
+        self.assertIsNone(blocker.classify("https://shop.example/contact", "document"))
+
+    def test_handle_route_counts_and_aborts(self):
+        blocker = RequestBlocker()
+        tile = FakeRoute("https://www.google.com/maps/vt?pb=1", "image")
+        page = FakeRoute("https://www.google.com/maps/search/print", "document")
+
+        async def route_all():
+            await blocker.handle_route(tile)
+            await blocker.handle_route(page)
+
+        asyncio.run(route_all())
+        self.assertEqual((tile.action, page.action), ("abort", "continue"))
+
+        summary = blocker.summary()
+        self.assertEqual(summary["allowed_requests"], 1)
+        self.assertEqual(summary["blocked_requests"], 1)
+        self.assertEqual(summary["blocked_by_type"], {"map_tile": 1})
+        self.assertEqual(summary["estimated_bytes_saved"], ESTIMATED_BYTES["map_tile"])
+
+
+PLACE_URL = ("https://www.google.com/maps/place/Print+Shop/@33.77,-84.38,17z/data=!4m7!3m6"
+             "!1s0x88f5045d6993098d:0x66fede2f990b630b!8m2!3d33.7!4d-84.3!16s%2Fg%2F11b6")
+
+
+class CanonicalPlaceKeyTests(SimpleTestCase):
+    def test_feature_id_becomes_cid(self):
+        self.assertEqual(canonical_place_key(PLACE_URL), f"cid:{int('0x66fede2f990b630b', 16)}")
+
+    def test_same_place_with_other_coordinates_and_params(self):
+        other = PLACE_URL.replace("@33.77,-84.38,17z", "@33.70,-84.30,15z") + "?authuser=0&rclk=1"
+        self.assertEqual(canonical_place_key(other), canonical_place_key(PLACE_URL))
+
+    def test_cid_param(self):
+        self.assertEqual(canonical_place_key("https://maps.google.com/?cid=12345"), "cid:12345")
+
+    def test_name_path_fallback(self):
+        self.assertEqual(canonical_place_key("https://www.google.com/maps/place/Print+Shop/@33.7,-84.3,17z"),
+                         "url:/maps/place/print+shop")
+
+    def test_canonical_keys_and_empty(self):
+        self.assertEqual(canonical_place_key("cid:42"), "cid:42")
+        self.assertEqual(canonical_place_key(""), "")
+        self.assertEqual(canonical_place_key(None), "")
+
+
+class ScraperStateStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "state", "scraper_state.sqlite3")
+        self.store = ScraperStateStore(self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def write_json(self, filename, data):
+        path = os.path.join(self.tmp.name, filename)
+        with open(path, "w") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        return path
+
+    def test_visited_places_survive_reopen(self):
+        self.assertEqual(self.store.add_visited("print shops", ["cid:1", "cid:2", ""]), 2)
+        self.assertEqual(self.store.add_visited("print shops", ["cid:2", "cid:3"]), 1)
+        self.store.add_visited("sign shops", ["cid:1"])
+        self.store.close()
+
+        self.store = ScraperStateStore(self.db_path)
+        self.assertEqual(self.store.visited_for_query("print shops"), {"cid:1", "cid:2", "cid:3"})
+        self.assertTrue(self.store.is_visited("cid:1"))
+        self.assertTrue(self.store.is_visited("cid:3", query="print shops"))
+        self.assertFalse(self.store.is_visited("cid:3", query="sign shops"))
+        self.assertEqual(self.store.count_visited(), 4)
+        self.assertEqual(self.store.count_visited("sign shops"), 1)
+
+    def test_scroll_and_pagination_state(self):
+        self.store.save_scroll_state("print shops", 1200, 40)
+        self.store.save_scroll_state("print shops", 2400, 80)
+        self.store.save_pagination_state("print shops", {"page": 3, "seen": ["a"]})
+
+        scroll = self.store.load_scroll_states()["print shops"]
+        self.assertEqual((scroll["max_scroll_position"], scroll["last_discovered_count"]), (2400, 80))
+        self.assertEqual(self.store.load_pagination_states(), {"print shops": {"page": 3, "seen": ["a"]}})
+
+        self.store.delete_scroll_state("print shops")
+        self.store.delete_pagination_state()
+        self.assertEqual(self.store.load_scroll_states(), {})
+        self.assertEqual(self.store.load_pagination_states(), {})
+
+    def test_legacy_visited_import_runs_once(self):
+        url = ("https://www.google.com/maps/place/Print+Shop/data=!4m7!3m6"
+               "!1s0x88f5045d6993098d:0x66fede2f990b630b!8m2!3d33.7!4d-84.3")
+        path = self.write_json("visited_urls_print_shops.json", [url, url + "?authuser=0"])
+
+        self.assertEqual(self.store.import_legacy_visited("print shops", path, canonical_place_key), 1)
+        self.assertTrue(self.store.already_imported(path))
+        self.assertEqual(self.store.visited_for_query("print shops"), {canonical_place_key(url)})
+
+        self.store.add_visited("print shops", ["cid:99"])
+        self.assertEqual(self.store.import_legacy_visited("print shops", path, canonical_place_key), 0)
+        self.assertEqual(self.store.count_visited("print shops"), 2)
+
+    def test_legacy_scroll_and_pagination_import(self):
+        scroll_path = self.write_json("scroll_state.json", {
+            "print shops": {"max_scroll_position": 900, "last_discovered_count": 30, "timestamp": 1.0},
+        })
+        pagination_path = self.write_json("pagination_state.json", {"print shops": {"page": 2}})
+        # Existing rows win over the legacy file
+        self.store.save_pagination_state("print shops", {"page": 5})
+
+        self.assertEqual(self.store.import_legacy_scroll_state(scroll_path), 1)
+        self.assertEqual(self.store.import_legacy_pagination_state(pagination_path), 1)
+        self.assertEqual(self.store.load_scroll_states()["print shops"]["max_scroll_position"], 900)
+        self.assertEqual(self.store.load_pagination_states()["print shops"], {"page": 5})
+        self.assertEqual(self.store.import_legacy_scroll_state(scroll_path), 0)
+
+    def test_missing_or_malformed_legacy_files(self):
+        missing = os.path.join(self.tmp.name, "missing.json")
+        self.assertEqual(self.store.import_legacy_visited("q", missing, canonical_place_key), 0)
+
+        broken = self.write_json("broken.json", "[not json")
+        self.assertEqual(self.store.import_legacy_visited("q", broken, canonical_place_key), 0)
+        # A failed import is retried on the next run
+        self.assertFalse(self.store.already_imported(broken))
+
+
+class StreamingCsvSinkTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "out", "leads.csv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_names(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [row["name"] for row in csv.DictReader(f)]
+
+    def test_appends_in_batches_and_skips_duplicate_names(self):
+        sink = StreamingCsvSink(self.path, flush_every=2).open()
+        self.assertTrue(sink.write({"name": "Alpha", "website": "alpha.com"}))
+        self.assertEqual(self.read_names(), [])
+        self.assertTrue(sink.write({"name": "Beta", "website": "beta.com"}))
+        self.assertEqual(self.read_names(), ["Alpha", "Beta"])
+        self.assertFalse(sink.write({"name": " alpha ", "website": "other.com"}))
+        self.assertIn("BETA", sink)
+        sink.close()
+        self.assertEqual(sink.rows_written, 2)
+        self.assertEqual(sink.duplicates_skipped, 1)
+
+    def test_reopen_knows_existing_names(self):
+        sink = StreamingCsvSink(self.path).open()
+        sink.write({"name": "Alpha"})
+        sink.close()
+
+        sink = StreamingCsvSink(self.path).open()
+        self.assertFalse(sink.write({"name": "Alpha"}))
+        sink.write({"name": "Gamma"})
+        sink.close()
+        self.assertEqual(self.read_names(), ["Alpha", "Gamma"])
+
+    def test_close_compacts_duplicates_already_on_disk(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            f.write("name,website,phone,address,rating,review_count\nAlpha,a.com,,,,\nalpha,b.com,,,,\n")
+        sink = StreamingCsvSink(self.path).open()
+        sink.close()
+        self.assertEqual(self.read_names(), ["Alpha"])
+
+
+class BufferedLeadWriterTests(TestCase):
+    def business(self, name, website):
+        return {"name": name, "website": website, "phone": "404-555-0187", "address": "1 Main St"}
+
+    def test_normalize_domain(self):
+        self.assertEqual(normalize_domain("https://www.Example.com/contact"), "example.com")
+        self.assertEqual(normalize_domain("example.com:8080"), "example.com")
+        self.assertEqual(normalize_domain(""), "")
+
+    def test_add_buffers_until_batch_size(self):
+        writer = BufferedLeadWriter(batch_size=5)
+        self.assertEqual(asyncio.run(writer.add(self.business("Alpha", "alpha.com"))), ([], [], []))
+        self.assertEqual(len(writer.buffer), 1)
+        self.assertTrue(writer.is_known("https://www.alpha.com"))
+        self.assertEqual(Lead.objects.count(), 0)
+
+    def test_flush_rejects_existing_and_repeated_domains(self):
+        Lead.objects.create(name="Existing", website="https://existing.com", website_domain="existing.com",
+                            source="google_maps")
+        writer = BufferedLeadWriter()
+        writer.buffer = [
+            self.business("Alpha", "https://alpha.com"),
+            self.business("Alpha Again", "http://www.alpha.com/about"),
+            self.business("Existing Copy", "existing.com"),
+        ]
+        created, rejected, failed = writer.flush_sync()
+        self.assertEqual(failed, [])
+        self.assertEqual([business["name"] for business in created], ["Alpha"])
+        self.assertEqual(sorted(business["name"] for business in rejected), ["Alpha Again", "Existing Copy"])
+        self.assertEqual(writer.buffer, [])
+        self.assertEqual((writer.created, writer.rejected, writer.batches), (1, 2, 1))
+        self.assertTrue(Lead.objects.filter(name="Alpha", website_domain="alpha.com", source="google_maps").exists())
+
+    def test_flush_matches_whole_domains_only(self):
+        Lead.objects.create(name="Crab Shack", website="https://crab.com", website_domain="crab.com",
+                            source="google_maps")
+        writer = BufferedLeadWriter()
+        writer.buffer = [self.business("AB Print", "https://ab.com")]
+        created, rejected, _ = writer.flush_sync()
+        self.assertEqual([business["name"] for business in created], ["AB Print"])
+        self.assertEqual(rejected, [])
+
+    def test_load_known_domains(self):
+        Lead.objects.create(name="Existing", website="https://www.existing.com/", source="google_maps")
+        writer = BufferedLeadWriter()
+        writer.load_known_domains_sync()
+        self.assertTrue(writer.is_known("existing.com"))
+        self.assertFalse(writer.is_known("new.com"))
+
+    def test_failed_batch_is_not_reported_as_duplicates(self):
+        writer = BufferedLeadWriter(batch_size=2)
+
+        def fail():
+            writer.buffer = []
+            raise RuntimeError("database is locked")
+
+        writer.flush_sync = fail
+        asyncio.run(writer.add(self.business("Alpha", "alpha.com")))
+        created, rejected, failed = asyncio.run(writer.add(self.business("Beta", "beta.com")))
+        self.assertEqual((created, rejected), ([], []))
+        self.assertEqual([business["name"] for business in failed], ["Alpha", "Beta"])
+        self.assertEqual((writer.rejected, writer.failed), (0, 2))
+        self.assertFalse(writer.is_known("alpha.com"))
+
+
+class BusinessIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_dir = os.path.join(self.tmp.name, "visited", "atlanta")
+        os.makedirs(self.csv_dir)
+        with open(os.path.join(self.csv_dir, "print_shops.csv"), "w", newline="", encoding="utf-8") as f:
+            f.write("name,website,phone\nPeachtree Print Co.,https://www.peachtreeprint.example/,\n"
+                    "No Website Shop,,\n")
+        with open(os.path.join(self.csv_dir, "notes.txt"), "w") as f:
+            f.write("name\nIgnored\n")
+        self.store = ScraperStateStore(os.path.join(self.tmp.name, "state.sqlite3"))
+        self.store.add_visited("print shops in atlanta", ["cid:1"])
+        self.index = BusinessIndex().load((os.path.join(self.tmp.name, "visited"),), self.store)
+
+    def tearDown(self):
+        self.index.state_store.close()
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_load_indexes_csvs_and_visited_places(self):
+        self.assertEqual(self.index.domains, {"peachtreeprint.example"})
+        self.assertEqual(self.index.place_keys, {"cid:1"})
+        # Later calls are no-ops
+        self.index.load(("missing-dir",), None)
+        self.assertEqual(len(self.index.domains), 1)
+
+    def test_check_place(self):
+        self.assertTrue(self.index.check_place("cid:1"))
+        self.assertFalse(self.index.check_place("cid:2"))
+        self.index.add_place("cid:2")
+        self.assertTrue(self.index.check_place("cid:2"))
+        self.assertFalse(self.index.check_place(""))
+
+    def test_check_website_by_domain(self):
+        self.assertTrue(self.index.check_website("http://peachtreeprint.example/about"))
+        self.assertFalse(self.index.check_website("https://newshop.example"))
+        self.assertFalse(self.index.check_website(""))
+        self.index.add_website("https://newshop.example")
+        self.assertTrue(self.index.check_website("newshop.example"))
+        self.index.forget(website="https://www.newshop.example/")
+        self.assertFalse(self.index.check_website("newshop.example"))
+
+    def test_summary_counts_hits(self):
+        self.index.check_place("cid:1")
+        self.index.check_place("cid:9")
+        self.index.check_website("https://peachtreeprint.example")
+        summary = self.index.summary()
+        self.assertEqual((summary["place_lookups"], summary["place_hits"]), (2, 1))
+        self.assertEqual(summary["place_hit_rate"], 0.5)
+        self.assertEqual((summary["website_lookups"], summary["domain_hits"]), (1, 1))
+
+    def test_place_misses_fall_through_to_state_store(self):
+        # Another process visits a place after the index was loaded
+        self.store.add_visited("printing in atlanta", ["cid:5"])
+        self.assertTrue(self.index.check_place("cid:5"))
+        self.assertIn("cid:5", self.index.place_keys)
+        self.assertFalse(self.index.check_place("cid:6"))
+
+
+class LeadVisitPersistenceTests(SimpleTestCase):
+    QUERY = "print shops in atlanta"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scraper = MapsBusinessScraper(state_db=os.path.join(self.tmp.name, "state.sqlite3"), db_batch_size=2,
+                                           business_index=BusinessIndex(), block_resources=False, rate_limit=False)
+        self.scraper.set_query_specific_files(self.QUERY)
+        self.scraper.visited_urls_file = os.path.join(self.tmp.name, "visited_urls.json")
+        self.scraper.load_visited_urls()
+        self.businesses = {}
+
+        async def resolve_business_info(page, card_url):
+            return dict(self.businesses[card_url])
+
+        self.scraper.resolve_business_info = resolve_business_info
+
+    def tearDown(self):
+        self.scraper.state_store.close()
+        self.tmp.cleanup()
+
+    def place(self, cid, name, website):
+        url = f"https://www.google.com/maps/place/{name.replace(' ', '+')}/data=!4m7!3m6!1s0x1:{hex(cid)}"
+        self.businesses[url] = {"name": name, "website": website, "phone": "", "address": "1 Main St"}
+        return url
+
+    def visit(self, *urls):
+        async def visit_all():
+            for url in urls:
+                await self.scraper.process_card_url(None, url, None, 10)
+
+        asyncio.run(visit_all())
+
+    def saved_visits(self):
+        self.scraper.save_visited_urls()
+        return self.scraper.state_store.visited_for_query(self.QUERY)
+
+    def test_failed_write_keeps_places_unvisited(self):
+        writer = self.scraper.lead_writer
+
+        def fail():
+            writer.buffer = []
+            raise RuntimeError("database is locked")
+
+        writer.flush_sync = fail
+        self.visit(self.place(1, "Alpha Print", "https://alpha.example"),
+                   self.place(2, "No Site Print", ""),
+                   self.place(3, "Gamma Print", "https://gamma.example"))
+
+        self.assertEqual(self.saved_visits(), {"cid:2"})
+        self.assertEqual(self.scraper.visited_places, {"cid:2"})
+        self.assertEqual(self.scraper.seen_names, set())
+        self.assertFalse(self.scraper.business_index.check_website("https://alpha.example"))
+        self.assertFalse(self.scraper.business_index.check_place("cid:3"))
+        self.assertFalse(writer.is_known("https://gamma.example"))
+        self.assertEqual(self.scraper.processed_count, 0)
+
+    def test_buffered_leads_are_persisted_with_their_batch(self):
+        writer = self.scraper.lead_writer
+
+        def commit():
+            pending, writer.buffer = writer.buffer, []
+            return pending, [], []
+
+        writer.flush_sync = commit
+        self.visit(self.place(1, "Alpha Print", "https://alpha.example"), self.place(2, "No Site Print", ""))
+        # Alpha's lead is still buffered, so only the place without a lead is saved
+        self.assertEqual(self.saved_visits(), {"cid:2"})
+
+        self.visit(self.place(3, "Gamma Print", "https://gamma.example"))
+        self.assertEqual(self.saved_visits(), {"cid:1", "cid:2", "cid:3"})
+        self.assertEqual(self.scraper.saved_count, 2)
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+        if self in self.context.pages:
+            self.context.pages.remove(self)
+
+
+class FakeCdpSession:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, method, params=None):
+        self.sent.append((method, params))
+
+    async def detach(self):
+        pass
+
+
+class FakeContext(FakeEventPage):
+    def __init__(self):
+        super().__init__()
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        self.emit("page", page)
+        return page
+
+    async def unroute_all(self, behavior=None):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = [FakeContext()]
+        self.cdp = FakeCdpSession()
+
+    async def new_context(self, user_agent=None):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def new_browser_cdp_session(self):
+        return self.cdp
+
+
+class BrowserServicePoolTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def service(self, max_pages_per_context=3):
+        service = BrowserService(profile_dir=self.tmp.name, max_pages_per_context=max_pages_per_context,
+                                 max_memory_mb=0)
+        service.browser = FakeBrowser()
+        service.default_context = service.browser.contexts[0]
+        service.track(service.default_context)
+        self.addCleanup(service.unlock_default_context)
+        return service
+
+    def test_default_context_is_leased_to_one_client(self):
+        async def run():
+            first, second = self.service(), self.service()
+            leased = await first.acquire_context()
+            # Another client on the same profile cannot take the default context
+            other = await second.acquire_context()
+            self.assertIs(leased, first.default_context)
+            self.assertIsNot(other, second.default_context)
+            await first.release_context(leased)
+            self.assertIs(await second.acquire_context(), second.default_context)
+
+        asyncio.run(run())
+
+    def test_released_context_is_reused_and_lease_pages_closed(self):
+        async def run():
+            service = self.service()
+            await service.acquire_context()  # holds the default context
+            context = await service.acquire_context()
+            page = await context.new_page()
+            await service.release_context(context)
+            self.assertTrue(page.closed)
+            self.assertEqual(service.idle, [context])
+            self.assertIs(await service.acquire_context(), context)
+            self.assertEqual((service.leases, service.contexts_created), (3, 1))
+
+        asyncio.run(run())
+
+    def test_worn_pooled_context_is_closed(self):
+        async def run():
+            service = self.service(max_pages_per_context=2)
+            await service.acquire_context()
+            context = await service.acquire_context()
+            for _ in range(2):
+                await context.new_page()
+            await service.release_context(context)
+            self.assertTrue(context.closed)
+            self.assertEqual(service.idle, [])
+            self.assertEqual((service.contexts_recycled, service.default_context_cleanups), (1, 0))
+
+        asyncio.run(run())
+
+    def test_worn_default_context_is_cleaned_up_in_place(self):
+        async def run():
+            service = self.service(max_pages_per_context=2)
+            context = await service.acquire_context()
+            # A page left open by an earlier client as well as this lease's pages
+            stray = FakePage(context)
+            context.pages.append(stray)
+            for _ in range(2):
+                await context.new_page()
+            await service.release_context(context)
+
+            self.assertTrue(stray.closed)
+            self.assertFalse(context.closed)
+            self.assertEqual(len(context.pages), 1)
+            self.assertEqual(service.page_counts[context], 0)
+            self.assertEqual((service.contexts_recycled, service.default_context_cleanups), (0, 1))
+            self.assertIn(("Memory.simulatePressureNotification", {"level": "critical"}), service.browser.cdp.sent)
+            self.assertIsNone(service.default_lock)
+
+        asyncio.run(run())
+
+
+class GridPlannerTests(SimpleTestCase):
+    # About 8km x 8km around Atlanta
+    BOUNDS = (33.72, -84.43, 33.79, -84.35)
+
+    def test_grid_covers_bounds(self):
+        cells = grid_cells(self.BOUNDS, cell_km=4)
+        self.assertEqual(len(cells), 4)
+        for cell in cells:
+            self.assertTrue(self.BOUNDS[0] < cell["lat"] < self.BOUNDS[2] + 0.04)
+            self.assertEqual(cell["depth"], 0)
+
+    def test_large_area_is_coarsened_to_max_cells(self):
+        planner = GridPlanner((32.5, -124.4, 42.0, -114.1), cell_km=4, max_cells=400)
+        self.assertLessEqual(planner.initial_cells, 400)
+        self.assertGreater(planner.cell_km, 4)
+        self.assertEqual(planner.requested_cell_km, 4)
+
+    def test_saturated_cell_is_subdivided_and_seen_cell_counted(self):
+        planner = GridPlanner(self.BOUNDS, cell_km=4, min_cell_km=1, saturation=3)
+        first = planner.next_cell()
+        self.assertEqual(planner.record(first, ["cid:1", "cid:2", "cid:3"]), 3)
+        self.assertEqual(planner.cells_subdivided, 1)
+        self.assertEqual(len(planner.pending), planner.initial_cells - 1 + 4)
+
+        second = planner.next_cell()
+        self.assertEqual(planner.record(second, ["cid:2", "cid:3"]), 0)
+        self.assertEqual(planner.cells_without_new, 1)
+        self.assertEqual(planner.cells_subdivided, 1)
+        self.assertEqual(len(planner.seen), 3)
+
+    def test_saturated_cell_without_new_places_is_still_subdivided(self):
+        planner = GridPlanner(self.BOUNDS, cell_km=4, min_cell_km=1, saturation=2)
+        planner.record(planner.next_cell(), ["cid:1", "cid:2"])
+        pending = len(planner.pending)
+        # Every visible place was seen elsewhere, but the feed was cut off
+        self.assertEqual(planner.record(planner.next_cell(), ["cid:1", "cid:2"]), 0)
+        self.assertEqual((planner.cells_subdivided, planner.cells_without_new), (2, 1))
+        self.assertEqual(len(planner.pending), pending - 1 + 4)
+
+    def test_subdivision_stops_at_min_cell_km(self):
+        planner = GridPlanner(self.BOUNDS, cell_km=4, min_cell_km=4, saturation=1)
+        pending = len(planner.pending)
+        planner.record(planner.next_cell(), ["cid:1"])
+        self.assertEqual(len(planner.pending), pending - 1)
+
+    def test_next_cell_drains_queue(self):
+        planner = GridPlanner(self.BOUNDS, cell_km=4)
+        cells = [planner.next_cell() for _ in range(planner.initial_cells)]
+        self.assertNotIn(None, cells)
+        self.assertIsNone(planner.next_cell())
+
+    def test_cell_search_url_uses_base_url(self):
+        cell = grid_cells(self.BOUNDS, cell_km=8)[0]
+        url = cell_search_url("print shops", cell, "http://127.0.0.1:8000")
+        self.assertTrue(url.startswith("http://127.0.0.1:8000/maps/search/print%20shops/@"))
+        self.assertTrue(url.endswith(f"{cell['zoom']}z"))
+
+
+class SelectorStatsTests(SimpleTestCase):
+    CONFIG = {
+        "name": ["h1.DUwDvf", "h1", "[role='main'] h1"],
+        "phone": ["button[data-item-id^='phone']", "[data-tooltip='Copy phone number']"],
+        "links": "a[href]",
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ScraperStateStore(os.path.join(self.tmp.name, "state.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def record_name_pages(self, stats, used, pages, ms=1.0):
+        for _ in range(pages):
+            timings = [["name", selector, ms, 1] for selector in self.CONFIG["name"]]
+            stats.record_page(timings, {"name": used})
+
+    def test_unseen_selectors_keep_their_order(self):
+        stats = SelectorStats()
+        self.assertEqual(stats.ordered("name", self.CONFIG["name"]), self.CONFIG["name"])
+
+    def test_hits_move_a_selector_first(self):
+        stats = SelectorStats(flush_every=0)
+        self.record_name_pages(stats, "[role='main'] h1", 5)
+        self.assertEqual(stats.ordered("name", self.CONFIG["name"])[0], "[role='main'] h1")
+        self.assertEqual(stats.counts("name", "[role='main'] h1"), (5, 0, 5.0))
+        self.assertEqual(stats.counts("name", "h1"), (0, 5, 5.0))
+
+    def test_unseen_selector_sorts_between_proven_and_failing(self):
+        stats = SelectorStats(flush_every=0)
+        stats.record_page([["name", "h1.DUwDvf", 1.0, 0], ["name", "h1", 1.0, 1]] * 3, {"name": "h1"})
+        self.assertEqual(stats.ordered("name", self.CONFIG["name"]), ["h1", "[role='main'] h1", "h1.DUwDvf"])
+
+    def test_latency_breaks_hit_rate_ties(self):
+        stats = SelectorStats(flush_every=0)
+        stats.record_page([["phone", self.CONFIG["phone"][0], 9.0, 0], ["phone", self.CONFIG["phone"][1], 1.0, 0]],
+                          {})
+        self.assertEqual(stats.ordered("phone", self.CONFIG["phone"]), list(reversed(self.CONFIG["phone"])))
+
+    def test_flush_persists_and_reloads(self):
+        stats = SelectorStats(self.store, flush_every=2)
+        self.record_name_pages(stats, "h1", 1)
+        self.assertEqual(SelectorStats(self.store).counts("name", "h1"), (0, 0, 0.0))
+        self.record_name_pages(stats, "h1", 1)
+        self.assertEqual(stats.pending, {})
+
+        reloaded = SelectorStats(self.store)
+        self.assertEqual(reloaded.counts("name", "h1"), (2, 0, 2.0))
+        self.assertEqual(reloaded.ordered_config(self.CONFIG)["name"][0], "h1")
+        self.assertEqual(reloaded.ordered_config(self.CONFIG)["links"], "a[href]")
+
+    def test_never_hit(self):
+        stats = SelectorStats(flush_every=0)
+        self.record_name_pages(stats, "h1", 20)
+        self.assertEqual(stats.never_hit(self.CONFIG), [("name", "h1.DUwDvf", 20), ("name", "[role='main'] h1", 20)])
+        self.assertEqual(stats.never_hit(self.CONFIG, min_evaluations=21), [])
+
+
+class TextExtractionTests(SimpleTestCase):
+    def test_extract_phone(self):
+        self.assertEqual(text_extraction.extract_phone("Call phone number +1 (404) 555-0187"), "+1 (404) 555-0187")
+        self.assertEqual(text_extraction.extract_phone("Phone: 404-555-0187"), "404-555-0187")
+        self.assertEqual(text_extraction.extract_phone("1234567890"), "")
+        self.assertEqual(text_extraction.extract_phone("Open ⋅ Closes 6 PM"), "")
+
+    def test_extract_address(self):
+        self.assertEqual(text_extraction.extract_address("Address: 55 Main Rd, Springfield, IL 62701"),
+                         "55 Main Rd, Springfield, IL 62701")
+        self.assertEqual(text_extraction.extract_address("1234 Peachtree Street NE"), "1234 Peachtree Street")
+        self.assertEqual(text_extraction.extract_address("Get directions to 12 Main St"), "")
+        self.assertEqual(text_extraction.extract_address("Website"), "")
+
+    def test_rating_and_review_count(self):
+        self.assertEqual(text_extraction.extract_rating("4.7 stars 1,284 reviews"), 4.7)
+        self.assertEqual(text_extraction.extract_review_count("1,284 reviews"), 1284)
+        self.assertIsNone(text_extraction.extract_rating("no rating"))
+        self.assertIsNone(text_extraction.extract_review_count(""))
+
+    def test_is_valid_website(self):
+        self.assertTrue(text_extraction.is_valid_website("https://www.printshopatlanta.com/contact"))
+        self.assertTrue(text_extraction.is_valid_website("notfacebook.com"))
+        self.assertFalse(text_extraction.is_valid_website("https://m.facebook.com/printshop"))
+        self.assertFalse(text_extraction.is_valid_website("https://www.google.com.au/maps"))
+        self.assertFalse(text_extraction.is_valid_website("/url?q=relative"))
+        self.assertFalse(text_extraction.is_valid_website(""))
+
+    def test_extract_batch_matches_single_extractors(self):
+        texts = ["Phone: 404-555-0187", "4.7 stars 1,284 reviews", "Phone: 404-555-0187"]
+        results = text_extraction.extract_batch(texts)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["phone"], "404-555-0187")
+        self.assertEqual(results[1]["rating"], 4.7)
+        self.assertEqual(results[0], results[2])
+        self.assertIsNot(results[0], results[2])
+
+    def test_url_host(self):
+        self.assertEqual(text_extraction.url_host("https://user@Shop.Example:8443/contact?x=1"), "shop.example")
+        self.assertEqual(text_extraction.url_host("shop.example./about"), "shop.example")
+        self.assertEqual(text_extraction.url_host("/relative/path"), "")
+
+    def test_clean_phone(self):
+        self.assertEqual(text_extraction.clean_phone(" tel:+1  404\n555-0187 "), "+1 404 555-0187")
+        self.assertEqual(text_extraction.clean_phone(None), "")
+
+    def test_filter_websites_keeps_order(self):
+        urls = ["https://b.example", "https://www.google.com/maps", "https://a.example", "https://yelp.com/biz/x"]
+        self.assertEqual(text_extraction.filter_websites(urls), ["https://b.example", "https://a.example"])
+
+
+class RunMetricsTests(SimpleTestCase):
+    def test_histogram_quantiles(self):
+        histogram = StageHistogram()
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        for ms in (3, 7, 8, 40, 45000):
+            histogram.observe(ms)
+        self.assertEqual(histogram.quantile(0.5), 10.0)
+        self.assertEqual(histogram.quantile(0.8), 50.0)
+        # The +Inf bucket reports the observed maximum
+        self.assertEqual(histogram.quantile(1.0), 45000)
+        summary = histogram.summary()
+        self.assertEqual((summary["count"], summary["max_ms"]), (5, 45000))
+        self.assertEqual(summary["buckets"]["10"], 2)
+        self.assertEqual(summary["buckets"]["+Inf"], 1)
+
+    def test_counters_gauges_and_stages(self):
+        metrics = RunMetrics("print shops")
+        metrics.count("saved")
+        metrics.count("saved", 2)
+        metrics.count("custom")
+        metrics.gauge("url_queue", 5)
+        metrics.gauge("url_queue", 2)
+        with metrics.stage("navigation"):
+            pass
+        metrics.observe("new_stage", 12)
+
+        summary = metrics.summary()
+        self.assertEqual(summary["counters"]["saved"], 3)
+        self.assertEqual(summary["counters"]["custom"], 1)
+        self.assertEqual(summary["gauges"]["url_queue"], {"last": 2, "peak": 5})
+        self.assertEqual(summary["stages"]["navigation"]["count"], 1)
+        self.assertEqual(summary["stages"]["new_stage"]["count"], 1)
+
+    def test_prometheus_lines(self):
+        metrics = RunMetrics('shops "in" a\\b')
+        metrics.count("saved")
+        metrics.observe("navigation", 30)
+        lines = metrics.prometheus_lines()
+        label = 'run="shops \\"in\\" a\\\\b"'
+        self.assertIn(f"mockmap_scraper_saved_total{{{label}}} 1", lines)
+        self.assertIn(f'mockmap_scraper_navigation_seconds_bucket{{{label},le="0.025"}} 0', lines)
+        self.assertIn(f'mockmap_scraper_navigation_seconds_bucket{{{label},le="0.05"}} 1', lines)
+        self.assertIn(f'mockmap_scraper_navigation_seconds_bucket{{{label},le="+Inf"}} 1', lines)
+        self.assertIn(f"mockmap_scraper_navigation_seconds_sum{{{label}}} 0.030000", lines)
+
+    def test_write_json(self):
+        metrics = RunMetrics("print shops/atlanta")
+        metrics.count("visited")
+        with tempfile.TemporaryDirectory() as directory:
+            path = metrics.write_json(directory)
+            self.assertTrue(os.path.basename(path).startswith("print_shops_atlanta-"))
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["counters"]["visited"], 1)
+
+    def test_exporter_serves_registered_runs(self):
+        exporter = MetricsExporter(0)
+        try:
+            metrics = RunMetrics("grid")
+            metrics.count("saved", 4)
+            exporter.register(metrics)
+            exporter.register(metrics)
+            base_url = f"http://127.0.0.1:{exporter.server.server_address[1]}"
+            with urllib.request.urlopen(f"{base_url}/metrics", timeout=5) as response:
+                body = response.read().decode("utf-8")
+            self.assertEqual(body.count('mockmap_scraper_saved_total{run="grid"} 4'), 1)
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(f"{base_url}/other", timeout=5)
+            self.assertEqual(raised.exception.code, 404)
+        finally:
+            exporter.server.shutdown()
+            exporter.server.server_close()
+
+
+class LoopMonitorTests(SimpleTestCase):
+    def test_monitor_mode_from_env(self):
+        for value, mode in (("", ""), ("1", "on"), (" Yes ", "on"), ("STRICT", "strict"), ("0", "")):
+            with mock.patch.dict(os.environ, {LOOP_MONITOR_ENV: value}):
+                self.assertEqual(monitor_mode(), mode)
+
+    def test_run_monitored_off_is_plain_run(self):
+        async def answer():
+            return 42
+
+        self.assertEqual(run_monitored(answer(), mode=""), 42)
+
+    def test_detects_blocking_call(self):
+        async def blocking():
+            await asyncio.sleep(0.05)
+            time.sleep(0.3)
+            await asyncio.sleep(0.1)
+
+        async def monitored():
+            async with LoopMonitor(interval=0.02, block_threshold_ms=100) as monitor:
+                await blocking()
+            return monitor
+
+        monitor = asyncio.run(monitored())
+        summary = monitor.summary()
+        self.assertEqual(summary["blocks"], 1)
+        self.assertGreater(summary["longest_block_ms"], 150)
+        self.assertGreater(summary["max_lag_ms"], 150)
+        self.assertIn("blocking", monitor.blocks[0][1])
+
+    def test_strict_mode_raises(self):
+        async def blocking():
+            await asyncio.sleep(0.05)
+            time.sleep(0.3)
+            await asyncio.sleep(0.1)
+
+        with self.assertRaises(EventLoopBlockedError):
+            run_monitored(blocking(), mode="strict", interval=0.02, block_threshold_ms=100, max_block_ms=150)
+
+    def test_strict_mode_passes_quiet_runs(self):
+        self.assertIsNone(run_monitored(asyncio.sleep(0.1), mode="strict", interval=0.02, block_threshold_ms=100))
+
+
+class FakeBlockPage:
+    def __init__(self, url, signals):
+        self.url = url
+        self.signals = signals
+
+    async def evaluate(self, script):
+        return self.signals
+
+
+class RateTokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ScraperStateStore(os.path.join(self.tmp.name, "state.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_burst_then_wait(self):
+        for _ in range(3):
+            self.assertEqual(self.store.take_rate_token("maps", 2.0, 3), 0)
+        wait = self.store.take_rate_token("maps", 2.0, 3)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.5)
+
+    def test_tokens_refill_over_time(self):
+        for _ in range(2):
+            self.store.take_rate_token("maps", 20.0, 2)
+        self.assertGreater(self.store.take_rate_token("maps", 20.0, 2), 0)
+        time.sleep(0.1)
+        self.assertEqual(self.store.take_rate_token("maps", 20.0, 2), 0)
+
+    def test_adjust_rate_clamps(self):
+        self.assertEqual(self.store.adjust_rate("maps", 1.0, 3, 0.1, 4.0, increase=10), 4.0)
+        self.assertEqual(self.store.adjust_rate("maps", 1.0, 3, 0.1, 4.0, factor=0.001), 0.1)
+
+    def test_block_pauses_everyone(self):
+        self.assertEqual(self.store.adjust_rate("maps", 1.0, 3, 0.1, 4.0, factor=0.5, cooldown_seconds=60), 0.5)
+        self.assertGreater(self.store.take_rate_token("maps", 1.0, 3), 50)
+
+    def test_classify_page(self):
+        self.assertEqual(classify_page("https://www.google.com/sorry/index?continue=x"), "blocked")
+        self.assertEqual(classify_page("https://www.google.com/maps", captcha=True), "blocked")
+        self.assertEqual(classify_page("https://www.google.com/maps", text="Our systems have detected unusual traffic"),
+                         "blocked")
+        self.assertEqual(classify_page("https://consent.google.com/ml?continue=x"), "consent")
+        self.assertEqual(classify_page("https://www.google.com/maps/place/Shop", text="Print Shop"), "")
+
+    def test_check_page_feeds_the_controller(self):
+        limiter = NavigationRateLimiter(self.store, name="maps", rate=1.0, cooldown_seconds=60)
+        self.assertEqual(asyncio.run(limiter.check_page(FakeBlockPage("https://www.google.com/maps", {}))), "")
+        self.assertAlmostEqual(limiter.rate, 1.05)
+        asyncio.run(limiter.check_page(FakeBlockPage("https://consent.google.com/", {})))
+        self.assertAlmostEqual(limiter.rate, 1.05)
+        asyncio.run(limiter.check_page(FakeBlockPage("https://www.google.com/maps", {"captcha": True})))
+        self.assertAlmostEqual(limiter.rate, 0.525)
+        self.assertEqual(dict(limiter.outcomes), {"ok": 1, "consent": 1, "blocked": 1})
+
+    def test_block_pauses_and_halves_once_per_cooldown(self):
+        self.assertEqual(self.store.adjust_rate("maps", 1.0, 3, 0.1, 4.0, factor=0.5, cooldown_seconds=60), 0.5)
+        self.assertEqual(self.store.adjust_rate("maps", 1.0, 3, 0.1, 4.0, factor=0.5, cooldown_seconds=60), 0.5)
+        self.assertGreater(self.store.take_rate_token("maps", 1.0, 3), 50)
+        self.assertEqual(self.store.load_rate_limit("maps")["rate"], 0.5)
+
+
+class RecrawlPriorityTests(SimpleTestCase):
+    NOW = 1_800_000_000.0
+
+    def snapshot(self, age_days, has_website=True, changed_fields="", review_count=0):
+        return {
+            "scraped_at": self.NOW - age_days * SECONDS_PER_DAY,
+            "has_website": has_website,
+            "changed_fields": changed_fields,
+            "review_count": review_count,
+        }
+
+    def setUp(self):
+        self.scheduler = RecrawlScheduler(None, max_age_days=30, min_age_days=3)
+
+    def test_too_recent_is_never_due(self):
+        self.assertIsNone(self.scheduler.priority(self.snapshot(1, has_website=False), self.NOW))
+
+    def test_young_place_without_reason_is_not_due(self):
+        self.assertIsNone(self.scheduler.priority(self.snapshot(10), self.NOW))
+
+    def test_stale_place_is_due(self):
+        self.assertAlmostEqual(self.scheduler.priority(self.snapshot(30), self.NOW), 1.0)
+
+    def test_missing_website_and_changes_qualify_young_places(self):
+        missing = self.scheduler.priority(self.snapshot(10, has_website=False), self.NOW)
+        changed = self.scheduler.priority(self.snapshot(10, changed_fields="phone"), self.NOW)
+        self.assertIsNotNone(missing)
+        self.assertIsNotNone(changed)
+        self.assertGreater(missing, changed)
+
+    def test_popularity_breaks_ties(self):
+        quiet = self.scheduler.priority(self.snapshot(40), self.NOW)
+        popular = self.scheduler.priority(self.snapshot(40, review_count=5000), self.NOW)
+        self.assertGreater(popular, quiet)
+        self.assertLessEqual(popular - quiet, 0.5)
+
+
+class PlaceSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ScraperStateStore(os.path.join(self.tmp.name, "state.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def save(self, place_key, **fields):
+        info = {"name": "Print Shop", "website": "https://shop.example", "phone": "404-555-0187",
+                "address": "1 Main St", "rating": "4.5", "review_count": "1,200"}
+        info.update(fields)
+        return self.store.save_place_snapshots([snapshot_row(place_key, "print shops", f"url-{place_key}", info)])
+
+    def age(self, place_key, days):
+        self.store.conn.execute("UPDATE place_snapshots SET scraped_at = ? WHERE place_key = ?",
+                                (time.time() - days * SECONDS_PER_DAY, place_key))
+
+    def test_changes_are_detected_after_normalizing(self):
+        self.assertEqual(self.save("cid:1"), {})
+        self.assertEqual(self.save("cid:1", name="  PRINT   shop "), {"cid:1": []})
+        self.assertEqual(self.save("cid:1", phone="404-555-0100", website="Not found"),
+                         {"cid:1": ["phone", "website"]})
+
+        snapshot = self.store.load_place_snapshots()[0]
+        self.assertEqual(snapshot["scrape_count"], 3)
+        self.assertEqual(snapshot["changed_fields"], "phone,website")
+        self.assertFalse(snapshot["has_website"])
+        self.assertEqual(snapshot["review_count"], 1200)
+
+    def test_plan_orders_by_priority_within_budget(self):
+        self.save("cid:stale")
+        self.save("cid:no-website", website="")
+        self.save("cid:young")
+        self.save("cid:fresh", website="")
+        self.age("cid:stale", 31)
+        self.age("cid:no-website", 10)
+        self.age("cid:young", 10)
+
+        scheduler = RecrawlScheduler(self.store, max_age_days=30, min_age_days=3)
+        plan = scheduler.plan(budget=5)
+        self.assertEqual([snapshot["place_key"] for snapshot in plan], ["cid:no-website", "cid:stale"])
+        self.assertEqual((scheduler.known, scheduler.eligible), (4, 2))
+        self.assertEqual(len(scheduler.plan(budget=1)), 1)